@@ -2,6 +2,10 @@
 ASGI config for Backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The schedule event stream (/api/schedule-events/) is an async streaming view and
+must be served through this entry point (e.g. ``uvicorn Backend.asgi:application``).
+Streaming responses (NDJSON schedules, CSV/xlsx exports) are switched to async
+iterators under ASGI, so they are still sent in batches instead of buffered.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
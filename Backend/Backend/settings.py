@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -55,6 +56,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'Schedule.middleware.ServerTimingMiddleware',  # 请求耗时：Server-Timing 响应头与 /api/metrics 指标
 ]
 
 ROOT_URLCONF = 'Backend.urls'
@@ -91,6 +93,16 @@ DATABASES = {
     }
 }
 
+# 设置环境变量 SCHEDULE_SQLITE=<文件路径> 时改用 SQLite，
+# 用于 seed_schedule_data 生成的测试数据集与 benchmark_schedule 基准测试
+if os.environ.get('SCHEDULE_SQLITE'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ['SCHEDULE_SQLITE'],
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -139,6 +151,11 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',  # 生产环境中应更改为适当的权限控制
     ],
+    # 标记为基础类型的响应在安装了 orjson 时用 orjson 渲染，输出与 JSONRenderer 相同
+    'DEFAULT_RENDERER_CLASSES': [
+        'Schedule.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20
 }
@@ -165,4 +182,39 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
-]
\ No newline at end of file
+]
+
+# 排班生成结果写入物化存储，数据变更时增量刷新
+SCHEDULE_MATERIALIZED_STORE = True
+# 数据变更后在专用线程中重算受影响的物化月份（False 时在事务提交回调中同步重算）
+SCHEDULE_STORE_DEFERRED_REFRESH = True
+# 物化排班重算线程数（与排班生成任务的线程池 SCHEDULE_JOB_THREADS 分开）
+SCHEDULE_STORE_REFRESH_THREADS = 1
+
+# 排班生成进程池大小，大于 1 时按月份或按组并行计算
+SCHEDULE_WORKERS = 1
+
+# 缓存配置：schedule 用于排班结果缓存（本地内存，按 LRU 淘汰）
+# TIMEOUT 为结果保留秒数，MAX_ENTRIES 为最多缓存的月份结果数
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'schedule': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'schedule-results',
+        'TIMEOUT': 600,
+        'OPTIONS': {
+            'MAX_ENTRIES': 120,
+        },
+    },
+}
+SCHEDULE_CACHE_ALIAS = 'schedule'
+
+# 是否在响应中返回 Server-Timing 头（数据库、排班生成各阶段与渲染耗时）
+SCHEDULE_SERVER_TIMING = True
+
+# 排班生成任务：执行线程数、已完成任务的保留个数与保留秒数
+SCHEDULE_JOB_THREADS = 2
+SCHEDULE_JOB_MAX_FINISHED = 20
+SCHEDULE_JOB_RESULT_TTL = 600
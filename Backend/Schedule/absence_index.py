@@ -0,0 +1,85 @@
+"""
+请假区间索引
+
+每人的请假记录预先合并为按日期排序、互不重叠的区间 (开始, 结束, 请假记录)。
+同一天有多条记录时按 id 靠前者生效（与逐条查找第一条匹配记录的结果一致），
+查询某人某日的请假记录只需一次二分查找。
+"""
+from bisect import bisect_right
+from datetime import timedelta
+
+
+class AbsenceIndex:
+    """请假区间索引"""
+
+    def __init__(self, absences):
+        self.intervals = {}
+        for absence in sorted(absences, key=lambda item: item.id):
+            if absence.start_date > absence.end_date:
+                continue
+            self._paint(self.intervals.setdefault(absence.person_id, []), absence)
+        self.starts = {
+            person_id: [interval[0] for interval in intervals]
+            for person_id, intervals in self.intervals.items()
+        }
+
+    @staticmethod
+    def _paint(intervals, absence):
+        """只把尚未被覆盖的日期段写入该记录，保持区间有序且不重叠"""
+        cursor = absence.start_date
+        index = bisect_right([interval[0] for interval in intervals], cursor) - 1
+        if index >= 0 and intervals[index][1] >= cursor:
+            cursor = intervals[index][1] + timedelta(days=1)
+        index += 1
+        gaps = []
+        while cursor <= absence.end_date:
+            if index < len(intervals) and intervals[index][0] <= absence.end_date:
+                if cursor < intervals[index][0]:
+                    gaps.append((cursor, intervals[index][0] - timedelta(days=1), absence))
+                cursor = intervals[index][1] + timedelta(days=1)
+                index += 1
+            else:
+                gaps.append((cursor, absence.end_date, absence))
+                break
+        if gaps:
+            intervals.extend(gaps)
+            intervals.sort(key=lambda interval: interval[0])
+
+    def lookup(self, person_id, day):
+        """某人某日生效的请假记录，没有时返回 None"""
+        starts = self.starts.get(person_id)
+        if not starts:
+            return None
+        index = bisect_right(starts, day) - 1
+        if index < 0:
+            return None
+        start_date, end_date, absence = self.intervals[person_id][index]
+        return absence if day <= end_date else None
+
+    def person_intervals(self, person_id, start_date=None, end_date=None):
+        """某人的请假区间，可按日期范围裁剪"""
+        result = []
+        for interval_start, interval_end, absence in self.intervals.get(person_id, []):
+            if start_date is not None:
+                if interval_end < start_date:
+                    continue
+                interval_start = max(interval_start, start_date)
+            if end_date is not None:
+                if interval_start > end_date:
+                    break
+                interval_end = min(interval_end, end_date)
+            result.append((interval_start, interval_end, absence))
+        return result
+
+    def availability(self, person_id, start_date, end_date):
+        """返回 (可用区间列表, 不可用区间列表)，不可用区间附带对应的请假记录"""
+        unavailable = self.person_intervals(person_id, start_date, end_date)
+        available = []
+        cursor = start_date
+        for interval_start, interval_end, _ in unavailable:
+            if cursor < interval_start:
+                available.append((cursor, interval_start - timedelta(days=1)))
+            cursor = interval_end + timedelta(days=1)
+        if cursor <= end_date:
+            available.append((cursor, end_date))
+        return available, unavailable
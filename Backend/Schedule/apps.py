@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ScheduleConfig(AppConfig):
     name = 'Schedule'
+
+    def ready(self):
+        from . import signals  # noqa: F401
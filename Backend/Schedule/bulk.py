@@ -0,0 +1,269 @@
+"""
+批量写入
+
+人员、请假、日历覆盖的批量新增 / 修改 / 删除：
+- 用序列化器统一校验，任一条目不合法时整体不写入，返回每个条目的错误
+- 在同一事务中用 bulk_create / bulk_update 写入
+- bulk_create / bulk_update 不触发模型信号（删除时逐行信号被暂停），
+  写入后统一递增数据版本、记录变更，并在事务提交后刷新物化排班；没有写入任何记录时不递增版本
+- 多对多字段（日历覆盖的目标人员）在同一事务中批量写入关联表
+"""
+from django.db import connection, transaction
+from django.db.models import Q
+
+from . import work_calendar
+from .models import Person, Absence, CalendarOverride, ShiftDefinition
+from .schedule_changes import record_change
+from .signals import suspended, _schedule_refresh, _override_person_ids, _override_range
+from .versioning import bump_data_version
+
+BULK_BATCH_SIZE = 500
+
+
+class BulkValidationError(Exception):
+    """批量数据校验失败，errors 为 [{"index": 下标, "errors": 错误}]"""
+
+    def __init__(self, errors):
+        super().__init__('批量数据校验失败')
+        self.errors = errors
+
+
+def _item_errors(errors):
+    # DRF 版本不同，many=True 的错误可能是按下标排列的列表，也可能是 {下标: 错误}
+    items = errors.items() if isinstance(errors, dict) else enumerate(errors)
+    return [{'index': index, 'errors': item} for index, item in items if item]
+
+
+# 受影响的物化排班范围：返回 [(人员ID集合或 None, 开始日期, 结束日期), ...]
+
+def _person_refresh(persons):
+    person_ids = [person.id for person in persons]
+    if any(person_id is None for person_id in person_ids):
+        # 数据库不返回批量插入的主键时（如 MySQL），刷新全部人员
+        return [(None, None, None)]
+    return [(person_ids, None, None)]
+
+
+def _absence_refresh(absences):
+    if not absences:
+        return []
+    return [(
+        {absence.person_id for absence in absences},
+        min(absence.start_date for absence in absences),
+        max(absence.end_date for absence in absences),
+    )]
+
+
+def _override_refresh(overrides):
+    if not overrides:
+        return []
+    person_ids = set()
+    scope_cache = {}
+    person_scoped = []
+    for override in overrides:
+        if override.scope == '指定人员':
+            person_scoped.append(override.pk)
+            continue
+        scope_key = (override.scope, override.target_group_id, override.target_rotation_group_id, override.target)
+        if scope_key not in scope_cache:
+            scope_cache[scope_key] = _override_person_ids(override)
+        if scope_cache[scope_key] is None:
+            person_ids = None
+            break
+        person_ids |= scope_cache[scope_key]
+    if person_ids is not None and person_scoped:
+        # 指定人员的规则一次查询取出全部目标人员
+        if None in person_scoped:
+            person_ids = None
+        else:
+            person_ids |= set(
+                CalendarOverride.target_persons.through.objects
+                .filter(calendaroverride_id__in=person_scoped).values_list('person_id', flat=True)
+            )
+    ranges = [_override_range(override) for override in overrides]
+    return [(person_ids, min(start for start, _ in ranges), max(end for _, end in ranges))]
+
+
+def _prepare_override(override):
+    # bulk_create / bulk_update 不调用 save()，需自行维护 effective_end_date
+    override.effective_end_date = override.end_date or override.date
+
+
+BULK_MODELS = {
+    Person: {'refresh': _person_refresh, 'cascade': ('Absence',)},
+    Absence: {'refresh': _absence_refresh},
+    CalendarOverride: {'refresh': _override_refresh, 'prepare': _prepare_override, 'm2m': ('target_persons',)},
+}
+
+
+def _after_write(model, refresh_ranges, cascade=()):
+    bump_data_version(model.__name__, *cascade)
+    # 每个数据版本都需要变更记录，否则增量排班接口会认为记录缺失而要求完整重新加载
+    for person_ids, start_date, end_date in refresh_ranges or [(set(), None, None)]:
+        _schedule_refresh(model, person_ids, start_date, end_date)
+
+
+def _pop_m2m(spec, attrs):
+    """从校验后的数据中取出多对多字段（不能直接用于构造或 bulk_update）"""
+    return {name: attrs.pop(name) for name in spec.get('m2m', ()) if name in attrs}
+
+
+def _write_m2m(model, objects, m2m_values):
+    """批量写入多对多关联：删除这些对象在对应字段上的原有关联，再一次插入新的关联"""
+    for name in {name for values in m2m_values for name in values}:
+        field = model._meta.get_field(name)
+        through = field.remote_field.through
+        source = f'{field.m2m_field_name()}_id'
+        target = f'{field.m2m_reverse_field_name()}_id'
+        pairs = [(obj, values[name]) for obj, values in zip(objects, m2m_values) if name in values]
+        through.objects.filter(**{f'{source}__in': [obj.pk for obj, _ in pairs]}).delete()
+        through.objects.bulk_create([
+            through(**{source: obj.pk, target: related.pk})
+            for obj, related_objects in pairs for related in related_objects
+        ], batch_size=BULK_BATCH_SIZE)
+
+
+def bulk_create(model, serializer_class, items):
+    """校验并批量新增，返回新建的对象列表"""
+    if not isinstance(items, list):
+        raise BulkValidationError([{'index': None, 'errors': '需要对象数组'}])
+    serializer = serializer_class(data=items, many=True)
+    if not serializer.is_valid():
+        raise BulkValidationError(_item_errors(serializer.errors))
+
+    if not items:
+        return []
+
+    spec = BULK_MODELS[model]
+    items = [dict(attrs) for attrs in serializer.validated_data]
+    m2m_values = [_pop_m2m(spec, attrs) for attrs in items]
+    objects = [model(**attrs) for attrs in items]
+    if 'prepare' in spec:
+        for obj in objects:
+            spec['prepare'](obj)
+    with transaction.atomic():
+        if any(m2m_values) and not connection.features.can_return_rows_from_bulk_insert:
+            # 数据库不返回批量插入的主键时（如 MySQL）逐条插入，才能写入多对多关联
+            with suspended():
+                for obj in objects:
+                    obj.save()
+        else:
+            objects = model.objects.bulk_create(objects, batch_size=BULK_BATCH_SIZE)
+        if any(m2m_values):
+            _write_m2m(model, objects, m2m_values)
+        _after_write(model, spec['refresh'](objects))
+    return objects
+
+
+def bulk_update(model, serializer_class, items):
+    """校验并批量修改（每个条目需带 id，只修改提供的字段），返回修改后的对象列表"""
+    if not isinstance(items, list):
+        raise BulkValidationError([{'index': None, 'errors': '需要对象数组'}])
+    ids = [item.get('id') if isinstance(item, dict) else None for item in items]
+    instances = model.objects.in_bulk([pk for pk in ids if isinstance(pk, int)])
+
+    errors = []
+    changes = []
+    for index, (pk, item) in enumerate(zip(ids, items)):
+        instance = instances.get(pk) if isinstance(pk, int) else None
+        if instance is None:
+            errors.append({'index': index, 'errors': {'id': [f'记录 {pk} 不存在']}})
+            continue
+        serializer = serializer_class(instance, data=item, partial=True)
+        if not serializer.is_valid():
+            errors.append({'index': index, 'errors': serializer.errors})
+            continue
+        changes.append((instance, dict(serializer.validated_data)))
+    if errors:
+        raise BulkValidationError(errors)
+    if len({instance.pk for instance, _ in changes}) != len(changes):
+        raise BulkValidationError([{'index': None, 'errors': 'id 不能重复'}])
+    if not changes:
+        return []
+
+    spec = BULK_MODELS[model]
+    refresh_ranges = spec['refresh']([instance for instance, _ in changes])
+    m2m_values = [_pop_m2m(spec, attrs) for _, attrs in changes]
+    fields = set()
+    for instance, attrs in changes:
+        for name, value in attrs.items():
+            setattr(instance, name, value)
+        fields.update(attrs)
+        if 'prepare' in spec:
+            spec['prepare'](instance)
+    if model is CalendarOverride:
+        fields.add('effective_end_date')
+
+    objects = [instance for instance, _ in changes]
+    with transaction.atomic():
+        if fields and objects:
+            model.objects.bulk_update(objects, sorted(fields), batch_size=BULK_BATCH_SIZE)
+        if any(m2m_values):
+            _write_m2m(model, objects, m2m_values)
+        _after_write(model, refresh_ranges + spec['refresh'](objects))
+    return objects
+
+
+def bulk_delete(model, ids):
+    """批量删除，返回 (删除的记录数, 不存在的 id 列表)"""
+    if not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids):
+        raise BulkValidationError([{'index': None, 'errors': 'ids 需要整数数组'}])
+    spec = BULK_MODELS[model]
+    objects = list(model.objects.filter(id__in=ids))
+    found = {obj.id for obj in objects}
+    missing = [pk for pk in ids if pk not in found]
+
+    if not objects:
+        return 0, missing
+
+    # 删除人员时物化行随人员级联删除，无需刷新，只记录删除的人员（增量排班接口据此返回 removed_persons）
+    refresh_ranges = [] if model is Person else spec['refresh'](objects)
+    with transaction.atomic():
+        with suspended():
+            model.objects.filter(id__in=found).delete()
+        if model is Person:
+            bump_data_version(model.__name__, *spec.get('cascade', ()))
+            record_change(found, model=model.__name__)
+        else:
+            _after_write(model, refresh_ranges, spec.get('cascade', ()))
+    return len(objects), missing
+
+
+def update_week_configs(configs):
+    """
+    批量更新各班次的大小周配置：一次查询取出班次、一次 bulk_update 写入
+
+    任一班次不存在时抛出 ShiftDefinition.DoesNotExist，不写入任何配置。
+    """
+    updates = {}
+    for config_data in configs:
+        shift_type_id = config_data.get('shift_type') or config_data.get('shiftType')
+        if shift_type_id:
+            try:
+                updates[int(shift_type_id)] = config_data
+            except (TypeError, ValueError):
+                raise ShiftDefinition.DoesNotExist(f'班次ID {shift_type_id} 不存在')
+    if not updates:
+        return
+
+    shifts = ShiftDefinition.objects.in_bulk(list(updates))
+    for shift_type_id in updates:
+        if shift_type_id not in shifts:
+            raise ShiftDefinition.DoesNotExist(f'班次ID {shift_type_id} 不存在')
+
+    for shift_type_id, config_data in updates.items():
+        shift_definition = shifts[shift_type_id]
+        shift_definition.big_week = config_data.get('big_week', config_data.get('bigWeek', []))
+        shift_definition.small_week = config_data.get('small_week', config_data.get('smallWeek', []))
+
+    shift_ids = [shift.id for shift in shifts.values()]
+    person_ids = Person.objects.filter(
+        Q(shift_type_id__in=shift_ids) |
+        Q(rotation_group__odd_shift_id__in=shift_ids) |
+        Q(rotation_group__even_shift_id__in=shift_ids)
+    ).values_list('id', flat=True)
+    with transaction.atomic():
+        ShiftDefinition.objects.bulk_update(list(shifts.values()), ['big_week', 'small_week'])
+        _after_write(ShiftDefinition, [(set(person_ids), None, None)])
+    for shift_id in shift_ids:
+        work_calendar.invalidate_shift(shift_id)
@@ -0,0 +1,83 @@
+"""
+条件请求（ETag / Last-Modified）
+
+ETag 由请求路径（含查询参数）与相关模型的版本号计算，Last-Modified 取相关模型的最近更新时间。
+数据未变化时直接返回 304，不查询、不序列化数据。
+"""
+import hashlib
+
+from django.http import HttpResponseNotModified
+from django.utils.http import http_date, parse_etags, quote_etag
+from django.views.decorators.http import condition
+
+from .versioning import DATA_VERSION, get_versions
+
+
+def _request_versions(request, model_names):
+    """同一请求内只查询一次版本号（condition 会分别调用 etag 与 last_modified 函数）"""
+    cache = getattr(request, '_model_versions', None)
+    if cache is None:
+        cache = request._model_versions = {}
+    key = tuple(model_names)
+    if key not in cache:
+        cache[key] = get_versions(model_names)
+    return cache[key]
+
+
+def make_etag(parts, versions):
+    digest = hashlib.md5(
+        '|'.join(str(part) for part in parts).encode('utf-8'),
+        usedforsecurity=False
+    ).hexdigest()
+    return '{}-{}'.format(digest[:16], '.'.join(str(versions[name][0]) for name in sorted(versions)))
+
+
+def _last_modified(versions):
+    timestamps = [updated_at for _, updated_at in versions.values() if updated_at is not None]
+    return max(timestamps) if timestamps else None
+
+
+def versioned(*model_names):
+    """
+    列表/详情视图的条件请求装饰器，放在 @api_view 之下
+
+    model_names 为响应内容依赖的模型（含序列化时引用的关联模型），任一模型变更后 ETag 随之变化。
+    """
+    def etag_func(request, *args, **kwargs):
+        versions = _request_versions(request, model_names)
+        return make_etag([request.get_full_path()], versions)
+
+    def last_modified_func(request, *args, **kwargs):
+        return _last_modified(_request_versions(request, model_names))
+
+    return condition(etag_func=etag_func, last_modified_func=last_modified_func)
+
+
+def schedule_validators(request, params):
+    """排班结果的 (ETag, Last-Modified)，取决于请求参数与整体数据版本"""
+    versions = _request_versions(request, [DATA_VERSION])
+    return quote_etag(make_etag([request.path, *params], versions)), _last_modified(versions)
+
+
+def not_modified_response(request, etag, last_modified):
+    """
+    POST 生成排班的条件请求：If-None-Match 命中时返回 304，否则返回 None
+
+    django 的 condition 对非 GET 请求命中 If-None-Match 时返回 412，因此这里单独处理。
+    """
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if not if_none_match:
+        return None
+    etags = parse_etags(if_none_match)
+    if '*' not in etags and etag not in etags:
+        return None
+    response = HttpResponseNotModified()
+    set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    response.headers['ETag'] = etag
+    if last_modified is not None:
+        response.headers['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
@@ -0,0 +1,146 @@
+"""
+列表接口的快速只读序列化
+
+ModelSerializer 对每一行都要经过字段实例的 get_attribute / to_representation，上千行时成为响应耗时的主要部分。
+这里按序列化器的字段定义预先编译一次读取方案（同一序列化器与字段裁剪组合只编译一次）：
+
+- 每个输出字段对应一个 .values() 路径，关联对象的字段（source='group.name'）以 group__name 的关联查询一次取出
+- 输出键按序列化器的字段顺序预先排好，原样输出的字段不做转换，日期、时间、选项等字段直接调用该字段的 to_representation
+- 与 DRF 行为一致：关联对象为空时，带点号 source 的只读字段不输出（DRF 抛出 SkipField），值为 None 时输出 None
+
+无法保证与序列化器输出一致的字段（多对多、SerializerMethodField、自定义 to_representation 等）不编译，
+compile_plan 返回 None，调用方退回普通序列化器。
+"""
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import fields as drf_fields
+from rest_framework import relations, serializers
+
+# 对数据库取出的值原样返回的 to_representation 实现
+_IDENTITY_REPRESENTATIONS = {
+    drf_fields.IntegerField.to_representation,
+    drf_fields.CharField.to_representation,
+    drf_fields.BooleanField.to_representation,
+    drf_fields.JSONField.to_representation,
+}
+
+# 输出只含 str、int、bool、None 的字段类型（JSONField 的内容可能含浮点数，不在其中）
+_PRIMITIVE_FIELDS = (
+    drf_fields.IntegerField, drf_fields.CharField, drf_fields.BooleanField, drf_fields.ChoiceField,
+    drf_fields.DateField, drf_fields.TimeField, drf_fields.DateTimeField, relations.PrimaryKeyRelatedField,
+)
+
+
+class ValuesPlan:
+    """
+    一个序列化器（及字段裁剪）的 .values() 读取方案
+
+    paths:     .values() 的查询路径
+    columns:   [(输出键, 值路径, 转换函数或 None, 需非空的关联路径元组), ...]，按输出顺序
+    primitive: 输出是否只含 str、int、bool、None（可交给 renderers.primitive_response）
+    """
+
+    def __init__(self, paths, columns, primitive=False):
+        self.paths = paths
+        self.columns = columns
+        self.primitive = primitive
+        # 输出键与查询路径一一对应且无需转换时，.values() 的结果即为输出
+        self.direct = all(
+            key == path and convert is None and not guards for key, path, convert, guards in columns
+        ) and [column[0] for column in columns] == list(paths)
+
+    def values(self, queryset, *extra):
+        """按方案查询 .values()，extra 为额外需要的路径（如排序字段），不出现在输出中"""
+        return queryset.values(*self.paths, *(path for path in extra if path not in self.paths))
+
+    def rows(self, values):
+        """把 values() 的结果（可以是已取出的列表）转换为与序列化器相同的输出"""
+        if self.direct and (not values or len(values[0]) == len(self.paths)):
+            return list(values)
+        columns = self.columns
+        result = []
+        for row in values:
+            item = {}
+            for key, path, convert, guards in columns:
+                if guards and any(row[guard] is None for guard in guards):
+                    continue
+                value = row[path]
+                item[key] = value if value is None or convert is None else convert(value)
+            result.append(item)
+        return result
+
+
+def _model_field(model, name):
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+
+
+def _column(model, field):
+    """单个序列化器字段的 (值路径, 转换函数, 关联路径)，不支持时返回 None"""
+    if isinstance(field, (relations.ManyRelatedField, serializers.SerializerMethodField, serializers.BaseSerializer)):
+        return None
+    attrs = field.source_attrs
+    if not attrs or field.source == '*':
+        return None
+
+    # 除最后一项外均须为正向外键（source='group.name'）
+    guards = []
+    current = model
+    for index, attr in enumerate(attrs[:-1]):
+        model_field = _model_field(current, attr)
+        if model_field is None or not (model_field.many_to_one or model_field.one_to_one) \
+                or not model_field.concrete:
+            return None
+        guards.append('__'.join(attrs[:index + 1]))
+        current = model_field.related_model
+    if guards and (field.default is not drf_fields.empty or field.allow_null or field.required):
+        # 关联为空时 DRF 返回默认值或 None 而不是跳过，这类字段不编译
+        return None
+
+    model_field = _model_field(current, attrs[-1])
+    if model_field is None or not model_field.concrete or model_field.many_to_many:
+        return None
+    path = '__'.join(attrs)
+
+    if isinstance(field, relations.PrimaryKeyRelatedField):
+        # 外键输出主键：.values() 取出的即为主键值
+        if guards or field.pk_field is not None or not model_field.is_relation:
+            return None
+        return path, None, ()
+    if isinstance(field, relations.RelatedField) or model_field.is_relation:
+        return None
+    if getattr(field, 'binary', False):
+        return None
+    representation = type(field).to_representation
+    convert = None if representation in _IDENTITY_REPRESENTATIONS else field.to_representation
+    return path, convert, tuple(guards)
+
+
+@lru_cache(maxsize=128)
+def compile_plan(serializer_class, fields=None):
+    """
+    编译序列化器的 .values() 读取方案，fields 为字段裁剪元组（SparseFieldsMixin）
+
+    不能保证与序列化器输出一致时返回 None。
+    """
+    if serializer_class.to_representation is not serializers.Serializer.to_representation:
+        return None
+    serializer = serializer_class(fields=list(fields) if fields else None)
+    model = serializer.Meta.model
+    paths = []
+    columns = []
+    primitive = True
+    for field in serializer._readable_fields:
+        column = _column(model, field)
+        if column is None:
+            return None
+        path, convert, guards = column
+        for name in (path, *guards):
+            if name not in paths:
+                paths.append(name)
+        columns.append((field.field_name, path, convert, guards))
+        primitive = primitive and isinstance(field, _PRIMITIVE_FIELDS)
+    return ValuesPlan(tuple(paths), columns, primitive)
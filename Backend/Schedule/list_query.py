@@ -0,0 +1,105 @@
+"""
+列表接口的过滤、排序、游标分页与字段裁剪
+
+- 过滤：各列表视图把查询参数转换为 ORM 条件，日期范围条件与 Absence/CalendarOverride 上的区间索引对应
+- 排序：ordering=id（默认）或日期字段，均以 id 作为次序保证稳定
+- 分页：带 cursor 或 limit 参数时按游标（键集）分页，返回 {"next", "previous", "results"}；
+  不带时返回完整列表，与原接口兼容
+- 字段：fields=a,b,c 只输出指定字段
+- 序列化：序列化器可编译为 .values() 读取方案时（fast_serializers）走快速路径，并以 orjson 渲染，
+  输出与序列化器逐字节相同
+"""
+from django.utils.dateparse import parse_date
+from rest_framework import status
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+from .fast_serializers import compile_plan
+from .renderers import primitive_response
+
+
+class QueryParamError(ValueError):
+    """查询参数不合法"""
+
+
+class ListCursorPagination(CursorPagination):
+    page_size = 100
+    page_size_query_param = 'limit'
+    max_page_size = 1000
+
+    def __init__(self, ordering):
+        self.ordering = ordering
+
+
+def int_param(request, name):
+    value = request.query_params.get(name)
+    if value in (None, ''):
+        return None
+    if not value.isdigit():
+        raise QueryParamError(f'{name} 必须是整数')
+    return int(value)
+
+
+def date_param(request, name):
+    value = request.query_params.get(name)
+    if value in (None, ''):
+        return None
+    parsed = parse_date(value)
+    if parsed is None:
+        raise QueryParamError(f'{name} 必须是 YYYY-MM-DD 格式的日期')
+    return parsed
+
+
+def date_range_params(request):
+    """from、to 日期参数，from 晚于 to 时报错"""
+    start_date = date_param(request, 'from')
+    end_date = date_param(request, 'to')
+    if start_date and end_date and start_date > end_date:
+        raise QueryParamError('from 不能晚于 to')
+    return start_date, end_date
+
+
+def sparse_fields(request):
+    value = request.query_params.get('fields')
+    if not value:
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def list_response(request, queryset, serializer_class, orderings):
+    """
+    按请求参数排序、分页并序列化列表
+
+    orderings: {ordering 参数值: 排序字段元组}，第一项为默认排序
+    """
+    ordering_name = request.query_params.get('ordering') or next(iter(orderings))
+    if ordering_name not in orderings:
+        return Response(
+            {'error': f'ordering 只支持: {", ".join(orderings)}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    ordering = orderings[ordering_name]
+    fields = sparse_fields(request)
+    paginated = 'cursor' in request.query_params or 'limit' in request.query_params
+
+    plan = compile_plan(serializer_class, tuple(fields) if fields else None)
+    if plan is not None:
+        # 游标分页按排序字段取位置，不在输出字段中时一并查询
+        values = plan.values(queryset, *ordering)
+        if paginated:
+            paginator = ListCursorPagination(ordering)
+            page = paginator.paginate_queryset(values, request)
+            response = paginator.get_paginated_response(plan.rows(page))
+            response.primitive_data = plan.primitive
+            return response
+        rows = plan.rows(values.order_by(*ordering))
+        return primitive_response(rows) if plan.primitive else Response(rows)
+
+    if paginated:
+        paginator = ListCursorPagination(ordering)
+        page = paginator.paginate_queryset(queryset, request)
+        serializer = serializer_class(page, many=True, fields=fields)
+        return paginator.get_paginated_response(serializer.data)
+
+    serializer = serializer_class(queryset.order_by(*ordering), many=True, fields=fields)
+    return Response(serializer.data)
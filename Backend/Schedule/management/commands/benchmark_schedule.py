@@ -0,0 +1,197 @@
+"""
+排班生成性能基准
+
+对当前数据库中的数据逐项测量：
+- 每个月份的 generate_schedule、全年的 generate_year_schedule
+- 主要接口（生成排班、列表、导出）的端到端耗时
+
+每项记录最短/平均耗时、数据库查询数（CaptureQueriesContext）与峰值内存（tracemalloc，单独运行一次测量），
+结果写入 JSON 文件。测量期间不读写物化排班（SCHEDULE_MATERIALIZED_STORE 视为关闭），不会改动数据库中的数据。
+指定 --baseline 时与基线对比，耗时或内存超出容差、查询数增加都视为性能回退，命令以非零状态退出。
+
+示例:
+    SCHEDULE_SQLITE=bench.sqlite3 python manage.py benchmark_schedule --year 2025 --output bench.json
+    SCHEDULE_SQLITE=bench.sqlite3 python manage.py benchmark_schedule --year 2025 --baseline bench.json
+"""
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from datetime import date, datetime
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment,
+)
+
+from Schedule.models import ShiftDefinition, GroupConfig, ShiftRotationGroup, Person, Absence, CalendarOverride
+from Schedule.schedule_generator import ENGINES, generate_schedule, generate_year_schedule
+
+
+def _reset_caches():
+    """每次测量前清空本进程的结果缓存，测量的是未命中缓存时的耗时（物化排班在测量期间不使用）"""
+    caches[getattr(settings, 'SCHEDULE_CACHE_ALIAS', None) or 'default'].clear()
+
+
+def _dataset():
+    return {
+        model.__name__: model.objects.count()
+        for model in (ShiftDefinition, GroupConfig, ShiftRotationGroup, Person, Absence, CalendarOverride)
+    }
+
+
+def measure(func, repeat):
+    """返回 {"seconds_min", "seconds_mean", "queries", "peak_memory_kb"}"""
+    timings = []
+    queries = 0
+    for _ in range(repeat):
+        _reset_caches()
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        queries = len(context.captured_queries)
+
+    _reset_caches()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'seconds_min': round(min(timings), 6),
+        'seconds_mean': round(statistics.mean(timings), 6),
+        'queries': queries,
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def compare(results, baseline, time_tolerance, memory_tolerance):
+    """与基线对比，返回回退项描述列表"""
+    regressions = []
+    for name, base in baseline['results'].items():
+        current = results['results'].get(name)
+        if current is None:
+            continue
+        if current['seconds_min'] > base['seconds_min'] * (1 + time_tolerance):
+            regressions.append(f"{name}: 耗时 {current['seconds_min']:.4f}s，基线 {base['seconds_min']:.4f}s")
+        if current['queries'] > base['queries']:
+            regressions.append(f"{name}: 查询数 {current['queries']}，基线 {base['queries']}")
+        if current['peak_memory_kb'] > base['peak_memory_kb'] * (1 + memory_tolerance):
+            regressions.append(
+                f"{name}: 峰值内存 {current['peak_memory_kb']}KB，基线 {base['peak_memory_kb']}KB"
+            )
+    return regressions
+
+
+class Command(BaseCommand):
+    help = '测量排班生成与主要接口的耗时、查询数与峰值内存，并可与基线对比'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, default=date.today().year)
+        parser.add_argument('--months', type=int, nargs='*', default=list(range(1, 13)),
+                            help='逐月测量的月份，默认 1-12')
+        parser.add_argument('--engine', choices=ENGINES, default='python')
+        parser.add_argument('--repeat', type=int, default=3, help='每项重复次数，取最短耗时对比')
+        parser.add_argument('--output', default='benchmark_results.json', help='结果 JSON 文件')
+        parser.add_argument('--baseline', help='基线 JSON 文件（之前 --output 的结果）')
+        parser.add_argument('--time-tolerance', type=float, default=0.25, help='耗时容差比例')
+        parser.add_argument('--memory-tolerance', type=float, default=0.25, help='峰值内存容差比例')
+        parser.add_argument('--skip-endpoints', action='store_true', help='只测量生成函数，不测接口')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('repeat 必须大于 0')
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as f:
+                baseline = json.load(f)
+
+        year, engine, repeat = options['year'], options['engine'], options['repeat']
+        cases = [
+            (f'month:{year}-{month:02d}',
+             lambda year_month=f'{year}-{month:02d}': generate_schedule(year_month, engine=engine))
+            for month in options['months']
+        ]
+        cases.append((f'year:{year}', lambda: generate_year_schedule(year, engine=engine)))
+        if not options['skip_endpoints']:
+            cases.extend(self._endpoint_cases(year, engine))
+
+        results = {
+            'meta': {
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'year': year,
+                'engine': engine,
+                'repeat': repeat,
+                'python': platform.python_version(),
+                'database': connection.vendor,
+                'dataset': _dataset(),
+            },
+            'results': {},
+        }
+
+        setup_test_environment()
+        # 绕过物化排班：测量规则计算本身，且不删除、不写入数据库中的物化结果
+        store_disabled = override_settings(SCHEDULE_MATERIALIZED_STORE=False)
+        store_disabled.enable()
+        try:
+            for name, func in cases:
+                results['results'][name] = measure(func, repeat)
+                item = results['results'][name]
+                self.stdout.write(
+                    f"{name:<40} {item['seconds_min'] * 1000:10.1f} ms  "
+                    f"{item['queries']:5d} 查询  {item['peak_memory_kb']:10.1f} KB"
+                )
+        finally:
+            store_disabled.disable()
+            teardown_test_environment()
+            _reset_caches()
+
+        with open(options['output'], 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        self.stdout.write(f"结果已写入 {options['output']}")
+
+        if baseline is None:
+            return
+        if baseline['meta'].get('dataset') != results['meta']['dataset']:
+            raise CommandError('当前数据集与基线不一致，无法对比（请用相同参数重新生成数据）')
+        regressions = compare(results, baseline, options['time_tolerance'], options['memory_tolerance'])
+        if regressions:
+            raise CommandError('性能回退:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('未发现性能回退'))
+
+    @staticmethod
+    def _endpoint_cases(year, engine):
+        client = Client()
+
+        def request(method, path, data=None):
+            def run():
+                if method == 'post':
+                    response = client.post(path, json.dumps(data), content_type='application/json')
+                else:
+                    response = client.get(path, data)
+                if response.status_code != 200:
+                    raise CommandError(f'{path} 返回 {response.status_code}')
+                if response.streaming:
+                    for _ in response.streaming_content:
+                        pass
+            return run
+
+        return [
+            ('endpoint:generate-schedule',
+             request('post', '/api/generate-schedule/', {'year_month': f'{year}-01', 'engine': engine})),
+            ('endpoint:generate-year-schedule',
+             request('post', '/api/generate-year-schedule/', {'year': str(year), 'engine': engine})),
+            ('endpoint:persons', request('get', '/api/persons/')),
+            ('endpoint:absences', request('get', '/api/absences/')),
+            ('endpoint:calendar-overrides', request('get', '/api/calendar-overrides/')),
+            ('endpoint:schedule-export-csv',
+             request('get', '/api/schedule-export/', {'year_month': f'{year}-01', 'type': 'csv', 'engine': engine})),
+        ]
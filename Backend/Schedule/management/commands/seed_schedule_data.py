@@ -0,0 +1,167 @@
+"""
+生成合成排班数据集
+
+示例:
+    SCHEDULE_SQLITE=bench.sqlite3 python manage.py migrate
+    SCHEDULE_SQLITE=bench.sqlite3 python manage.py seed_schedule_data --persons 2000 --groups 40 --noinput
+"""
+import random
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from Schedule.models import (
+    ShiftDefinition, GroupConfig, ShiftRotationGroup, Person, Absence, CalendarOverride,
+    MaterializedScheduleMonth,
+)
+from Schedule.schedule_changes import record_change
+from Schedule.signals import VERSIONED_MODELS, suspended
+from Schedule.versioning import bump_data_version
+
+BATCH_SIZE = 1000
+ABSENCE_TYPES = [choice for choice, _ in Absence.ABSENCE_TYPE_CHOICES]
+SCOPES = [choice for choice, _ in CalendarOverride.SCOPE_CHOICES]
+
+
+class Command(BaseCommand):
+    help = '清空排班相关数据并按指定规模生成合成数据集（用于性能测试）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--persons', type=int, default=500, help='人员数')
+        parser.add_argument('--groups', type=int, default=10, help='组数')
+        parser.add_argument('--shifts', type=int, default=4, help='班次数')
+        parser.add_argument('--rotation-groups', type=int, default=4, help='轮换组合数')
+        parser.add_argument('--rotation-ratio', type=float, default=0.3, help='使用轮换组合的人员比例')
+        parser.add_argument('--ungrouped-ratio', type=float, default=0.05, help='未分组人员比例')
+        parser.add_argument('--absence-density', type=float, default=4.0, help='每人每年平均请假次数')
+        parser.add_argument('--absence-max-days', type=int, default=7, help='单次请假最长天数')
+        parser.add_argument('--overrides', type=int, default=30, help='日历覆盖规则数')
+        parser.add_argument('--override-span', type=int, default=7, help='覆盖规则最长跨度（天）')
+        parser.add_argument('--year', type=int, default=date.today().year, help='请假与覆盖规则所在年份')
+        parser.add_argument('--seed', type=int, default=42, help='随机种子，相同参数与种子生成相同数据')
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive',
+                            help='不询问确认，直接清空现有数据')
+
+    def handle(self, *args, **options):
+        if options['persons'] <= 0 or options['shifts'] <= 0 or options['groups'] <= 0:
+            raise CommandError('persons、shifts、groups 必须大于 0')
+        if options['interactive']:
+            answer = input('将清空现有的人员、班次、组、请假与日历覆盖数据，输入 yes 继续: ')
+            if answer != 'yes':
+                raise CommandError('已取消')
+
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            removed_ids = list(Person.objects.values_list('id', flat=True))
+            with suspended():
+                for model in (Absence, CalendarOverride, MaterializedScheduleMonth, Person,
+                              ShiftRotationGroup, GroupConfig, ShiftDefinition):
+                    model.objects.all().delete()
+            counts = self._seed(rng, options)
+            # 全部数据被替换：版本只加一，记录删除的人员与全部人员、全部日期的变更
+            bump_data_version(*(model.__name__ for model in VERSIONED_MODELS))
+            record_change(removed_ids)
+            record_change()
+
+        self.stdout.write(self.style.SUCCESS(
+            '已生成: ' + ', '.join(f'{name} {count}' for name, count in counts.items())
+        ))
+
+    def _seed(self, rng, options):
+        year_start = date(options['year'], 1, 1)
+        days_in_year = (date(options['year'] + 1, 1, 1) - year_start).days
+
+        shifts = []
+        for index in range(options['shifts']):
+            start_hour = 6 + (index * 4) % 16
+            big_week = sorted(rng.sample(range(7), rng.randint(4, 6)))
+            shifts.append(ShiftDefinition(
+                name=f'班次{index + 1}',
+                start_time=f'{start_hour:02d}:00',
+                end_time=f'{(start_hour + 9) % 24:02d}:00',
+                big_week=big_week,
+                small_week=[day for day in big_week if day < 5],
+            ))
+        shifts = self._bulk_create(ShiftDefinition, shifts)
+
+        groups = self._bulk_create(GroupConfig, [
+            GroupConfig(name=f'组{index + 1}') for index in range(options['groups'])
+        ])
+        rotation_groups = self._bulk_create(ShiftRotationGroup, [
+            ShiftRotationGroup(name=f'轮换{index + 1}', odd_shift=rng.choice(shifts), even_shift=rng.choice(shifts))
+            for index in range(options['rotation_groups'])
+        ])
+
+        persons = []
+        for index in range(options['persons']):
+            use_rotation = rotation_groups and rng.random() < options['rotation_ratio']
+            persons.append(Person(
+                name=f'员工{index + 1:05d}',
+                uid=f'U{index + 1:06d}',
+                group=None if rng.random() < options['ungrouped_ratio'] else rng.choice(groups),
+                shift_type=rng.choice(shifts),
+                rotation_group=rng.choice(rotation_groups) if use_rotation else None,
+            ))
+        persons = self._bulk_create(Person, persons)
+
+        absences = []
+        for person in persons:
+            # 每人请假次数取 0 ~ 2 倍平均值，均值为 absence_density
+            for _ in range(rng.randint(0, round(options['absence_density'] * 2))):
+                start_date = year_start + timedelta(days=rng.randrange(days_in_year))
+                absences.append(Absence(
+                    person=person,
+                    start_date=start_date,
+                    end_date=start_date + timedelta(days=rng.randrange(options['absence_max_days'])),
+                    type=rng.choice(ABSENCE_TYPES),
+                    count_as_rest=rng.random() < 0.3,
+                ))
+        Absence.objects.bulk_create(absences, batch_size=BATCH_SIZE)
+
+        overrides = []
+        target_persons = []
+        for _ in range(options['overrides']):
+            start_date = year_start + timedelta(days=rng.randrange(days_in_year))
+            span = rng.randrange(options['override_span'])
+            scope = rng.choice(SCOPES)
+            group, person = rng.choice(groups), rng.choice(persons)
+            rotation_group = rng.choice(rotation_groups) if rotation_groups else None
+            target = {
+                '全员': None,
+                '指定组': group.name,
+                '指定人员': person.name,
+                '指定轮换组合': rotation_group.name if rotation_group else '',
+            }[scope]
+            end_date = start_date + timedelta(days=span) if span else None
+            overrides.append(CalendarOverride(
+                date=start_date,
+                end_date=end_date,
+                effective_end_date=end_date or start_date,
+                override_type=rng.choice(['上班', '休息']),
+                scope=scope,
+                target=target,
+                target_group=group if scope == '指定组' else None,
+                target_rotation_group=rotation_group if scope == '指定轮换组合' else None,
+                priority=rng.randint(0, 3),
+            ))
+            target_persons.append(person if scope == '指定人员' else None)
+        overrides = self._bulk_create(CalendarOverride, overrides)
+        Through = CalendarOverride.target_persons.through
+        Through.objects.bulk_create([
+            Through(calendaroverride_id=override.id, person_id=person.id)
+            for override, person in zip(overrides, target_persons) if person is not None
+        ], batch_size=BATCH_SIZE)
+
+        return {
+            '班次': len(shifts), '组': len(groups), '轮换组合': len(rotation_groups),
+            '人员': len(persons), '请假': len(absences), '日历覆盖': len(overrides),
+        }
+
+    @staticmethod
+    def _bulk_create(model, objects):
+        """批量插入；数据库不返回主键时（如 MySQL）按插入顺序重新读取"""
+        created = model.objects.bulk_create(objects, batch_size=BATCH_SIZE)
+        if created and created[0].pk is None:
+            created = list(model.objects.order_by('id'))
+        return created
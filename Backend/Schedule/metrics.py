@@ -0,0 +1,102 @@
+"""
+进程内的请求指标（Prometheus 文本格式）
+
+ServerTimingMiddleware 在每个请求结束时记录：
+    schedule_request_duration_seconds{view}          请求总耗时
+    schedule_request_db_seconds{view}                数据库耗时
+    schedule_request_queries{view}                   查询次数
+    schedule_phase_duration_seconds{view, phase}     排班生成与渲染各阶段耗时
+
+指标保存在当前进程内，多进程部署时每个进程各自统计。
+"""
+import threading
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, name, documentation, label_names, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        label_values = tuple(label_values)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted(
+                (label_values, dict(series, counts=list(series['counts'])))
+                for label_values, series in self._series.items()
+            )
+        for label_values, series in items:
+            for bound, count in zip(self.buckets, series['counts']):
+                labels = _format_labels(self.label_names, label_values, ('le', _format_number(bound)))
+                lines.append(f'{self.name}_bucket{labels} {count}')
+            labels = _format_labels(self.label_names, label_values, ('le', '+Inf'))
+            lines.append(f'{self.name}_bucket{labels} {series["count"]}')
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f'{self.name}_sum{labels} {_format_number(series["sum"])}')
+            lines.append(f'{self.name}_count{labels} {series["count"]}')
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    'schedule_request_duration_seconds', '请求总耗时（秒）', ['view'], SECONDS_BUCKETS)
+REQUEST_DB_DURATION = Histogram(
+    'schedule_request_db_seconds', '请求内数据库耗时（秒）', ['view'], SECONDS_BUCKETS)
+REQUEST_QUERIES = Histogram(
+    'schedule_request_queries', '请求内数据库查询次数', ['view'], QUERY_BUCKETS)
+PHASE_DURATION = Histogram(
+    'schedule_phase_duration_seconds', '排班生成与渲染各阶段耗时（秒）', ['view', 'phase'], SECONDS_BUCKETS)
+
+HISTOGRAMS = (REQUEST_DURATION, REQUEST_DB_DURATION, REQUEST_QUERIES, PHASE_DURATION)
+
+
+def observe_request(view, total_seconds, timing):
+    REQUEST_DURATION.observe((view,), total_seconds)
+    REQUEST_DB_DURATION.observe((view,), timing.db_seconds)
+    REQUEST_QUERIES.observe((view,), timing.queries)
+    for phase, seconds in timing.phases.items():
+        PHASE_DURATION.observe((view, phase), seconds)
+
+
+def render_metrics(extra_lines=()):
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    lines.extend(extra_lines)
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,83 @@
+"""
+请求耗时中间件
+
+为每个请求记录查询次数、数据库耗时、排班生成各阶段耗时与响应渲染耗时：
+- 以 Server-Timing 响应头返回（浏览器开发者工具 Network → Timing 中可见），由 SCHEDULE_SERVER_TIMING 控制
+- 汇总到进程内直方图，由 /api/metrics 以 Prometheus 文本格式输出
+
+流式响应在中间件返回之后才生成内容，只记录到返回响应为止的耗时。
+同时支持 WSGI 与 ASGI：ASGI 下同步视图在请求专用的线程中执行，查询统计装在该线程的数据库连接上。
+"""
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+
+from . import metrics, request_timing
+
+
+def _add_db_wrapper(wrapper):
+    connection.execute_wrappers.append(wrapper)
+
+
+def _remove_db_wrapper(wrapper):
+    connection.execute_wrappers.remove(wrapper)
+
+
+class ServerTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timing, token = request_timing.start()
+        started = perf_counter()
+        try:
+            with connection.execute_wrapper(timing.db_wrapper):
+                response = self.get_response(request)
+        finally:
+            request_timing.finish(token)
+        return self._finish(request, response, timing, perf_counter() - started)
+
+    async def __acall__(self, request):
+        timing, token = request_timing.start()
+        started = perf_counter()
+        # 数据库连接按线程区分，统计装在执行同步代码的线程（与视图中的查询同一线程）上
+        await sync_to_async(_add_db_wrapper)(timing.db_wrapper)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(_remove_db_wrapper)(timing.db_wrapper)
+            request_timing.finish(token)
+        return self._finish(request, response, timing, perf_counter() - started)
+
+    def _finish(self, request, response, timing, total):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.url_name or match.view_name) if match else 'unmatched'
+        metrics.observe_request(view, total, timing)
+
+        if getattr(settings, 'SCHEDULE_SERVER_TIMING', True):
+            response['Server-Timing'] = self._header(timing, total)
+        return response
+
+    def process_template_response(self, request, response):
+        """DRF 的 Response 在视图返回后才渲染，渲染耗时通过渲染完成回调记录"""
+        timing = request_timing.current()
+        if timing is not None:
+            started = perf_counter()
+            response.add_post_render_callback(lambda _: timing.add('render', perf_counter() - started))
+        return response
+
+    @staticmethod
+    def _header(timing, total):
+        entries = [f'db;dur={timing.db_seconds * 1000:.1f};desc="{timing.queries} queries"']
+        entries.extend(f'{name};dur={seconds * 1000:.1f}' for name, seconds in timing.phases.items())
+        entries.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(entries)
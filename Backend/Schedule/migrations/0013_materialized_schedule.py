@@ -0,0 +1,50 @@
+# Generated by Django 6.0.1 on 2026-10-18 05:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Schedule', '0012_person_group_fk'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='calendaroverride',
+            name='scope',
+            field=models.CharField(choices=[('全员', '全员'), ('指定组', '指定组'), ('指定人员', '指定人员'), ('指定轮换组合', '指定轮换组合')], default='全员', max_length=20, verbose_name='作用范围'),
+        ),
+        migrations.CreateModel(
+            name='MaterializedScheduleMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year_month', models.CharField(max_length=7, verbose_name='月份')),
+                ('base_week_type', models.CharField(max_length=10, verbose_name='基准周类型')),
+                ('cross_month_continuous', models.BooleanField(default=True, verbose_name='跨月连续')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'db_table': 'materialized_schedule_month',
+                'unique_together': {('year_month', 'base_week_type', 'cross_month_continuous')},
+            },
+        ),
+        migrations.CreateModel(
+            name='MaterializedScheduleRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('person_name', models.CharField(max_length=50)),
+                ('group', models.CharField(max_length=50)),
+                ('rotation_group', models.CharField(blank=True, max_length=100)),
+                ('statuses', models.JSONField(default=list)),
+                ('shifts', models.JSONField(default=list)),
+                ('month', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rows', to='Schedule.materializedschedulemonth')),
+                ('person', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='Schedule.person')),
+            ],
+            options={
+                'db_table': 'materialized_schedule_row',
+                'unique_together': {('month', 'person')},
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 6.0.1 on 2026-10-18 05:53
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_effective_end_date(apps, schema_editor):
+    CalendarOverride = apps.get_model('Schedule', 'CalendarOverride')
+    CalendarOverride.objects.update(effective_end_date=Coalesce('end_date', 'date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Schedule', '0013_materialized_schedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calendaroverride',
+            name='effective_end_date',
+            field=models.DateField(editable=False, null=True, verbose_name='生效结束日期'),
+        ),
+        migrations.RunPython(fill_effective_end_date, reverse_code=migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='calendaroverride',
+            name='effective_end_date',
+            field=models.DateField(editable=False, help_text='end_date 为空时等于 date，由 save() 维护；批量写入时需自行填充', verbose_name='生效结束日期'),
+        ),
+        migrations.AddIndex(
+            model_name='absence',
+            index=models.Index(fields=['person', 'start_date', 'end_date'], name='absence_person_range_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='absence',
+            index=models.Index(fields=['end_date', 'start_date'], name='absence_range_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='calendaroverride',
+            index=models.Index(fields=['effective_end_date', 'date', 'priority'], name='override_range_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='calendaroverride',
+            index=models.Index(fields=['scope', 'target'], name='override_scope_idx'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 6.0.1 on 2026-10-18 06:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def link_targets(apps, schema_editor):
+    """按原有的名称匹配规则，把 target 名称关联到对应的组、人员、轮换组合"""
+    CalendarOverride = apps.get_model('Schedule', 'CalendarOverride')
+    GroupConfig = apps.get_model('Schedule', 'GroupConfig')
+    Person = apps.get_model('Schedule', 'Person')
+    ShiftRotationGroup = apps.get_model('Schedule', 'ShiftRotationGroup')
+    Through = CalendarOverride.target_persons.through
+
+    groups = dict(GroupConfig.objects.values_list('name', 'id'))
+    rotation_groups = dict(ShiftRotationGroup.objects.values_list('name', 'id'))
+    person_ids = {}
+    for person_id, name in Person.objects.values_list('id', 'name'):
+        person_ids.setdefault(name, []).append(person_id)
+
+    links = []
+    for override in CalendarOverride.objects.exclude(scope='全员').exclude(target__isnull=True).exclude(target=''):
+        if override.scope == '指定组' and override.target in groups:
+            override.target_group_id = groups[override.target]
+            override.save(update_fields=['target_group'])
+        elif override.scope == '指定轮换组合' and override.target in rotation_groups:
+            override.target_rotation_group_id = rotation_groups[override.target]
+            override.save(update_fields=['target_rotation_group'])
+        elif override.scope == '指定人员':
+            # 同名人员都受原规则影响，全部关联
+            links.extend(
+                Through(calendaroverride_id=override.id, person_id=person_id)
+                for person_id in person_ids.get(override.target, [])
+            )
+    Through.objects.bulk_create(links, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Schedule', '0015_data_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calendaroverride',
+            name='target_group',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='calendar_overrides', to='Schedule.groupconfig', verbose_name='目标组'),
+        ),
+        migrations.AddField(
+            model_name='calendaroverride',
+            name='target_persons',
+            field=models.ManyToManyField(blank=True, db_table='calendar_override_target_person', related_name='calendar_overrides', to='Schedule.person', verbose_name='目标人员'),
+        ),
+        migrations.AddField(
+            model_name='calendaroverride',
+            name='target_rotation_group',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='calendar_overrides', to='Schedule.shiftrotationgroup', verbose_name='目标轮换组合'),
+        ),
+        migrations.AlterField(
+            model_name='calendaroverride',
+            name='target',
+            field=models.CharField(blank=True, help_text='作用目标的名称，仅用于显示；指定组且未关联组时，"未分组" 表示未分组的人员', max_length=200, null=True, verbose_name='目标名称'),
+        ),
+        migrations.RunPython(link_targets, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0.1 on 2026-10-18 06:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Schedule', '0016_calendar_override_target_relations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(db_index=True, verbose_name='数据版本')),
+                ('person_ids', models.JSONField(blank=True, help_text='为空表示全部人员', null=True, verbose_name='人员ID')),
+                ('start_date', models.DateField(blank=True, null=True, verbose_name='开始日期')),
+                ('end_date', models.DateField(blank=True, null=True, verbose_name='结束日期')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'schedule_change',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-18 06:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Schedule', '0017_schedule_change'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='materializedschedulemonth',
+            name='stale_all',
+            field=models.BooleanField(default=False, verbose_name='全部待重算'),
+        ),
+        migrations.AddField(
+            model_name='materializedschedulemonth',
+            name='stale_person_ids',
+            field=models.JSONField(blank=True, default=list, verbose_name='待重算人员ID'),
+        ),
+    ]
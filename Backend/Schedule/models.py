@@ -81,6 +81,12 @@ class Absence(models.Model):
     class Meta:
         verbose_name = '请假/不可用'
         verbose_name_plural = '请假/不可用'
+        # 区间相交查询 start_date <= 范围结束 AND end_date >= 范围开始：
+        # 历史数据中 end_date 条件的选择性更高，因此 end_date 在前
+        indexes = [
+            models.Index(fields=['person', 'start_date', 'end_date'], name='absence_person_range_idx'),
+            models.Index(fields=['end_date', 'start_date'], name='absence_range_idx'),
+        ]
 
 
 class CalendarOverride(models.Model):
@@ -100,11 +106,106 @@ class CalendarOverride(models.Model):
     end_date = models.DateField(null=True, blank=True, verbose_name='结束日期')
     override_type = models.CharField(max_length=20, choices=OVERRIDE_TYPE_CHOICES, verbose_name='覆盖类型')
     scope = models.CharField(max_length=20, choices=SCOPE_CHOICES, default='全员', verbose_name='作用范围')
-    target = models.CharField(max_length=200, blank=True, null=True, verbose_name='目标(组名或人员)')
+    target = models.CharField(
+        max_length=200, blank=True, null=True, verbose_name='目标名称',
+        help_text='作用目标的名称，仅用于显示；指定组且未关联组时，"未分组" 表示未分组的人员'
+    )
+    target_group = models.ForeignKey(
+        GroupConfig, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='calendar_overrides', verbose_name='目标组'
+    )
+    target_persons = models.ManyToManyField(
+        Person, blank=True, related_name='calendar_overrides',
+        db_table='calendar_override_target_person', verbose_name='目标人员'
+    )
+    target_rotation_group = models.ForeignKey(
+        ShiftRotationGroup, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='calendar_overrides', verbose_name='目标轮换组合'
+    )
     reason = models.CharField(max_length=200, blank=True, null=True, verbose_name='原因')
     priority = models.IntegerField(default=0, verbose_name='优先级')
+    effective_end_date = models.DateField(
+        editable=False,
+        verbose_name='生效结束日期',
+        help_text='end_date 为空时等于 date，由 save() 维护；批量写入时需自行填充'
+    )
 
     class Meta:
         db_table = 'calendar_override'
         verbose_name = '日历覆盖'
         verbose_name_plural = '日历覆盖'
+        indexes = [
+            models.Index(fields=['effective_end_date', 'date', 'priority'], name='override_range_idx'),
+            models.Index(fields=['scope', 'target'], name='override_scope_idx'),
+        ]
+
+    def target_label(self):
+        """作用目标的当前名称（关联记录改名后随之变化）"""
+        if self.scope == '指定组' and self.target_group_id is not None:
+            return self.target_group.name
+        if self.scope == '指定人员':
+            names = [person.name for person in self.target_persons.all()]
+            if names:
+                return '、'.join(dict.fromkeys(names))
+        if self.scope == '指定轮换组合' and self.target_rotation_group_id is not None:
+            return self.target_rotation_group.name
+        return self.target
+
+    def save(self, *args, **kwargs):
+        self.effective_end_date = self.end_date or self.date
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and ('date' in update_fields or 'end_date' in update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'effective_end_date'}
+        super().save(*args, **kwargs)
+
+
+class MaterializedScheduleMonth(models.Model):
+    """已物化的排班月份（按生成参数区分）"""
+    year_month = models.CharField(max_length=7, verbose_name='月份')
+    base_week_type = models.CharField(max_length=10, verbose_name='基准周类型')
+    cross_month_continuous = models.BooleanField(default=True, verbose_name='跨月连续')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    # 数据变更后待重算的人员（stale_all 为 True 时全部人员），由后台或下次读取时重算
+    stale_all = models.BooleanField(default=False, verbose_name='全部待重算')
+    stale_person_ids = models.JSONField(default=list, blank=True, verbose_name='待重算人员ID')
+
+    class Meta:
+        db_table = 'materialized_schedule_month'
+        unique_together = ('year_month', 'base_week_type', 'cross_month_continuous')
+
+
+class MaterializedScheduleRow(models.Model):
+    """物化排班：每人每月一行，按日期顺序保存状态与班次"""
+    month = models.ForeignKey(MaterializedScheduleMonth, on_delete=models.CASCADE, related_name='rows')
+    person = models.ForeignKey(Person, on_delete=models.CASCADE)
+    person_name = models.CharField(max_length=50)
+    group = models.CharField(max_length=50)
+    rotation_group = models.CharField(max_length=100, blank=True)
+    statuses = models.JSONField(default=list)
+    shifts = models.JSONField(default=list)
+
+    class Meta:
+        db_table = 'materialized_schedule_row'
+        unique_together = ('month', 'person')
+
+
+class DataVersion(models.Model):
+    """数据版本计数器，数据变更时单调递增，用作缓存键"""
+    name = models.CharField(max_length=50, unique=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'data_version'
+
+
+class ScheduleChange(models.Model):
+    """排班变更记录：某个整体数据版本影响的人员与日期范围，用于增量获取排班"""
+    version = models.BigIntegerField(db_index=True, verbose_name='数据版本')
+    person_ids = models.JSONField(null=True, blank=True, verbose_name='人员ID', help_text='为空表示全部人员')
+    start_date = models.DateField(null=True, blank=True, verbose_name='开始日期')
+    end_date = models.DateField(null=True, blank=True, verbose_name='结束日期')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'schedule_change'
@@ -0,0 +1,111 @@
+"""
+调休/节假日覆盖的区间索引
+
+- 每条覆盖规则的作用范围按关联的组、人员、轮换组合 ID 预先解析为人员ID集合（全员为 None）
+- 以所有规则的起止日期切分出互不重叠的基本区间，每个区间保存按优先级降序排列的生效规则
+- 查询 某人某日的生效规则：二分定位区间 O(log n)，再取第一条作用于该人员的规则
+"""
+from bisect import bisect_right
+from datetime import timedelta
+
+
+def override_span(override):
+    """
+    覆盖规则实际生效的日期范围，无效时返回 None
+
+    与按月查询的条件保持一致：结束日期早于开始日期时，只有两者在同一个月内才按交换后的范围生效。
+    """
+    if override.end_date is None:
+        return override.date, override.date
+    if override.end_date >= override.date:
+        return override.date, override.end_date
+    if (override.date.year, override.date.month) == (override.end_date.year, override.end_date.month):
+        return override.end_date, override.date
+    return None
+
+
+def scope_key(override):
+    """作用范围相同的覆盖规则共用同一个键"""
+    return (
+        override.scope, override.target_group_id, override.target_rotation_group_id,
+        override.target_person_ids, override.target == '未分组',
+    )
+
+
+def resolve_scope(override, persons):
+    """
+    把覆盖规则的作用范围解析为人员ID集合，全员返回 None
+
+    指定组且未关联组时，目标名称为 "未分组" 表示未分组的人员；关联的记录已删除时不作用于任何人。
+    """
+    if override.scope == '全员':
+        return None
+    if override.scope == '指定组':
+        if override.target_group_id is not None:
+            return {
+                person.id for person in persons
+                if person.group is not None and person.group.id == override.target_group_id
+            }
+        if override.target == '未分组':
+            return {person.id for person in persons if person.group is None}
+        return set()
+    if override.scope == '指定人员':
+        return {person.id for person in persons if person.id in override.target_person_ids}
+    if override.scope == '指定轮换组合' and override.target_rotation_group_id is not None:
+        return {
+            person.id for person in persons
+            if person.rotation_group is not None and person.rotation_group.id == override.target_rotation_group_id
+        }
+    return set()
+
+
+class OverrideIndex:
+    """覆盖规则区间索引"""
+
+    def __init__(self, overrides, persons):
+        self.spans = []
+        scope_cache = {}
+        for override in overrides:
+            span = override_span(override)
+            if span is None:
+                continue
+            key = scope_key(override)
+            if key not in scope_cache:
+                scope_cache[key] = resolve_scope(override, persons)
+            person_ids = scope_cache[key]
+            if person_ids is not None and not person_ids:
+                continue
+            self.spans.append((span[0], span[1], override, person_ids))
+
+        # 基本区间边界：每个区间 [boundaries[i], boundaries[i + 1]) 内的生效规则相同
+        boundaries = set()
+        for start_date, end_date, _, _ in self.spans:
+            boundaries.add(start_date)
+            boundaries.add(end_date + timedelta(days=1))
+        self.boundaries = sorted(boundaries)
+        self.segments = [[] for _ in self.boundaries]
+        for start_date, end_date, override, person_ids in self.spans:
+            first = bisect_right(self.boundaries, start_date) - 1
+            last = bisect_right(self.boundaries, end_date) - 1
+            for index in range(first, last + 1):
+                self.segments[index].append((override, person_ids))
+        for segment in self.segments:
+            segment.sort(key=lambda item: (item[0].priority, item[0].id), reverse=True)
+
+    def overrides_on(self, day):
+        """某日生效的 (规则, 人员ID集合) 列表，按优先级降序"""
+        index = bisect_right(self.boundaries, day) - 1
+        if index < 0:
+            return []
+        return self.segments[index]
+
+    @staticmethod
+    def first_applicable(active, person_id):
+        for override, person_ids in active:
+            if person_ids is None or person_id in person_ids:
+                return override
+        return None
+
+    def effective(self, person_id, day):
+        """某人某日生效的覆盖规则（优先级最高者），没有时返回 None"""
+        return self.first_applicable(self.overrides_on(day), person_id)
@@ -0,0 +1,47 @@
+"""
+JSON 渲染
+
+FastJSONRenderer 替代 DRF 的 JSONRenderer：响应标记为只含基础类型（见 primitive_response）且安装了 orjson 时
+用 orjson 序列化，输出与 JSONRenderer 的紧凑格式逐字节相同；其他情况（浮点数、日期等需要 DRF 编码器的数据，
+或请求了缩进格式）交给 JSONRenderer。未安装 orjson 时行为与 JSONRenderer 完全相同。
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson 为可选依赖
+    orjson = None
+
+
+def primitive_response(data, **kwargs):
+    """
+    数据只含 str、int、bool、None 及其组成的 list/dict（不含浮点数）时使用的 Response
+
+    orjson 与标准库对浮点数的格式不同（1e+16 / 1e16），因此只对不含浮点数的数据使用 orjson。
+    """
+    response = Response(data, **kwargs)
+    response.primitive_data = True
+    return response
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get('response')
+        if (
+            orjson is None
+            or data is None
+            or not getattr(response, 'primitive_data', False)
+            or not self.compact
+            or self.ensure_ascii
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data)
+        except TypeError:
+            # 超出 64 位的整数等 orjson 不支持的值
+            return super().render(data, accepted_media_type, renderer_context)
+        # 与 JSONRenderer 一致，转义 \u2028、\u2029
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
@@ -0,0 +1,82 @@
+"""
+请求内的耗时记录
+
+ServerTimingMiddleware 为每个请求创建一个 RequestTiming 并放入上下文变量，
+排班生成等代码通过 phase() / lap() 把各阶段耗时计入当前请求；不在请求中（如命令行、进程池子进程）时不做记录。
+
+阶段名：
+    load       加载规则快照（含数据库查询）
+    dates      日期预计算（大小周、轮换月份）
+    overrides  覆盖规则区间索引构建
+    absences   请假区间索引构建
+    loop       逐格计算 / 矩阵计算
+    sort       排序
+    store      物化排班的写入与读取展开
+    cache      排班结果缓存读写（序列化/反序列化）
+    render     响应渲染（JSON 序列化）
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+_current = ContextVar('schedule_request_timing', default=None)
+
+
+class RequestTiming:
+    def __init__(self):
+        self.phases = {}
+        self.queries = 0
+        self.db_seconds = 0.0
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        """connection.execute_wrapper 使用，统计查询次数与耗时"""
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_seconds += perf_counter() - started
+
+
+def start():
+    """开始记录当前请求，返回 (RequestTiming, 用于 finish 的令牌)"""
+    timing = RequestTiming()
+    return timing, _current.set(timing)
+
+
+def finish(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def phase(name):
+    """把代码块的耗时计入当前请求的 name 阶段"""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, perf_counter() - started)
+
+
+def lap(name, started):
+    """
+    把 started 至今的耗时计入当前请求的 name 阶段，返回新的起点
+
+    用于生成器内部分段计时（with 块不能跨越 yield）。
+    """
+    now = perf_counter()
+    timing = _current.get()
+    if timing is not None:
+        timing.add(name, now - started)
+    return now
@@ -0,0 +1,77 @@
+"""
+排班结果缓存
+
+缓存键为 (月份, 基准周类型, 是否跨月连续, 数据版本)。数据变更使数据版本递增，旧结果自然失效，
+不需要逐条清除；缓存后端默认为按 LRU 淘汰的本地内存缓存，大小与过期时间在 settings.CACHES 中配置。
+"""
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import request_timing
+from .versioning import get_data_version
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def _cache():
+    return caches[getattr(settings, 'SCHEDULE_CACHE_ALIAS', 'default')]
+
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def cache_stats():
+    """本进程的缓存命中/未命中次数"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _cache_key(year_month, base_week_type, cross_month_continuous, data_version):
+    base_week_type = '小周' if base_week_type == '小周' else '大周'
+    return f"schedule:{year_month}:{base_week_type}:{int(bool(cross_month_continuous))}:{data_version}"
+
+
+def cached_schedule(year_month, base_week_type, cross_month_continuous, compute):
+    """读取某月排班缓存，未命中时调用 compute() 计算并写入"""
+    key = _cache_key(year_month, base_week_type, cross_month_continuous, get_data_version())
+    cache = _cache()
+    with request_timing.phase('cache'):
+        result = cache.get(key)
+    if result is not None:
+        _count('hits')
+        return result
+    _count('misses')
+    result = compute()
+    with request_timing.phase('cache'):
+        cache.set(key, result)
+    return result
+
+
+def cached_schedules(year_months, base_week_type, cross_month_continuous, compute):
+    """
+    读取多个月份的排班缓存
+
+    全部命中时直接返回；否则调用 compute() 一次计算全部月份（返回 {月份: 结果}）并写入缓存。
+    """
+    data_version = get_data_version()
+    keys = {
+        year_month: _cache_key(year_month, base_week_type, cross_month_continuous, data_version)
+        for year_month in year_months
+    }
+    cache = _cache()
+    with request_timing.phase('cache'):
+        found = cache.get_many(keys.values())
+    if len(found) == len(keys):
+        _count('hits', len(keys))
+        return {year_month: found[key] for year_month, key in keys.items()}
+    _count('hits', len(found))
+    _count('misses', len(keys) - len(found))
+    results = compute()
+    with request_timing.phase('cache'):
+        cache.set_many({keys[year_month]: result for year_month, result in results.items()})
+    return results
@@ -0,0 +1,131 @@
+"""
+排班变更记录与增量排班
+
+每次排班相关数据变更（signals.py / bulk.py）在同一事务中记录：变更后的整体数据版本、
+受影响的人员（None 表示全部人员）与日期范围（None 表示全部日期）。
+
+客户端持有某个数据版本的排班后，用 schedule_delta 只取回此后受影响的格子原地更新，
+不必重新下载整月排班。每个数据版本至少有一条记录；中间有缺失的版本（记录已清理）时返回 reset，客户端需完整重新加载。
+记录的同时推送失效事件（schedule_events.py）。
+"""
+from datetime import timedelta
+
+from .models import Person, ScheduleChange
+from .schedule_events import publish_change
+from .schedule_generator import iter_range
+from .versioning import get_data_version
+
+# 保留最近多少个数据版本的变更记录
+CHANGE_LOG_VERSIONS = 1000
+
+
+def record_change(person_ids=None, start_date=None, end_date=None, model=None):
+    """
+    记录当前数据版本影响的人员与日期范围，需在递增数据版本之后、同一事务中调用
+
+    model 为变更的模型名称，用于失效事件。
+    """
+    version = get_data_version()
+    if start_date is not None and end_date is not None and end_date < start_date:
+        start_date, end_date = end_date, start_date
+    person_ids = None if person_ids is None else sorted(set(person_ids))
+    ScheduleChange.objects.create(version=version, person_ids=person_ids, start_date=start_date, end_date=end_date)
+    ScheduleChange.objects.filter(version__lte=version - CHANGE_LOG_VERSIONS).delete()
+    publish_change(model, version, person_ids, start_date, end_date)
+
+
+def parse_version(value):
+    """
+    解析客户端的版本标记：数据版本号，或排班接口返回的 ETag（"<摘要>-<数据版本>"）
+
+    无法解析时返回 None。
+    """
+    value = str(value or '').strip()
+    if value.startswith('W/'):
+        value = value[2:]
+    value = value.strip('"').rpartition('-')[2]
+    return int(value) if value.isdigit() else None
+
+
+def _affected_cells(changes, start_date, end_date):
+    """
+    变更记录在 start_date ~ end_date 内影响的格子
+
+    返回 (全体人员受影响的日期集合, {人员ID: 日期集合})
+    """
+    all_dates = set()
+    person_dates = {}
+    for person_ids, change_start, change_end in changes:
+        first = max(change_start or start_date, start_date)
+        last = min(change_end or end_date, end_date)
+        if first > last:
+            continue
+        dates = {first + timedelta(days=offset) for offset in range((last - first).days + 1)}
+        if person_ids is None:
+            all_dates |= dates
+        else:
+            for person_id in person_ids:
+                person_dates.setdefault(person_id, set()).update(dates)
+    return all_dates, person_dates
+
+
+def schedule_delta(start_date, end_date, since, base_week_type='大周', cross_month_continuous=True,
+                   engine='python'):
+    """
+    数据版本 since 之后 start_date ~ end_date 内变化的排班格子
+
+    返回:
+    {
+        "version": 当前数据版本（下次请求的 since）,
+        "since": since,
+        "reset": 是否需要完整重新加载（此时不返回格子）,
+        "removed_persons": [已删除的人员ID],
+        "schedule": [与生成排班相同格式的行，只含受影响的人员与日期]
+    }
+    """
+    version = get_data_version()
+    result = {'version': version, 'since': since, 'reset': False, 'removed_persons': [], 'schedule': []}
+    if since == version:
+        return result
+    if since > version or version - since > CHANGE_LOG_VERSIONS:
+        result['reset'] = True
+        return result
+
+    changes = list(
+        ScheduleChange.objects.filter(version__gt=since, version__lte=version)
+        .values_list('version', 'person_ids', 'start_date', 'end_date')
+    )
+    if {change[0] for change in changes} != set(range(since + 1, version + 1)):
+        result['reset'] = True
+        return result
+
+    all_dates, person_dates = _affected_cells([change[1:] for change in changes], start_date, end_date)
+    if not all_dates and not person_dates:
+        return result
+
+    if person_dates:
+        existing = set(Person.objects.filter(id__in=list(person_dates)).values_list('id', flat=True))
+        result['removed_persons'] = sorted(set(person_dates) - existing)
+        for person_id in result['removed_persons']:
+            del person_dates[person_id]
+
+    dates = all_dates.union(*person_dates.values())
+    if not dates:
+        return result
+    date_strs = {day.isoformat() for day in all_dates}
+    person_date_strs = {
+        person_id: {day.isoformat() for day in person_days} for person_id, person_days in person_dates.items()
+    }
+    rows = iter_range(
+        min(dates),
+        max(dates),
+        person_ids=None if all_dates else sorted(person_dates),
+        base_week_type=base_week_type,
+        cross_month_continuous=cross_month_continuous,
+        engine=engine
+    )
+    result['schedule'] = [
+        row for row in rows
+        if row['date'] in date_strs or row['date'] in person_date_strs.get(row['person_id'], ())
+    ]
+    return result
@@ -0,0 +1,123 @@
+"""
+排班失效事件推送（Server-Sent Events）
+
+排班相关数据变更提交后，向打开的页面推送一条失效事件：变更的模型、受影响的人员（null 表示全部人员）、
+日期范围（null 表示全部日期）与新的数据版本。页面收到后可用增量排班接口（schedule-delta）只取回变化的格子，
+不必轮询重新生成排班。
+
+- 进程内广播：每条事件只编码一次，分发给本进程内的所有连接；没有连接时不做任何事
+- 每个连接有一个有界队列，消费过慢导致队列满时丢弃事件，改为推送 reset，客户端需重新加载
+- 事件流是异步视图，需以 ASGI（Backend/asgi.py）部署；多进程部署时各进程只推送本进程内的变更
+"""
+import asyncio
+import json
+import threading
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+
+from .versioning import get_data_version
+
+# 每个连接最多缓存的未发送事件数
+EVENT_QUEUE_SIZE = 256
+# 无事件时发送心跳注释的间隔（秒），避免代理断开空闲连接
+HEARTBEAT_SECONDS = 15
+
+
+def format_event(event, data, event_id=None):
+    """编码一条 SSE 事件"""
+    lines = [] if event_id is None else [f'id: {event_id}']
+    lines.append(f'event: {event}')
+    lines.append('data: ' + json.dumps(data, ensure_ascii=False, separators=(',', ':')))
+    return '\n'.join(lines) + '\n\n'
+
+
+class _Subscriber:
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self.overflowed = False
+
+    def deliver(self, message):
+        # 在连接所在的事件循环中执行
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class Broadcaster:
+    """进程内广播：publish 可在任意线程调用，事件投递到各连接所在的事件循环"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def subscribe(self):
+        subscriber = _Subscriber(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, message):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.deliver, message)
+            except RuntimeError:
+                # 事件循环已关闭
+                self.unsubscribe(subscriber)
+
+
+broadcaster = Broadcaster()
+
+
+def publish_change(model, version, person_ids, start_date, end_date):
+    """事务提交后推送失效事件（事务回滚时不推送）"""
+    if not broadcaster:
+        return
+    message = format_event('invalidate', {
+        'model': model,
+        'version': version,
+        'person_ids': person_ids,
+        'start_date': start_date.isoformat() if start_date else None,
+        'end_date': end_date.isoformat() if end_date else None,
+    }, event_id=version)
+    transaction.on_commit(lambda: broadcaster.publish(message))
+
+
+async def event_stream():
+    """
+    一个连接的事件流
+
+    先推送 version 事件（当前数据版本），之后逐条推送 invalidate 事件；事件丢失时推送 reset。
+    """
+    subscriber = broadcaster.subscribe()
+    try:
+        # 先订阅再读取版本，之后的变更不会遗漏
+        version = await sync_to_async(get_data_version)()
+        yield format_event('version', {'version': version}, event_id=version)
+        while True:
+            try:
+                message = await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            if subscriber.overflowed:
+                subscriber.overflowed = False
+                while not subscriber.queue.empty():
+                    subscriber.queue.get_nowait()
+                version = await sync_to_async(get_data_version)()
+                yield format_event('reset', {'version': version}, event_id=version)
+                continue
+            yield message
+    finally:
+        broadcaster.unsubscribe(subscriber)
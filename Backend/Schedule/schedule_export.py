@@ -0,0 +1,181 @@
+"""
+排班导出
+
+把生成器逐行产出的排班透视为 人员 × 日期 的表格，输出 CSV 或 xlsx：
+- 按组逐个生成并透视（每次只计算一个组的人员），内存中只保留一个组的行，全年导出同样如此
+- CSV 逐组、逐行流式输出
+- xlsx 使用 openpyxl 的 write-only 模式逐行写入临时文件，再流式返回
+- 全年导出时可按组拆分为多个工作表
+
+表格布局与前端导出一致：UID、部门、工号、姓名，之后每天一列；上班时填班次名称，否则填状态。
+"""
+import csv
+import itertools
+import re
+import tempfile
+from datetime import date, timedelta
+
+from .models import Person, ShiftDefinition
+from .schedule_generator import ENGINES, iter_range
+
+UNGROUPED = '未分组'
+
+EXPORT_FORMATS = ('csv', 'xlsx')
+
+WEEKDAYS = ['周一', '周二', '周三', '周四', '周五', '周六', '周日']
+NOTE_TEXT = '注意: UID为用户唯一标识，请与员工表保持一致，排班数据中UID不能重复'
+FIXED_HEADERS = ['UID', '部门', '工号', '姓名']
+
+
+def _date_range(start_date, end_date):
+    day = start_date
+    while day <= end_date:
+        yield day
+        day += timedelta(days=1)
+
+
+def _export_dates(year_months):
+    first_year, first_month = map(int, year_months[0].split('-'))
+    last_year, last_month = map(int, year_months[-1].split('-'))
+    start_date = date(first_year, first_month, 1)
+    end_date = (date(last_year + 1, 1, 1) if last_month == 12 else date(last_year, last_month + 1, 1)) - timedelta(days=1)
+    return list(_date_range(start_date, end_date))
+
+
+def _person_chunks():
+    """按组名（排序键的第一项）划分人员，返回 [(组名, 人员ID列表), ...]，按组名排序"""
+    chunks = {}
+    for person_id, group_name in Person.objects.values_list('id', 'group__name'):
+        chunks.setdefault(group_name or UNGROUPED, []).append(person_id)
+    return sorted(chunks.items())
+
+
+def _pivot_chunk(person_ids, dates, date_index, base_week_type, cross_month_continuous, engine):
+    """生成并透视一组人员的排班，返回按排序键排好的行"""
+    rows = {}
+    for item in iter_range(dates[0], dates[-1], person_ids=person_ids, base_week_type=base_week_type,
+                           cross_month_continuous=cross_month_continuous, engine=engine):
+        row = rows.get(item['person_id'])
+        if row is None:
+            row = rows[item['person_id']] = {
+                'person_id': item['person_id'],
+                'group': item['group'],
+                'person_name': item['person_name'],
+                'rotation_group': item['rotation_group'],
+                'shift': '',
+                'cells': [''] * len(dates),
+            }
+        if item['status'] == '上班':
+            row['cells'][date_index[item['date']]] = item['shift']
+            if item['shift']:
+                row['shift'] = item['shift']
+        else:
+            row['cells'][date_index[item['date']]] = item['status']
+
+    uids = dict(Person.objects.filter(id__in=list(rows)).values_list('id', 'uid'))
+    for row in rows.values():
+        row['uid'] = uids.get(row['person_id']) or ''
+        row['sort_key'] = (row['group'], row['rotation_group'] or row['shift'], row['person_name'])
+    return sorted(rows.values(), key=lambda row: row['sort_key'])
+
+
+def build_pivot(year_months, base_week_type='大周', cross_month_continuous=True, engine='python'):
+    """
+    透视排班，返回 (日期列表, 组名列表, 行迭代器)
+
+    每行为 {"person_id", "uid", "group", "person_name", "sort_key", "cells"}，cells 与日期列表一一对应。
+    行按 组、轮换组合（无轮换组合时按班次）、姓名 排序，与前端排班表一致。
+    行在迭代时按组逐个生成，每次只计算并保留一个组的人员；参数错误在返回前抛出。
+    """
+    if engine not in ENGINES:
+        raise ValueError(f'不支持的计算引擎: {engine}')
+    dates = _export_dates(list(year_months))
+    date_index = {day.isoformat(): index for index, day in enumerate(dates)}
+    chunks = _person_chunks()
+
+    def iter_rows():
+        for _, person_ids in chunks:
+            yield from _pivot_chunk(person_ids, dates, date_index, base_week_type, cross_month_continuous, engine)
+
+    return dates, [group_name for group_name, _ in chunks], iter_rows()
+
+
+def _header_row(dates, multiline=True):
+    separator = '\n' if multiline else ' '
+    return FIXED_HEADERS + [
+        f"{day.year}/{day.month}/{day.day}{separator}{WEEKDAYS[day.weekday()]}" for day in dates
+    ]
+
+
+def _data_row(row):
+    return [row['uid'], row['group'], '', row['person_name'], *row['cells']]
+
+
+def _shift_info_text():
+    parts = [
+        f"{name}: {start_time.isoformat()}-{end_time.isoformat()}"
+        for name, start_time, end_time in ShiftDefinition.objects.values_list('name', 'start_time', 'end_time')
+    ]
+    if not parts:
+        return '班次信息: 休息'
+    return f"班次信息: {', '.join(parts)}, 休息"
+
+
+class _Echo:
+    """csv.writer 的写入目标，直接返回写入的内容"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(dates, rows):
+    """逐行产出 CSV 文本（带 BOM，Excel 可直接打开中文）"""
+    writer = csv.writer(_Echo())
+    yield '\ufeff' + writer.writerow(_header_row(dates, multiline=False))
+    for row in rows:
+        yield writer.writerow(_data_row(row))
+
+
+def _write_sheet(workbook, title, group_names, dates, rows, shift_info):
+    from openpyxl.worksheet.cell_range import CellRange
+
+    # 工作表名不能包含 []:*?/\ 且最长 31 个字符
+    worksheet = workbook.create_sheet(title=re.sub(r'[\[\]:*?/\\]', '_', title)[:31])
+    header = _header_row(dates)
+    sheet_title = f"{group_names[0]}排班表" if len(group_names) == 1 else '排班表'
+    for line in (sheet_title, NOTE_TEXT, shift_info):
+        worksheet.append([line])
+    # write-only 工作表没有公开的合并单元格接口，openpyxl 不支持时不合并标题行
+    merged_cells = getattr(worksheet, 'merged_cells', None)
+    for line_number in (1, 2, 3) if hasattr(merged_cells, 'add') else ():
+        merged_cells.add(CellRange(min_col=1, min_row=line_number, max_col=len(header), max_row=line_number))
+    worksheet.append(header)
+    for row in rows:
+        worksheet.append(_data_row(row))
+
+
+def write_xlsx(dates, group_names, rows, split_by_group=False):
+    """
+    以 write-only 模式写出 xlsx，返回定位到开头的临时文件
+
+    group_names、rows 为 build_pivot 的结果，rows 按组名排序、逐行写入，不整体保留。
+    split_by_group 为 True 时每个组一个工作表（按组名排序），否则全部写入 schedule 工作表。
+    """
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ValueError('导出 xlsx 需要安装 openpyxl')
+
+    workbook = Workbook(write_only=True)
+    shift_info = _shift_info_text()
+    if split_by_group and group_names:
+        # 行按组名排序，同组的行连续出现
+        for group_name, group_rows in itertools.groupby(rows, key=lambda row: row['group'] or UNGROUPED):
+            _write_sheet(workbook, group_name, [group_name], dates, group_rows, shift_info)
+    else:
+        _write_sheet(workbook, 'schedule', group_names, dates, rows, shift_info)
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return output
@@ -0,0 +1,104 @@
+"""
+排班结果的输出格式
+
+rows（默认）：每个格子一个字典，即 generate_schedule 的原始结果。
+columnar：人员、日期各出现一次，每人一组状态/班次编码数组，配合查找表还原，
+大幅减小 JSON 体积与序列化开销。
+ndjson：流式输出，每行一个格子字典。
+"""
+
+import json
+
+RESPONSE_FORMATS = ('rows', 'columnar')
+
+# 流式输出时每次写出的行数
+NDJSON_CHUNK_ROWS = 500
+
+
+def to_columnar(schedule_data):
+    """
+    把按格子排列的排班结果转换为列式结构：
+
+    {
+        "format": "columnar",
+        "dates": ["YYYY-MM-DD", ...],
+        "persons": [{"id", "name", "group", "rotation_group"}, ...],
+        "statuses": ["上班", "休息", ...],      # 状态查找表
+        "shifts": ["", "A班", ...],             # 班次查找表
+        "status_codes": [[0, 1, ...], ...],     # 与 persons 一一对应，按 dates 顺序
+        "shift_codes": [[1, 0, ...], ...],
+        "violations": [[人员下标, 日期下标, 原因], ...]
+    }
+    """
+    dates = sorted({item['date'] for item in schedule_data})
+    date_index = {date_str: index for index, date_str in enumerate(dates)}
+
+    persons = {}
+    for item in schedule_data:
+        if item['person_id'] not in persons:
+            persons[item['person_id']] = {
+                'id': item['person_id'],
+                'name': item['person_name'],
+                'group': item['group'],
+                'rotation_group': item['rotation_group'],
+            }
+    person_list = [persons[person_id] for person_id in sorted(persons)]
+    person_index = {person['id']: index for index, person in enumerate(person_list)}
+
+    statuses = ['上班', '休息']
+    status_lookup = {label: code for code, label in enumerate(statuses)}
+    shifts = ['']
+    shift_lookup = {'': 0}
+    status_codes = [[0] * len(dates) for _ in person_list]
+    shift_codes = [[0] * len(dates) for _ in person_list]
+    violations = []
+
+    for item in schedule_data:
+        row = person_index[item['person_id']]
+        column = date_index[item['date']]
+        status = item['status']
+        if status not in status_lookup:
+            status_lookup[status] = len(statuses)
+            statuses.append(status)
+        shift = item['shift']
+        if shift not in shift_lookup:
+            shift_lookup[shift] = len(shifts)
+            shifts.append(shift)
+        status_codes[row][column] = status_lookup[status]
+        shift_codes[row][column] = shift_lookup[shift]
+        if item['is_violation']:
+            violations.append([row, column, item['violation_reason']])
+
+    return {
+        'format': 'columnar',
+        'dates': dates,
+        'persons': person_list,
+        'statuses': statuses,
+        'shifts': shifts,
+        'status_codes': status_codes,
+        'shift_codes': shift_codes,
+        'violations': violations,
+    }
+
+
+def format_schedule(result, response_format='rows'):
+    """按请求的格式输出 generate_schedule 的结果"""
+    if response_format not in RESPONSE_FORMATS:
+        raise ValueError(f'不支持的输出格式: {response_format}')
+    if response_format == 'columnar':
+        return to_columnar(result['schedule'])
+    return result
+
+
+def iter_ndjson(rows, chunk_rows=NDJSON_CHUNK_ROWS):
+    """把逐行产出的排班编码为 NDJSON 字节块，每块包含 chunk_rows 行"""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row, ensure_ascii=False))
+        if len(lines) >= chunk_rows:
+            lines.append('')
+            yield '\n'.join(lines).encode('utf-8')
+            lines = []
+    if lines:
+        lines.append('')
+        yield '\n'.join(lines).encode('utf-8')
@@ -1,48 +1,120 @@
 ﻿"""
 排班生成器 - 根据基本规则生成排班表
 """
+import heapq
+import itertools
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime, timedelta, date
+from time import perf_counter
+
 from django.db.models import Q
+
+from . import request_timing, work_calendar
 from .models import Person, ShiftDefinition, Absence, CalendarOverride
+from .absence_index import AbsenceIndex
+from .override_index import OverrideIndex
+from .schedule_rules import (
+    ScheduleRules, ShiftRule, GroupRule, RotationRule, PersonRule, OverrideRule, AbsenceRule,
+    _init_worker, _build_task,
+)
 
+logger = logging.getLogger(__name__)
 
-def generate_schedule(year_month: str, base_week_type: str = '大周', cross_month_continuous: bool = True):
-    """
-    根据月份生成排班表
+# 可选的排班计算引擎
+ENGINES = ('python', 'numpy')
 
-    规则说明：
-    1. 按组对人员分类
-    2. 每个组内按人数分配 A/B 班，进行月度轮换
-    3. 每个班次有各自的大小周工作日配置
-    4. 根据日期的大小周类型和人员班次，判断是否上班
-    5. 调休/节假日覆盖支持优先级
-    """
-    year, month = map(int, year_month.split('-'))
+# 按日期范围生成（同步接口与生成任务）允许的最长天数
+MAX_RANGE_DAYS = 366
+
+DEFAULT_WEEK_CONFIG = {
+    '大周': {0, 1, 2, 3, 4},
+    '小周': {0, 1, 2, 3, 4, 5}
+}
 
+
+def _month_bounds(year, month):
+    """返回月份的首尾日期"""
     start_date = datetime(year, month, 1).date()
     if month == 12:
         end_date = (datetime(year + 1, 1, 1) - timedelta(days=1)).date()
     else:
         end_date = (datetime(year, month + 1, 1) - timedelta(days=1)).date()
+    return start_date, end_date
+
+
+def _person_filter(prefix='', person_ids=None, group_ids=None, rotation_group_ids=None):
+    """
+    人员筛选条件，prefix 为从查询模型到 Person 的关联路径（如 'person__'）
+
+    各参数为 None 表示不按该项筛选，同时提供多项时取交集。
+    """
+    condition = Q()
+    if person_ids is not None:
+        condition &= Q(**{f'{prefix}id__in': person_ids})
+    if group_ids is not None:
+        condition &= Q(**{f'{prefix}group_id__in': group_ids})
+    if rotation_group_ids is not None:
+        condition &= Q(**{f'{prefix}rotation_group_id__in': rotation_group_ids})
+    return condition
+
 
-    schedule_data = []
+def _is_filtered(person_ids=None, group_ids=None, rotation_group_ids=None):
+    return person_ids is not None or group_ids is not None or rotation_group_ids is not None
 
-    persons = list(
-        Person.objects.select_related(
-            'group',
-            'shift_type',
-            'rotation_group',
-            'rotation_group__odd_shift',
-            'rotation_group__even_shift'
-        ).all()
+
+def _person_matches(person, person_ids=None, group_ids=None, rotation_group_ids=None):
+    """人员快照是否符合筛选条件（与 _person_filter 一致，用于已加载的规则快照）"""
+    return (
+        (person_ids is None or person.id in person_ids)
+        and (group_ids is None or (person.group is not None and person.group.id in group_ids))
+        and (rotation_group_ids is None
+             or (person.rotation_group is not None and person.rotation_group.id in rotation_group_ids))
     )
 
-    # 大小周以基准周计算，可选跨月连续
-    base_week_type = '小周' if base_week_type == '小周' else '大周'
-    base_date = date(year, 1, 1) if cross_month_continuous else start_date
-    base_date = base_date - timedelta(days=base_date.weekday())
 
-    # 按班次类型组织大小周配置
+def _load_persons(person_ids=None, group_ids=None, rotation_group_ids=None):
+    """加载人员快照（含组、班次、轮换组合），按 id 排序；可按人员ID、组ID、轮换组合ID筛选"""
+    persons = Person.objects.filter(
+        _person_filter('', person_ids, group_ids, rotation_group_ids)
+    ).order_by('id')
+    rows = persons.values_list(
+        'id', 'name',
+        'group_id', 'group__name',
+        'shift_type_id', 'shift_type__name',
+        'rotation_group_id', 'rotation_group__name',
+        'rotation_group__odd_shift_id', 'rotation_group__odd_shift__name',
+        'rotation_group__even_shift_id', 'rotation_group__even_shift__name',
+    )
+
+    shifts = {}
+    groups = {}
+    rotations = {}
+
+    def shift_rule(shift_id, name):
+        if shift_id is None:
+            return None
+        if shift_id not in shifts:
+            shifts[shift_id] = ShiftRule(shift_id, name)
+        return shifts[shift_id]
+
+    result = []
+    for (person_id, name, group_id, group_name, shift_id, shift_name, rotation_id, rotation_name,
+         odd_id, odd_name, even_id, even_name) in rows:
+        group = None
+        if group_id is not None:
+            group = groups.get(group_id) or groups.setdefault(group_id, GroupRule(group_id, group_name))
+        rotation = None
+        if rotation_id is not None:
+            rotation = rotations.get(rotation_id) or rotations.setdefault(rotation_id, RotationRule(
+                rotation_id, rotation_name, shift_rule(odd_id, odd_name), shift_rule(even_id, even_name)
+            ))
+        result.append(PersonRule(person_id, name, group, shift_rule(shift_id, shift_name), rotation))
+    return result
+
+
+def _load_week_configs():
+    """按班次类型组织大小周配置"""
     week_configs = {}
     try:
         all_shift_definitions = ShiftDefinition.objects.all()
@@ -58,96 +130,155 @@ def generate_schedule(year_month: str, base_week_type: str = '大周', cross_mon
             week_configs[shift_key]['小周'] = small_week_work_days
 
         if not week_configs:
-            week_configs = {
-                'default': {
-                    '大周': {0, 1, 2, 3, 4},
-                    '小周': {0, 1, 2, 3, 4, 5}
-                }
-            }
-    except Exception as e:
-        print(f"加载配置时出错: {e}")
-        week_configs = {
-            'default': {
-                '大周': {0, 1, 2, 3, 4},
-                '小周': {0, 1, 2, 3, 4, 5}
-            }
-        }
+            week_configs = {'default': dict(DEFAULT_WEEK_CONFIG)}
+    except Exception:
+        # 配置有误时记录错误并按默认大小周配置生成
+        logger.exception('加载大小周配置时出错，使用默认配置')
+        week_configs = {'default': dict(DEFAULT_WEEK_CONFIG)}
+    return week_configs
+
+
+def _work_days_for(week_configs, shift_def, is_big_week):
+    """返回班次在大周/小周的工作日集合"""
+    shift_type_id = shift_def.id if shift_def else 'default'
+    # 无班次或班次没有配置时使用默认大小周配置
+    config = week_configs.get(shift_type_id) or week_configs.get('default') or DEFAULT_WEEK_CONFIG
+    return config['大周'] if is_big_week else config['小周']
+
+
+def _shift_work_map(calendar, week_configs, shift_def):
+    """班次在 calendar 年度内的工作日位图（进程内缓存，见 work_calendar）"""
+    return calendar.work_map(
+        shift_def.id if shift_def else None,
+        _work_days_for(week_configs, shift_def, True),
+        _work_days_for(week_configs, shift_def, False)
+    )
+
+
+def _build_date_info_list(start_date, end_date, base_week_type, cross_month_continuous):
+    """
+    预计算日期序列（大小周、轮换月份），可跨月、跨年
+
+    每天按其所在月份计算：基准日期为当年 1 月 1 日（跨月连续）或当月 1 日。
+    日期信息取自进程内缓存的年度日期表，各请求共享，调用方不能修改。
+    """
+    return work_calendar.date_info_range(start_date, end_date, base_week_type, cross_month_continuous)
+
 
-    # 预计算人员班次配置
-    person_fixed_shifts = {}
-    person_rotation_shifts = {}
+def _scope_filter(persons):
+    """
+    只保留可能作用于 persons 中人员的覆盖规则的查询条件
+
+    按关联的组、人员、轮换组合 ID 匹配，目标不属于这些人员的规则在建立索引时也会被丢弃，提前在查询中排除不影响结果。
+    """
+    group_ids = {person.group.id for person in persons if person.group is not None}
+    rotation_group_ids = {person.rotation_group.id for person in persons if person.rotation_group is not None}
+    targeted = CalendarOverride.target_persons.through.objects.filter(
+        person_id__in=[person.id for person in persons]
+    ).values('calendaroverride_id')
+    condition = (
+        Q(scope='全员')
+        | Q(scope='指定组', target_group_id__in=group_ids)
+        | Q(scope='指定人员', id__in=targeted)
+        | Q(scope='指定轮换组合', target_rotation_group_id__in=rotation_group_ids)
+    )
+    if any(person.group is None for person in persons):
+        condition |= Q(scope='指定组', target_group__isnull=True, target='未分组')
+    return condition
+
+
+def _load_overrides(start_date, end_date, persons=None):
+    """
+    查询与日期范围相交的调休/节假日覆盖；传入 persons 时只查询可能作用于这些人员的规则
+
+    指定人员的规则另用一次查询取出目标人员ID（没有这类规则时不查询）。
+    """
+    # 生效范围为 date ~ effective_end_date（end_date 或 date）；end_date 早于 date 时按交换后的范围生效
+    # （override_span），起止两端都需同时考虑 date 与 end_date，任意日期范围的查询与按月查询结果一致
+    overrides = CalendarOverride.objects.filter(
+        Q(date__lte=end_date) | Q(end_date__lte=end_date),
+        Q(effective_end_date__gte=start_date) | Q(date__gte=start_date),
+    ).order_by('id')
+    if persons is not None:
+        overrides = overrides.filter(_scope_filter(persons))
+    rows = list(overrides.values_list(
+        'id', 'date', 'end_date', 'override_type', 'scope', 'target', 'priority',
+        'target_group_id', 'target_rotation_group_id',
+    ))
+
+    target_person_ids = {}
+    person_scoped = [row[0] for row in rows if row[4] == '指定人员']
+    if person_scoped:
+        links = CalendarOverride.target_persons.through.objects.filter(calendaroverride_id__in=person_scoped)
+        for override_id, person_id in links.values_list('calendaroverride_id', 'person_id'):
+            target_person_ids.setdefault(override_id, set()).add(person_id)
+    return [OverrideRule(*row, frozenset(target_person_ids.get(row[0], ()))) for row in rows]
+
+
+def _load_absences(start_date, end_date, person_ids=None, group_ids=None, rotation_group_ids=None):
+    """查询与日期范围相交的请假记录，按 id 排序（同一天多条记录时靠前者生效）；筛选条件同 _load_persons"""
+    absences = Absence.objects.filter(
+        _person_filter('person__', person_ids, group_ids, rotation_group_ids),
+        start_date__lte=end_date, end_date__gte=start_date
+    ).order_by('id')
+    return [
+        AbsenceRule(*row) for row in absences.values_list(
+            'id', 'person_id', 'start_date', 'end_date', 'type', 'count_as_rest'
+        )
+    ]
+
+
+def schedule_sort_key(item):
+    """排班结果的排序键：日期、组、班次、姓名"""
+    return (
+        item['date'],
+        item.get('group') or '',
+        item.get('shift') or '',
+        item.get('person_name') or ''
+    )
+
+
+def _iter_schedule_python(persons, week_configs, date_info_list, override_index, absence_index):
+    """
+    逐人逐日计算排班，按日期逐天产出排好序的结果
+
+    排序键以日期开头，每天单独排序后依次产出与整体排序结果一致，内存只保留一天的数据。
+    """
+    # 预计算人员在单数/双数轮换月份的班次（固定班次两者相同）
+    odd_shifts = []
+    even_shifts = []
     for person in persons:
         if person.rotation_group:
-            person_rotation_shifts[person.id] = {
-                'odd': person.rotation_group.odd_shift,
-                'even': person.rotation_group.even_shift,
-            }
-        elif person.shift_type:
-            person_fixed_shifts[person.id] = person.shift_type
+            odd_shifts.append(person.rotation_group.odd_shift)
+            even_shifts.append(person.rotation_group.even_shift)
         else:
-            person_fixed_shifts[person.id] = None
-
-    # 预计算日期序列
-    date_info_list = []
-    current_date = start_date
-    while current_date <= end_date:
-        days_since_current_monday = current_date.weekday()
-        current_monday = current_date - timedelta(days=days_since_current_monday)
-        weeks_diff = (current_monday - base_date).days // 7
-        is_big_week = (weeks_diff % 2 == 0 and base_week_type == '大周') or \
-                      (weeks_diff % 2 == 1 and base_week_type == '小周')
-        date_info_list.append({
-            'date': current_date,
-            'date_str': current_date.strftime('%Y-%m-%d'),
-            'weekday': current_date.weekday(),
-            'is_big_week': is_big_week,
-            'week_start_month': current_monday.month
-        })
-        current_date += timedelta(days=1)
-
-    # 预加载调休/节假日覆盖
-    overrides_by_date = {}
-    overrides = CalendarOverride.objects.filter(
-        Q(end_date__isnull=True, date__gte=start_date, date__lte=end_date) |
-        Q(end_date__isnull=False, date__lte=end_date, end_date__gte=start_date)
-    )
-    for override in overrides:
-        range_start = override.date
-        range_end = override.end_date or override.date
-        if range_end < range_start:
-            range_start, range_end = range_end, range_start
-        cursor = max(range_start, start_date)
-        range_end = min(range_end, end_date)
-        while cursor <= range_end:
-            overrides_by_date.setdefault(cursor, []).append(override)
-            cursor += timedelta(days=1)
-    for date_key in overrides_by_date:
-        overrides_by_date[date_key].sort(key=lambda x: (x.priority, x.id), reverse=True)
-
-    # 预加载请假记录
-    absences_by_person = {}
-    absences = Absence.objects.filter(start_date__lte=end_date, end_date__gte=start_date).select_related('person')
-    for absence in absences:
-        absences_by_person.setdefault(absence.person_id, []).append(absence)
+            odd_shifts.append(person.shift_type)
+            even_shifts.append(person.shift_type)
 
+    started = perf_counter()
+    calendar = None
     for date_info in date_info_list:
         current_date = date_info['date']
         date_str = date_info['date_str']
-        weekday = date_info['weekday']
-        is_big_week = date_info['is_big_week']
-        rotation_month = month
-        if cross_month_continuous and date_info['week_start_month'] != current_date.month:
-            rotation_month = date_info['week_start_month']
-        overrides_for_date = overrides_by_date.get(current_date, [])
-
-        for person in persons:
+        day_index = date_info['day_index']
+        rotation_month = date_info['rotation_month']
+        overrides_for_date = override_index.overrides_on(current_date)
+        day_data = []
+
+        # 工作日位图按年度日期表取得，进入新的年度时重新按需取得
+        if date_info['calendar'] is not calendar:
+            calendar = date_info['calendar']
+            calendar_maps = {}
+            odd_maps = [None] * len(persons)
+            even_maps = [None] * len(persons)
+        if rotation_month % 2 == 1:
+            day_shifts, day_maps = odd_shifts, odd_maps
+        else:
+            day_shifts, day_maps = even_shifts, even_maps
+
+        for row, person in enumerate(persons):
             group_name = person.group.name if person.group else '未分组'
-            shift_def = None
-            if person.id in person_rotation_shifts:
-                rotation = person_rotation_shifts[person.id]
-                shift_def = rotation['odd'] if rotation_month % 2 == 1 else rotation['even']
-            else:
-                shift_def = person_fixed_shifts.get(person.id)
+            shift_def = day_shifts[row]
             shift_label = shift_def.name if shift_def else ''
 
             shift = shift_label
@@ -155,48 +286,30 @@ def generate_schedule(year_month: str, base_week_type: str = '大周', cross_mon
             is_violation = False
             violation_reason = ''
 
-            shift_type_id = shift_def.id if shift_def else 'default'
-            if shift_type_id in week_configs:
-                work_days_for_this_person = week_configs[shift_type_id]['大周'] if is_big_week else week_configs[shift_type_id]['小周']
-            else:
-                work_days_for_this_person = week_configs['default']['大周'] if is_big_week else week_configs['default']['小周']
-
-            if weekday not in work_days_for_this_person:
+            work_map = day_maps[row]
+            if work_map is None:
+                shift_key = shift_def.id if shift_def else None
+                if shift_key not in calendar_maps:
+                    calendar_maps[shift_key] = _shift_work_map(calendar, week_configs, shift_def)
+                work_map = day_maps[row] = calendar_maps[shift_key]
+            if not work_map[day_index]:
                 status = '休息'
                 shift = ''
             else:
                 status = '上班'
 
             # 处理调休/节假日覆盖（按优先级）
-            for override in overrides_for_date:
-                apply = False
-                if override.scope == '全员':
-                    apply = True
-                elif override.scope == '指定组' and override.target == group_name:
-                    apply = True
-                elif override.scope == '指定人员' and override.target == person.name:
-                    apply = True
-                elif override.scope == '指定轮换组合' and override.target:
-                    rotation_name = person.rotation_group.name if person.rotation_group else ''
-                    if rotation_name and override.target == rotation_name:
-                        apply = True
-
-                if apply:
-                    if override.override_type == '上班':
-                        status = '上班'
-                        shift = shift_label
-                    elif override.override_type == '休息':
-                        status = '休息'
-                        shift = ''
-                    break
+            override = OverrideIndex.first_applicable(overrides_for_date, person.id)
+            if override:
+                if override.override_type == '上班':
+                    status = '上班'
+                    shift = shift_label
+                elif override.override_type == '休息':
+                    status = '休息'
+                    shift = ''
 
             # 请假记录最后覆盖调休/节假日结果
-            absence = None
-            for item in absences_by_person.get(person.id, []):
-                if item.start_date <= current_date <= item.end_date:
-                    absence = item
-                    break
-
+            absence = absence_index.lookup(person.id, current_date)
             if absence:
                 if absence.count_as_rest:
                     status = '休息'
@@ -204,7 +317,7 @@ def generate_schedule(year_month: str, base_week_type: str = '大周', cross_mon
                     status = absence.type
                 shift = ''
 
-            schedule_data.append({
+            day_data.append({
                 'person_id': person.id,
                 'person_name': person.name,
                 'group': group_name,
@@ -216,14 +329,278 @@ def generate_schedule(year_month: str, base_week_type: str = '大周', cross_mon
                 'violation_reason': violation_reason
             })
 
-    return {
-        'schedule': sorted(
-            schedule_data,
-            key=lambda item: (
-                item['date'],
-                item.get('group') or '',
-                item.get('shift') or '',
-                item.get('person_name') or ''
-            )
+        started = request_timing.lap('loop', started)
+        day_data.sort(key=schedule_sort_key)
+        request_timing.lap('sort', started)
+        yield from day_data
+        # 下游消费产出行的耗时不计入
+        started = perf_counter()
+
+
+def _get_iterator(engine):
+    """返回计算引擎的逐行产出函数"""
+    if engine not in ENGINES:
+        raise ValueError(f'不支持的计算引擎: {engine}')
+    if engine == 'numpy':
+        from .schedule_generator_numpy import iter_schedule_numpy
+        return iter_schedule_numpy
+    return _iter_schedule_python
+
+
+def load_schedule_rules(start_date, end_date, person_ids=None, group_ids=None, rotation_group_ids=None):
+    """
+    一次加载日期范围内生成排班所需的全部数据（4 次查询，有指定人员的覆盖规则时 5 次），返回可 pickle 的规则快照
+
+    指定人员ID、组ID或轮换组合ID时，人员与请假记录在查询中筛选，覆盖规则只查询可能作用于这些人员的部分，
+    加载与计算量随所看的人员规模变化，而不是全体人员。
+    """
+    filtered = _is_filtered(person_ids, group_ids, rotation_group_ids)
+    with request_timing.phase('load'):
+        persons = _load_persons(person_ids, group_ids, rotation_group_ids)
+        return ScheduleRules(
+            start_date,
+            end_date,
+            persons,
+            _load_week_configs(),
+            _load_overrides(start_date, end_date, persons if filtered else None),
+            _load_absences(start_date, end_date, person_ids, group_ids, rotation_group_ids)
         )
-    }
+
+
+def month_bounds(year_month: str):
+    """"YYYY-MM" 月份的首尾日期"""
+    year, month = map(int, year_month.split('-'))
+    return _month_bounds(year, month)
+
+
+def load_absence_index(start_date: date, end_date: date, person_ids=None):
+    """与日期范围相交的请假记录的区间索引，可只加载指定人员（不加载生成排班所需的其他数据）"""
+    return AbsenceIndex(_load_absences(start_date, end_date, person_ids))
+
+
+def effective_override(person_id: int, day: date):
+    """
+    某人某日生效的覆盖规则（OverrideRule），没有时返回 None；规则的加载与匹配与生成排班时相同
+
+    人员不存在时抛出 Person.DoesNotExist。
+    """
+    persons = _load_persons([person_id])
+    if not persons:
+        raise Person.DoesNotExist(f'人员 {person_id} 不存在')
+    return OverrideIndex(_load_overrides(day, day, persons), persons).effective(person_id, day)
+
+
+def _iter_months(rules, year_months, base_week_type, cross_month_continuous, engine):
+    """
+    根据规则快照逐月计算（覆盖规则与请假记录各建立一次区间索引，各月共用）
+
+    依次产出 (year_month, 行迭代器)，行按排序键顺序惰性生成。
+    """
+    iterate = _get_iterator(engine)
+    windows = [_month_bounds(*map(int, year_month.split('-'))) for year_month in year_months]
+    for year_month, (start_date, end_date) in zip(year_months, windows):
+        if not rules.covers(start_date, end_date):
+            raise ValueError(f'规则快照未覆盖 {year_month}')
+
+    base_week_type = '小周' if base_week_type == '小周' else '大周'
+    with request_timing.phase('overrides'):
+        override_index = rules.override_index()
+    with request_timing.phase('absences'):
+        absence_index = rules.absence_index()
+    for index, (start_date, end_date) in enumerate(windows):
+        with request_timing.phase('dates'):
+            date_info_list = _build_date_info_list(start_date, end_date, base_week_type, cross_month_continuous)
+        yield year_months[index], iterate(
+            rules.persons, rules.week_configs, date_info_list, override_index, absence_index
+        )
+
+
+def _build_months(rules, year_months, base_week_type, cross_month_continuous, engine):
+    """根据规则快照计算多个月份，返回各月结果列表"""
+    return [
+        list(rows)
+        for _, rows in _iter_months(rules, year_months, base_week_type, cross_month_continuous, engine)
+    ]
+
+
+def build_month_schedule(rules: ScheduleRules, year_month: str, base_week_type: str = '大周',
+                         cross_month_continuous: bool = True, engine: str = 'python'):
+    """根据规则快照计算一个月的排班（不访问数据库），返回排好序的结果列表"""
+    return _build_months(rules, [year_month], base_week_type, cross_month_continuous, engine)[0]
+
+
+def _group_partitions(rules):
+    """按组划分人员（组名是排序键的一部分，各分区结果可直接归并）"""
+    partitions = {}
+    for person in rules.persons:
+        group_name = person.group.name if person.group else '未分组'
+        partitions.setdefault(group_name, []).append(person.id)
+    return list(partitions.values())
+
+
+def generate_schedule(year_month: str, base_week_type: str = '大周', cross_month_continuous: bool = True,
+                      engine: str = 'python', person_ids=None, rules: ScheduleRules = None, workers: int = None,
+                      group_ids=None, rotation_group_ids=None):
+    """
+    根据月份生成排班表
+
+    规则说明：
+    1. 按组对人员分类
+    2. 每个组内按人数分配 A/B 班，进行月度轮换
+    3. 每个班次有各自的大小周工作日配置
+    4. 根据日期的大小周类型和人员班次，判断是否上班
+    5. 调休/节假日覆盖支持优先级
+
+    engine 可选 'python'（逐格计算）或 'numpy'（人员×日期矩阵向量化计算），两者结果一致。
+    person_ids / group_ids / rotation_group_ids 不为 None 时只计算符合条件的人员（每个人的排班与其他人员无关），
+    多项同时提供时取交集；筛选在查询中完成，结果与全员生成后按人员筛选一致。
+    rules 为预加载的规则快照，传入时不再查询数据库。
+    workers 大于 1 时按组拆分人员，在进程池中并行计算后按原排序归并，结果与串行一致。
+    """
+    _get_iterator(engine)
+    if rules is None:
+        year, month = map(int, year_month.split('-'))
+        rules = load_schedule_rules(
+            *_month_bounds(year, month),
+            person_ids=person_ids, group_ids=group_ids, rotation_group_ids=rotation_group_ids
+        )
+    elif _is_filtered(person_ids, group_ids, rotation_group_ids):
+        rules = rules.for_persons(
+            person.id for person in rules.persons
+            if _person_matches(person, person_ids, group_ids, rotation_group_ids)
+        )
+
+    partitions = _group_partitions(rules) if workers and workers > 1 else []
+    if len(partitions) <= 1:
+        return {
+            'schedule': build_month_schedule(rules, year_month, base_week_type, cross_month_continuous, engine)
+        }
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(partitions)),
+                             initializer=_init_worker, initargs=(rules,)) as executor:
+        futures = [
+            executor.submit(_build_task, year_month, base_week_type, cross_month_continuous, engine, partition)
+            for partition in partitions
+        ]
+        results = [future.result() for future in futures]
+    return {'schedule': list(heapq.merge(*results, key=schedule_sort_key))}
+
+
+def iter_range(start_date: date, end_date: date, person_ids=None, group_ids=None, base_week_type: str = '大周',
+               cross_month_continuous: bool = True, engine: str = 'python', rotation_group_ids=None):
+    """
+    按日期范围逐行产出排班（排序与 generate_schedule 相同，先按日期）
+
+    规则快照只加载该范围与指定人员/组，在返回前完成加载与参数校验。
+    """
+    iterate = _get_iterator(engine)
+    if start_date > end_date:
+        raise ValueError('开始日期不能晚于结束日期')
+    rules = load_schedule_rules(
+        start_date, end_date, person_ids=person_ids, group_ids=group_ids, rotation_group_ids=rotation_group_ids
+    )
+    base_week_type = '小周' if base_week_type == '小周' else '大周'
+    with request_timing.phase('overrides'):
+        override_index = rules.override_index()
+    with request_timing.phase('absences'):
+        absence_index = rules.absence_index()
+    with request_timing.phase('dates'):
+        date_info_list = _build_date_info_list(start_date, end_date, base_week_type, cross_month_continuous)
+    return iterate(rules.persons, rules.week_configs, date_info_list, override_index, absence_index)
+
+
+def generate_range(start_date: date, end_date: date, person_ids=None, group_ids=None, base_week_type: str = '大周',
+                   cross_month_continuous: bool = True, engine: str = 'python', rotation_group_ids=None):
+    """
+    生成任意日期范围的排班，只计算 start_date ~ end_date（含）与指定的人员/组
+
+    每一天的大小周与轮换月份按其所在月份计算，结果与按月生成后截取该范围、筛选人员完全一致。
+    person_ids / group_ids / rotation_group_ids 为 None 表示不筛选，多项同时提供时取交集。
+
+    返回 {"schedule": [...]}
+    """
+    rows = iter_range(
+        start_date, end_date, person_ids, group_ids, base_week_type, cross_month_continuous, engine,
+        rotation_group_ids=rotation_group_ids
+    )
+    return {'schedule': list(rows)}
+
+
+def _rules_for_months(year_months, rules=None):
+    """未传入规则快照时一次加载覆盖全部月份的快照，并校验快照覆盖范围"""
+    bounds = [_month_bounds(*map(int, year_month.split('-'))) for year_month in year_months]
+    if rules is None:
+        return load_schedule_rules(min(b[0] for b in bounds), max(b[1] for b in bounds))
+    for year_month, (start_date, end_date) in zip(year_months, bounds):
+        if not rules.covers(start_date, end_date):
+            raise ValueError(f'规则快照未覆盖 {year_month}')
+    return rules
+
+
+def stream_schedules(year_months, base_week_type: str = '大周', cross_month_continuous: bool = True,
+                     engine: str = 'python', rules: ScheduleRules = None):
+    """
+    按月份顺序、月内按排序键逐行产出排班，不保留完整结果
+
+    规则快照在调用时立即加载并校验（参数错误在返回前抛出），返回的迭代器只负责计算。
+    """
+    _get_iterator(engine)
+    year_months = list(year_months)
+    rules = _rules_for_months(year_months, rules)
+    months = _iter_months(rules, year_months, base_week_type, cross_month_continuous, engine)
+    return itertools.chain.from_iterable(rows for _, rows in months)
+
+
+def generate_schedules(year_months, base_week_type: str = '大周', cross_month_continuous: bool = True,
+                       engine: str = 'python', rules: ScheduleRules = None, workers: int = None,
+                       on_month_done=None):
+    """
+    生成多个月份的排班，返回 {"YYYY-MM": {"schedule": [...]}, ...}
+
+    未传入 rules 时一次加载覆盖全部月份的规则快照；workers 大于 1 时各月份在进程池中并行计算。
+    on_month_done(year_month) 在每个月份计算完成时调用（并行时按完成顺序），用于报告进度。
+    """
+    _get_iterator(engine)
+    year_months = list(year_months)
+    if not year_months:
+        return {}
+    rules = _rules_for_months(year_months, rules)
+
+    if not workers or workers <= 1 or len(year_months) == 1:
+        results = {}
+        for year_month, rows in _iter_months(rules, year_months, base_week_type, cross_month_continuous, engine):
+            results[year_month] = {'schedule': list(rows)}
+            if on_month_done:
+                on_month_done(year_month)
+        return results
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(year_months)),
+                             initializer=_init_worker, initargs=(rules,)) as executor:
+        futures = {
+            executor.submit(_build_task, year_month, base_week_type, cross_month_continuous, engine, None): year_month
+            for year_month in year_months
+        }
+        if on_month_done:
+            for future in as_completed(futures):
+                on_month_done(futures[future])
+        results = {year_month: future.result() for future, year_month in futures.items()}
+        return {year_month: {'schedule': results[year_month]} for year_month in year_months}
+
+
+def generate_year_schedule(year: int, base_week_type: str = '大周', cross_month_continuous: bool = True,
+                           engine: str = 'python', workers: int = None):
+    """
+    生成全年排班
+
+    人员、班次、覆盖规则、请假记录只查询一次，覆盖规则与请假记录一次遍历划分到 12 个月，
+    各月结果与逐月调用 generate_schedule 完全一致。
+
+    返回 {"YYYY-MM": {"schedule": [...]}, ...}
+    """
+    return generate_schedules(
+        [f"{year}-{month:02d}" for month in range(1, 13)],
+        base_week_type=base_week_type,
+        cross_month_continuous=cross_month_continuous,
+        engine=engine,
+        workers=workers
+    )
@@ -0,0 +1,185 @@
+"""
+排班生成器（NumPy 向量化引擎）
+
+以 人员 × 日期 的矩阵一次性计算整月排班：
+- 状态矩阵使用 int8 编码（上班/休息/各类请假）
+- 班次矩阵记录每个格子的班次索引
+- 大小周基础判断取自进程内缓存的班次工作日位图（work_calendar），调休覆盖与请假按人员行、日期区间批量写入
+
+结果与 schedule_generator 中的逐格计算完全一致。
+"""
+from time import perf_counter
+
+import numpy as np
+
+from . import request_timing
+from .models import Absence
+
+STATUS_WORK = 0
+STATUS_REST = 1
+
+
+def iter_schedule_numpy(persons, week_configs, date_info_list, override_index, absence_index):
+    """向量化计算排班矩阵，再按与 python 引擎相同的顺序逐行产出相同的结果"""
+    from .schedule_generator import _shift_work_map
+
+    person_count = len(persons)
+    day_count = len(date_info_list)
+    if not person_count or not day_count:
+        return
+    started = perf_counter()
+
+    # 请假类型编码从 2 开始，与上班/休息区分（即使类型名相同也不会被当作上班）
+    status_labels = ['上班', '休息'] + [choice for choice, _ in Absence.ABSENCE_TYPE_CHOICES]
+    absence_codes = {label: code for code, label in enumerate(status_labels) if code > STATUS_REST}
+
+    # 班次索引：0 表示无班次
+    shift_defs = [None]
+    shift_index = {}
+
+    def index_of(shift_def):
+        key = shift_def.id if shift_def else None
+        if key is None:
+            shift_index[None] = 0
+            return 0
+        if key not in shift_index:
+            shift_index[key] = len(shift_defs)
+            shift_defs.append(shift_def)
+        return shift_index[key]
+
+    fixed_idx = np.zeros(person_count, dtype=np.int16)
+    odd_idx = np.zeros(person_count, dtype=np.int16)
+    even_idx = np.zeros(person_count, dtype=np.int16)
+    is_rotation = np.zeros(person_count, dtype=bool)
+    group_names = []
+    rotation_names = []
+    for row, person in enumerate(persons):
+        if person.rotation_group:
+            is_rotation[row] = True
+            odd_idx[row] = index_of(person.rotation_group.odd_shift)
+            even_idx[row] = index_of(person.rotation_group.even_shift)
+        else:
+            fixed_idx[row] = index_of(person.shift_type)
+        group_names.append(person.group.name if person.group else '未分组')
+        rotation_names.append(person.rotation_group.name if person.rotation_group else '')
+
+    shift_labels = [shift_def.name if shift_def else '' for shift_def in shift_defs]
+
+    # 日期按年度日期表分段，每段取各班次工作日位图中对应的天
+    day_indexes = np.array([info['day_index'] for info in date_info_list], dtype=np.int64)
+    segments = []
+    for column, info in enumerate(date_info_list):
+        if not segments or segments[-1][0] is not info['calendar']:
+            segments.append([info['calendar'], column, column])
+        segments[-1][2] = column + 1
+
+    # 每个班次逐日是否按大小周上班（无班次人员才需要默认配置）
+    shift_works = np.zeros((len(shift_defs), day_count), dtype=bool)
+    for index, shift_def in enumerate(shift_defs):
+        if index == 0 and None not in shift_index:
+            continue
+        for calendar, first, last in segments:
+            work_map = np.frombuffer(_shift_work_map(calendar, week_configs, shift_def), dtype=np.uint8)
+            shift_works[index, first:last] = work_map[day_indexes[first:last]]
+
+    odd_month = np.array([info['rotation_month'] % 2 == 1 for info in date_info_list], dtype=bool)
+
+    shift_matrix = np.where(
+        is_rotation[:, None],
+        np.where(odd_month[None, :], odd_idx[:, None], even_idx[:, None]),
+        fixed_idx[:, None]
+    )
+    works = shift_works[shift_matrix, np.arange(day_count)[None, :]]
+    status_matrix = np.where(works, STATUS_WORK, STATUS_REST).astype(np.int8)
+
+    # 调休/节假日覆盖：按优先级从低到高写入，高优先级最后覆盖
+    first_date = date_info_list[0]['date']
+    person_rows = {person.id: row for row, person in enumerate(persons)}
+    person_names = [person.name for person in persons]
+    scope_masks = {}
+    for start_date, end_date, override, person_ids in sorted(
+            override_index.spans, key=lambda item: (item[2].priority, item[2].id)):
+        if override.override_type == '上班':
+            code = STATUS_WORK
+        elif override.override_type == '休息':
+            code = STATUS_REST
+        else:
+            continue
+        start = max((start_date - first_date).days, 0)
+        end = min((end_date - first_date).days, day_count - 1)
+        if start > end:
+            continue
+        if person_ids is None:
+            status_matrix[:, start:end + 1] = code
+            continue
+        scope_key = id(person_ids)
+        if scope_key not in scope_masks:
+            rows = [person_rows[person_id] for person_id in person_ids if person_id in person_rows]
+            scope_masks[scope_key] = np.array(rows, dtype=np.int64)
+        rows = scope_masks[scope_key]
+        if rows.size:
+            status_matrix[rows, start:end + 1] = code
+
+    # 请假记录最后覆盖：区间索引中的区间互不重叠，直接按区间写入
+    last_date = date_info_list[-1]['date']
+    for row, person in enumerate(persons):
+        for interval_start, interval_end, absence in absence_index.person_intervals(person.id, first_date, last_date):
+            start = (interval_start - first_date).days
+            end = (interval_end - first_date).days
+            if absence.count_as_rest:
+                code = STATUS_REST
+            else:
+                if absence.type not in absence_codes:
+                    absence_codes[absence.type] = len(status_labels)
+                    status_labels.append(absence.type)
+                code = absence_codes[absence.type]
+            status_matrix[row, start:end + 1] = code
+
+    shift_out = np.where(status_matrix == STATUS_WORK, shift_matrix, 0)
+
+    started = request_timing.lap('loop', started)
+
+    # 排序：日期、组、班次、姓名，相同键保持人员原始顺序
+    group_rank = _rank(group_names)
+    name_rank = _rank(person_names)
+    shift_rank = _rank(shift_labels)
+    flat_days = np.repeat(np.arange(day_count), person_count)
+    flat_persons = np.tile(np.arange(person_count), day_count)
+    flat_shifts = shift_out.T.ravel()
+    order = np.lexsort((
+        flat_persons,
+        name_rank[flat_persons],
+        shift_rank[flat_shifts],
+        group_rank[flat_persons],
+        flat_days,
+    ))
+    request_timing.lap('sort', started)
+
+    flat_status = status_matrix.T.ravel().tolist()
+    flat_shifts = flat_shifts.tolist()
+    date_strs = [info['date_str'] for info in date_info_list]
+    for position in order.tolist():
+        column, row = divmod(position, person_count)
+        person = persons[row]
+        yield {
+            'person_id': person.id,
+            'person_name': person.name,
+            'group': group_names[row],
+            'rotation_group': rotation_names[row],
+            'date': date_strs[column],
+            'shift': shift_labels[flat_shifts[position]],
+            'status': status_labels[flat_status[position]],
+            'is_violation': False,
+            'violation_reason': ''
+        }
+
+
+def build_schedule_numpy(persons, week_configs, date_info_list, override_index, absence_index):
+    """向量化计算排班，返回与 python 引擎相同顺序、相同内容的结果列表"""
+    return list(iter_schedule_numpy(persons, week_configs, date_info_list, override_index, absence_index))
+
+
+def _rank(values):
+    """按 Python 字符串顺序为取值编号"""
+    ordering = {value: rank for rank, value in enumerate(sorted(set(values)))}
+    return np.array([ordering[value] for value in values], dtype=np.int64)
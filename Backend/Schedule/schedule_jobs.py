@@ -0,0 +1,264 @@
+"""
+排班生成任务
+
+提交后立即返回任务 ID，生成在本进程的线程池中执行（workers 大于 1 时各月份再交给进程池并行计算），
+客户端轮询或长轮询任务状态与进度，完成后获取结果。不依赖外部消息队列。
+
+- 相同参数且数据版本相同的任务只保留一个：进行中或已完成的任务会被直接复用
+- 已完成的任务最多保留 SCHEDULE_JOB_MAX_FINISHED 个，超过 SCHEDULE_JOB_RESULT_TTL 秒后淘汰
+
+任务保存在当前进程内存中，多进程部署时需要让同一客户端的请求落到同一进程（或只开一个工作进程）。
+"""
+import calendar
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from time import monotonic
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils.dateparse import parse_date
+
+from .schedule_generator import ENGINES, MAX_RANGE_DAYS, generate_schedules, iter_range
+from .versioning import get_data_version
+
+JOB_KINDS = ('month', 'year', 'range')
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# 长轮询最长等待秒数
+MAX_WAIT_SECONDS = 30
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _parse_month(value, name):
+    try:
+        return datetime.strptime(str(value or ''), '%Y-%m').date()
+    except ValueError:
+        raise ValueError(f'{name} 格式错误: {value}（应为 YYYY-MM）')
+
+
+def _months_between(start_date, end_date):
+    year_months = []
+    year, month = start_date.year, start_date.month
+    while (year, month) <= (end_date.year, end_date.month):
+        year_months.append(f"{year}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return year_months
+
+
+def job_span(kind, params):
+    """
+    根据任务类型与参数计算 (月份列表, 开始日期, 结束日期)，参数不合法时抛出 ValueError
+
+    month / year 任务按整月生成，开始、结束日期为 None；range 任务按 start_date ~ end_date 生成
+    （或 start_month ~ end_month 的整月），不超过 MAX_RANGE_DAYS 天。
+    """
+    if kind == 'month':
+        return [_parse_month(params.get('year_month'), 'year_month').strftime('%Y-%m')], None, None
+    if kind == 'year':
+        year = str(params.get('year') or '')
+        if not (year.isdigit() and 1 <= int(year) <= 9999):
+            raise ValueError('缺少 year 参数或格式错误（应为 YYYY）')
+        return [f"{int(year):04d}-{month:02d}" for month in range(1, 13)], None, None
+    if kind != 'range':
+        raise ValueError(f'不支持的任务类型: {kind}')
+
+    if params.get('start_date') or params.get('end_date'):
+        try:
+            start_date = parse_date(str(params.get('start_date') or ''))
+            end_date = parse_date(str(params.get('end_date') or ''))
+        except ValueError:
+            start_date = end_date = None
+        if start_date is None or end_date is None:
+            raise ValueError('range 任务需要 start_date 和 end_date (YYYY-MM-DD)')
+    else:
+        start_date = _parse_month(params.get('start_month'), 'start_month')
+        end_month = _parse_month(params.get('end_month'), 'end_month')
+        end_date = end_month.replace(day=calendar.monthrange(end_month.year, end_month.month)[1])
+    if start_date > end_date:
+        raise ValueError('开始日期不能晚于结束日期')
+    if (end_date - start_date).days + 1 > MAX_RANGE_DAYS:
+        raise ValueError(f'日期范围不能超过 {MAX_RANGE_DAYS} 天')
+    return _months_between(start_date, end_date), start_date, end_date
+
+
+class ScheduleJob:
+    def __init__(self, key, kind, year_months, base_week_type, cross_month_continuous, engine,
+                 start_date=None, end_date=None):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.kind = kind
+        self.year_months = year_months
+        self.start_date = start_date
+        self.end_date = end_date
+        self.base_week_type = base_week_type
+        self.cross_month_continuous = cross_month_continuous
+        self.engine = engine
+        self.status = QUEUED
+        self.completed = 0
+        self.error = ''
+        self.result = None
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.finished_monotonic = None
+        self.done_event = threading.Event()
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    def to_dict(self):
+        def iso(value):
+            if isinstance(value, datetime):
+                return value.isoformat(timespec='seconds')
+            return value.isoformat() if value else None
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'year_months': self.year_months,
+            'start_date': iso(self.start_date),
+            'end_date': iso(self.end_date),
+            'base_week_type': self.base_week_type,
+            'cross_month_continuous': self.cross_month_continuous,
+            'engine': self.engine,
+            'progress': {'completed': self.completed, 'total': len(self.year_months)},
+            'error': self.error,
+            'created_at': iso(self.created_at),
+            'started_at': iso(self.started_at),
+            'finished_at': iso(self.finished_at),
+        }
+
+
+_lock = threading.Lock()
+_jobs = OrderedDict()
+_active_keys = {}
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=_setting('SCHEDULE_JOB_THREADS', 2),
+            thread_name_prefix='schedule-job'
+        )
+    return _executor
+
+
+def _evict():
+    """淘汰过期或超出数量上限的已完成任务（调用方持有 _lock）"""
+    ttl = _setting('SCHEDULE_JOB_RESULT_TTL', 600)
+    max_finished = _setting('SCHEDULE_JOB_MAX_FINISHED', 20)
+    now = monotonic()
+    finished = [job for job in _jobs.values() if job.finished]
+    expired = [job for job in finished if now - job.finished_monotonic > ttl]
+    remaining = [job for job in finished if job not in expired]
+    expired.extend(remaining[:max(0, len(remaining) - max_finished)])
+    for job in expired:
+        _jobs.pop(job.id, None)
+        if _active_keys.get(job.key) is job:
+            del _active_keys[job.key]
+
+
+def submit_job(kind, params, base_week_type='大周', cross_month_continuous=True, engine='python'):
+    """
+    提交生成任务，返回 (任务, 是否复用了已有任务)
+
+    参数不合法时立即抛出 ValueError。
+    """
+    if engine not in ENGINES:
+        raise ValueError(f'不支持的计算引擎: {engine}')
+    year_months, start_date, end_date = job_span(kind, params)
+    base_week_type = '小周' if base_week_type == '小周' else '大周'
+    cross_month_continuous = bool(cross_month_continuous)
+    # 不同引擎结果一致，不计入去重键；数据版本变化后旧结果不再复用
+    key = (tuple(year_months), start_date, end_date, base_week_type, cross_month_continuous, get_data_version())
+
+    with _lock:
+        _evict()
+        job = _active_keys.get(key)
+        if job is not None and job.status != FAILED:
+            return job, True
+        job = ScheduleJob(
+            key, kind, year_months, base_week_type, cross_month_continuous, engine, start_date, end_date
+        )
+        _jobs[job.id] = job
+        _active_keys[key] = job
+    _get_executor().submit(_run_job, job)
+    return job, False
+
+
+def _range_result(job, on_month_done):
+    """按日期范围生成，结果按月份分组（与整月任务格式相同，首尾月份只含范围内的日期）"""
+    rows = iter_range(
+        job.start_date,
+        job.end_date,
+        base_week_type=job.base_week_type,
+        cross_month_continuous=job.cross_month_continuous,
+        engine=job.engine
+    )
+    result = {year_month: {'schedule': []} for year_month in job.year_months}
+    current = None
+    # 结果先按日期排序，月份依次出现
+    for row in rows:
+        year_month = row['date'][:7]
+        if year_month != current:
+            if current is not None:
+                on_month_done(current)
+            current = year_month
+        result[year_month]['schedule'].append(row)
+    if current is not None:
+        on_month_done(current)
+    return result
+
+
+def _run_job(job):
+    job.status = RUNNING
+    job.started_at = datetime.now()
+
+    def month_done(_):
+        job.completed += 1
+
+    try:
+        if job.start_date is not None:
+            job.result = _range_result(job, month_done)
+        else:
+            job.result = generate_schedules(
+                job.year_months,
+                base_week_type=job.base_week_type,
+                cross_month_continuous=job.cross_month_continuous,
+                engine=job.engine,
+                workers=_setting('SCHEDULE_WORKERS', 1),
+                on_month_done=month_done
+            )
+        job.status = DONE
+    except Exception as e:
+        job.error = str(e)
+        job.status = FAILED
+    finally:
+        job.finished_at = datetime.now()
+        job.finished_monotonic = monotonic()
+        job.done_event.set()
+        # 线程池线程不经过请求周期，需要自行关闭数据库连接
+        close_old_connections()
+
+
+def get_job(job_id, wait=0):
+    """获取任务；wait 大于 0 时最多等待 wait 秒直到任务完成（长轮询）"""
+    with _lock:
+        _evict()
+        job = _jobs.get(job_id)
+    if job is not None and wait > 0 and not job.finished:
+        job.done_event.wait(min(wait, MAX_WAIT_SECONDS))
+    return job
@@ -0,0 +1,88 @@
+"""
+排班规则快照
+
+把人员、班次大小周配置、调休覆盖和请假记录预先加载成只含基础类型的快照，
+可以在进程间 pickle 传递，供多进程并行生成排班使用。
+
+本模块不在导入时引用 Django 模型，子进程（spawn/forkserver）可先反序列化快照再初始化 Django。
+"""
+from collections import namedtuple
+
+
+ShiftRule = namedtuple('ShiftRule', ['id', 'name'])
+GroupRule = namedtuple('GroupRule', ['id', 'name'])
+RotationRule = namedtuple('RotationRule', ['id', 'name', 'odd_shift', 'even_shift'])
+PersonRule = namedtuple('PersonRule', ['id', 'name', 'group', 'shift_type', 'rotation_group'])
+OverrideRule = namedtuple('OverrideRule', [
+    'id', 'date', 'end_date', 'override_type', 'scope', 'target', 'priority',
+    'target_group_id', 'target_rotation_group_id', 'target_person_ids',
+])
+AbsenceRule = namedtuple('AbsenceRule', ['id', 'person_id', 'start_date', 'end_date', 'type', 'count_as_rest'])
+
+
+class ScheduleRules:
+    """
+    排班规则快照
+
+    覆盖 start_date ~ end_date 范围：overrides、absences 为与该范围相交的记录，
+    persons 按 id 排序。覆盖规则的 target_person_ids 为指定人员的 ID 集合（frozenset，其他范围为空集）。
+    """
+
+    def __init__(self, start_date, end_date, persons, week_configs, overrides, absences):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.persons = persons
+        self.week_configs = week_configs
+        self.overrides = overrides
+        self.absences = absences
+
+    def override_index(self):
+        """覆盖规则区间索引，首次使用时构建"""
+        index = getattr(self, '_override_index', None)
+        if index is None:
+            from .override_index import OverrideIndex
+            index = self._override_index = OverrideIndex(self.overrides, self.persons)
+        return index
+
+    def absence_index(self):
+        """请假区间索引，首次使用时构建"""
+        index = getattr(self, '_absence_index', None)
+        if index is None:
+            from .absence_index import AbsenceIndex
+            index = self._absence_index = AbsenceIndex(self.absences)
+        return index
+
+    def covers(self, start_date, end_date):
+        return self.start_date <= start_date and end_date <= self.end_date
+
+    def for_persons(self, person_ids):
+        """只保留指定人员及其请假记录的子快照"""
+        person_ids = set(person_ids)
+        return ScheduleRules(
+            self.start_date,
+            self.end_date,
+            [person for person in self.persons if person.id in person_ids],
+            self.week_configs,
+            self.overrides,
+            [absence for absence in self.absences if absence.person_id in person_ids]
+        )
+
+
+# 进程池工作进程使用的快照，由 _init_worker 在每个进程启动时设置一次
+_worker_rules = None
+
+
+def _init_worker(rules):
+    global _worker_rules
+    from django.apps import apps
+    if not apps.ready:
+        import django
+        django.setup()
+    _worker_rules = rules
+
+
+def _build_task(year_month, base_week_type, cross_month_continuous, engine, person_ids):
+    from .schedule_generator import build_month_schedule
+
+    rules = _worker_rules if person_ids is None else _worker_rules.for_persons(person_ids)
+    return build_month_schedule(rules, year_month, base_week_type, cross_month_continuous, engine)
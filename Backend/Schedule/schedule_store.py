@@ -0,0 +1,204 @@
+"""
+物化排班存储
+
+首次生成某月排班时把结果按 每人每月一行 写入 MaterializedScheduleRow，
+之后读取直接展开存储行，不再执行规则计算。
+数据变更时由 signals 调用 refresh_persons：与变更日期范围重叠的月份记录待重算的人员，
+随后在专用的重算线程中执行（与排班生成任务的线程池分开，长时间的生成任务不会推迟重算；SCHEDULE_STORE_DEFERRED_REFRESH 为 False 或使用 SQLite 时在提交回调中同步重算，
+SQLite 同一时间只允许一个写入者，后台写入会使请求中的写入失败）；
+读取仍有待重算人员的月份时先同步重算，读取结果始终是最新的。
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+from . import request_timing
+from .models import MaterializedScheduleMonth, MaterializedScheduleRow
+from .schedule_generator import ENGINES, generate_schedule, month_bounds, schedule_sort_key
+
+logger = logging.getLogger(__name__)
+
+_refresh_executor = None
+_refresh_executor_lock = threading.Lock()
+
+
+def _normalize_params(base_week_type, cross_month_continuous):
+    base_week_type = '小周' if base_week_type == '小周' else '大周'
+    return base_week_type, bool(cross_month_continuous)
+
+
+def _month_dates(year_month):
+    start_date, end_date = month_bounds(year_month)
+    return [
+        (start_date + timedelta(days=offset)).strftime('%Y-%m-%d')
+        for offset in range((end_date - start_date).days + 1)
+    ]
+
+
+def materialize_month(schedule_month, person_ids=None, engine='python'):
+    """计算并写入某个物化月份的行；person_ids 为 None 时重算全部人员"""
+    result = generate_schedule(
+        schedule_month.year_month,
+        base_week_type=schedule_month.base_week_type,
+        cross_month_continuous=schedule_month.cross_month_continuous,
+        engine=engine,
+        person_ids=person_ids
+    )
+
+    with request_timing.phase('store'):
+        rows = {}
+        for item in result['schedule']:
+            row = rows.get(item['person_id'])
+            if row is None:
+                row = rows[item['person_id']] = MaterializedScheduleRow(
+                    month=schedule_month,
+                    person_id=item['person_id'],
+                    person_name=item['person_name'],
+                    group=item['group'],
+                    rotation_group=item['rotation_group'],
+                    statuses=[],
+                    shifts=[]
+                )
+            # 结果按日期排序，逐条追加即为日期顺序
+            row.statuses.append(item['status'])
+            row.shifts.append(item['shift'])
+
+        with transaction.atomic():
+            stale = MaterializedScheduleRow.objects.filter(month=schedule_month)
+            if person_ids is not None:
+                stale = stale.filter(person_id__in=person_ids)
+            stale.delete()
+            MaterializedScheduleRow.objects.bulk_create(rows.values())
+            schedule_month.save(update_fields=['updated_at'])
+
+
+def get_materialized_schedule(year_month, base_week_type='大周', cross_month_continuous=True, engine='python'):
+    """读取物化排班，不存在时先生成并写入"""
+    if engine not in ENGINES:
+        raise ValueError(f'不支持的计算引擎: {engine}')
+    base_week_type, cross_month_continuous = _normalize_params(base_week_type, cross_month_continuous)
+    with transaction.atomic():
+        schedule_month, created = MaterializedScheduleMonth.objects.get_or_create(
+            year_month=year_month,
+            base_week_type=base_week_type,
+            cross_month_continuous=cross_month_continuous
+        )
+        if created:
+            materialize_month(schedule_month, engine=engine)
+    if (schedule_month.stale_all or schedule_month.stale_person_ids) and not refresh_month(schedule_month.pk):
+        # 重算失败，该月物化结果已丢弃，重新完整生成
+        return get_materialized_schedule(year_month, base_week_type, cross_month_continuous, engine)
+
+    with request_timing.phase('store'):
+        date_strs = _month_dates(year_month)
+        schedule_data = []
+        for row in schedule_month.rows.order_by('person_id'):
+            for date_str, status, shift in zip(date_strs, row.statuses, row.shifts):
+                schedule_data.append({
+                    'person_id': row.person_id,
+                    'person_name': row.person_name,
+                    'group': row.group,
+                    'rotation_group': row.rotation_group,
+                    'date': date_str,
+                    'shift': shift,
+                    'status': status,
+                    'is_violation': False,
+                    'violation_reason': ''
+                })
+        return {'schedule': sorted(schedule_data, key=schedule_sort_key)}
+
+
+def _months_between(start_date, end_date):
+    months = []
+    year, month = start_date.year, start_date.month
+    while (year, month) <= (end_date.year, end_date.month):
+        months.append(f"{year}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def refresh_month(schedule_month_id):
+    """
+    重算某个物化月份的待重算人员，返回 False 表示重算失败、该月物化结果已丢弃
+
+    月份行加锁，后台重算与读取时的重算不会重复执行。
+    """
+    with transaction.atomic():
+        schedule_month = MaterializedScheduleMonth.objects.select_for_update().filter(pk=schedule_month_id).first()
+        if schedule_month is None or not (schedule_month.stale_all or schedule_month.stale_person_ids):
+            return True
+        person_ids = None if schedule_month.stale_all else schedule_month.stale_person_ids
+        try:
+            materialize_month(schedule_month, person_ids=person_ids)
+        except Exception:
+            # 丢弃该月物化结果，下次读取时重新完整生成
+            logger.exception('重算物化排班 %s 时出错，已丢弃该月物化结果', schedule_month.year_month)
+            schedule_month.delete()
+            return False
+        schedule_month.stale_all = False
+        schedule_month.stale_person_ids = []
+        schedule_month.save(update_fields=['stale_all', 'stale_person_ids'])
+    return True
+
+
+def _refresh_months(schedule_month_ids):
+    for schedule_month_id in schedule_month_ids:
+        refresh_month(schedule_month_id)
+
+
+def _get_refresh_executor():
+    global _refresh_executor
+    with _refresh_executor_lock:
+        if _refresh_executor is None:
+            _refresh_executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'SCHEDULE_STORE_REFRESH_THREADS', 1),
+                thread_name_prefix='schedule-store-refresh'
+            )
+    return _refresh_executor
+
+
+def _refresh_in_background(schedule_month_ids):
+    def run():
+        try:
+            _refresh_months(schedule_month_ids)
+        finally:
+            close_old_connections()
+    return _get_refresh_executor().submit(run)
+
+
+def refresh_persons(person_ids=None, start_date=None, end_date=None):
+    """
+    标记已物化月份中受影响的行待重算，并安排重算
+
+    person_ids 为 None 表示全部人员；start_date/end_date 为 None 表示所有已物化月份，
+    否则只处理与该日期范围重叠的月份。
+    """
+    if person_ids is not None:
+        person_ids = set(person_ids)
+        if not person_ids:
+            return
+    schedule_months = MaterializedScheduleMonth.objects.all()
+    if start_date is not None and end_date is not None:
+        if end_date < start_date:
+            start_date, end_date = end_date, start_date
+        schedule_months = schedule_months.filter(year_month__in=_months_between(start_date, end_date))
+
+    schedule_month_ids = []
+    with transaction.atomic():
+        for schedule_month in schedule_months.select_for_update():
+            if person_ids is None:
+                schedule_month.stale_all = True
+            elif not schedule_month.stale_all:
+                schedule_month.stale_person_ids = sorted(person_ids.union(schedule_month.stale_person_ids))
+            schedule_month.save(update_fields=['stale_all', 'stale_person_ids'])
+            schedule_month_ids.append(schedule_month.pk)
+    if not schedule_month_ids:
+        return
+    if getattr(settings, 'SCHEDULE_STORE_DEFERRED_REFRESH', True) and connection.vendor != 'sqlite':
+        _refresh_in_background(schedule_month_ids)
+    else:
+        _refresh_months(schedule_month_ids)
@@ -2,18 +2,29 @@ from rest_framework import serializers
 from .models import *
 
 
-class ShiftDefinitionSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """支持 fields 参数只输出部分字段，如 Serializer(queryset, many=True, fields=['id', 'name'])"""
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class ShiftDefinitionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = ShiftDefinition
         fields = '__all__'
 
 
-class GroupConfigSerializer(serializers.ModelSerializer):
+class GroupConfigSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = GroupConfig
         fields = '__all__'
 
-class ShiftRotationGroupSerializer(serializers.ModelSerializer):
+class ShiftRotationGroupSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     oddShiftName = serializers.CharField(source='odd_shift.name', read_only=True)
     evenShiftName = serializers.CharField(source='even_shift.name', read_only=True)
 
@@ -22,7 +33,7 @@ class ShiftRotationGroupSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class PersonSerializer(serializers.ModelSerializer):
+class PersonSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     shiftType = serializers.CharField(source='shift_type.name', read_only=True)
     rotationGroupName = serializers.CharField(source='rotation_group.name', read_only=True)
     groupName = serializers.CharField(source='group.name', read_only=True)
@@ -32,13 +43,81 @@ class PersonSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class AbsenceSerializer(serializers.ModelSerializer):
+class AbsenceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Absence
         fields = '__all__'
 
 
-class CalendarOverrideSerializer(serializers.ModelSerializer):
+class CalendarOverrideSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    作用目标保存为 target_group / target_persons / target_rotation_group
+
+    兼容只传 target 名称的写法：按名称查找对应的组、人员（同名人员全部关联）或轮换组合；
+    输出的 target 为目标的当前名称。
+    """
+    TARGET_FIELDS = ('target', 'target_group', 'target_persons', 'target_rotation_group')
+
     class Meta:
         model = CalendarOverride
-        fields = '__all__'
+        exclude = ('effective_end_date',)
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if 'target' in data:
+            data['target'] = instance.target_label()
+        return data
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if self.instance is not None and self.partial and not set(self.TARGET_FIELDS) & set(attrs):
+            if 'scope' not in attrs:
+                return attrs
+            # 只修改作用范围时沿用原有目标
+            current = {
+                'target': self.instance.target,
+                'target_group': self.instance.target_group,
+                'target_persons': list(self.instance.target_persons.all()),
+                'target_rotation_group': self.instance.target_rotation_group,
+            }
+            attrs = {**current, **attrs}
+        attrs.update(self._resolve_target(
+            attrs.get('scope', self.instance.scope if self.instance is not None else '全员'), attrs
+        ))
+        return attrs
+
+    @staticmethod
+    def _resolve_target(scope, attrs):
+        name = attrs.get('target') or ''
+        group = attrs.get('target_group')
+        persons = list(attrs.get('target_persons') or [])
+        rotation_group = attrs.get('target_rotation_group')
+        resolved = {'target': None, 'target_group': None, 'target_persons': [], 'target_rotation_group': None}
+
+        if scope == '指定组':
+            if group is None and name and name != '未分组':
+                group = GroupConfig.objects.filter(name=name).first()
+                if group is None:
+                    raise serializers.ValidationError({'target': [f'组 {name} 不存在']})
+            if group is None and name != '未分组':
+                raise serializers.ValidationError({'target_group': ['指定组需要目标组']})
+            resolved.update(target=group.name if group else name, target_group=group)
+        elif scope == '指定人员':
+            if not persons and name:
+                persons = list(Person.objects.filter(name=name))
+                if not persons:
+                    raise serializers.ValidationError({'target': [f'人员 {name} 不存在']})
+            if not persons:
+                raise serializers.ValidationError({'target_persons': ['指定人员需要目标人员']})
+            resolved.update(
+                target='、'.join(dict.fromkeys(person.name for person in persons)), target_persons=persons
+            )
+        elif scope == '指定轮换组合':
+            if rotation_group is None and name:
+                rotation_group = ShiftRotationGroup.objects.filter(name=name).first()
+                if rotation_group is None:
+                    raise serializers.ValidationError({'target': [f'轮换组合 {name} 不存在']})
+            if rotation_group is None:
+                raise serializers.ValidationError({'target_rotation_group': ['指定轮换组合需要目标轮换组合']})
+            resolved.update(target=rotation_group.name, target_rotation_group=rotation_group)
+        return resolved
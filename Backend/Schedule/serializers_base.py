@@ -1,71 +1,95 @@
+import re
+from functools import lru_cache
+
 from rest_framework import serializers
 
+# 字段名种类有限，转换结果按字符串缓存，大批量数据只在第一次遇到某个键时做字符串处理
+KEY_CACHE_SIZE = 4096
+
+_FIRST_CAP_RE = re.compile('(.)([A-Z][a-z]+)')
+_ALL_CAP_RE = re.compile('([a-z0-9])([A-Z])')
 
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
 def to_camel_case(string):
     """将snake_case转换为camelCase"""
     components = string.split('_')
     return components[0] + ''.join(x.title() for x in components[1:])
 
 
+@lru_cache(maxsize=KEY_CACHE_SIZE)
 def to_snake_case(string):
     """将camelCase转换为snake_case"""
-    import re
-    s1 = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', string)
-    return re.sub('([a-z0-9])([A-Z])', r'\1_\2', s1).lower()
+    s1 = _FIRST_CAP_RE.sub(r'\1_\2', string)
+    return _ALL_CAP_RE.sub(r'\1_\2', s1).lower()
+
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def _nested_snake_key(key):
+    """嵌套字典的字段名：已是snake_case或全小写时保持不变"""
+    return key if '_' in key or key.islower() else to_snake_case(key)
 
 
 class CamelCaseModelSerializer(serializers.ModelSerializer):
     """自定义ModelSerializer,自动处理camelCase和snake_case的转换"""
-    
+
+    def _get_key_maps(self):
+        """
+        字段名映射 (输出 {字段名: camelCase}, 输入 {camelCase: 字段名})
+
+        按字段定义构建，缓存在序列化器类上，以字段名元组为键：同一个类、同一种字段裁剪（fields 参数）只构建一次。
+        """
+        cls = type(self)
+        cache = cls.__dict__.get('_key_maps_cache')
+        if cache is None:
+            cache = {}
+            cls._key_maps_cache = cache
+        field_names = tuple(self.fields)
+        key_maps = cache.get(field_names)
+        if key_maps is None:
+            output_keys = {name: to_camel_case(name) for name in field_names}
+            input_keys = {camel: name for name, camel in output_keys.items()}
+            key_maps = cache.setdefault(field_names, (output_keys, input_keys))
+        return key_maps
+
     def to_representation(self, instance):
         """将输出字段名从snake_case转换为camelCase"""
         ret = super().to_representation(instance)
-        return self._convert_nested_keys(ret)
-    
+        output_keys = self._get_key_maps()[0]
+        return {
+            output_keys[key] if key in output_keys else to_camel_case(key): self._convert_nested_keys(value)
+            for key, value in ret.items()
+        }
+
     def _convert_nested_keys(self, data):
         """递归转换嵌套对象的字段名"""
         if isinstance(data, dict):
-            converted = {}
-            for key, value in data.items():
-                camel_key = to_camel_case(key)
-                if isinstance(value, dict):
-                    converted[camel_key] = self._convert_nested_keys(value)
-                elif isinstance(value, list):
-                    converted[camel_key] = [self._convert_nested_keys(item) if isinstance(item, dict) else item for item in value]
-                else:
-                    converted[camel_key] = value
-            return converted
+            return {to_camel_case(key): self._convert_nested_keys(value) for key, value in data.items()}
+        if isinstance(data, list):
+            return [self._convert_nested_keys(item) if isinstance(item, dict) else item for item in data]
         return data
 
     def to_internal_value(self, data):
         """将输入字段名从camelCase转换为snake_case"""
-        # 如果是字典，进行字段名转换
+        # 如果是字典，进行字段名转换：字段的camelCase名称直接对应字段，其他键按规则转换
         if isinstance(data, dict):
-            new_data = {}
-            for key, value in data.items():
-                # 修复转换逻辑：对于camelCase格式的字段名也要进行转换
-                snake_key = to_snake_case(key)
-                if isinstance(value, dict):
-                    new_data[snake_key] = self._convert_dict_values(value)
-                elif isinstance(value, list) and all(isinstance(item, dict) for item in value):
-                    new_data[snake_key] = [self._convert_dict_values(item) for item in value]
-                else:
-                    new_data[snake_key] = value
-            data = new_data
-        
+            input_keys = self._get_key_maps()[1]
+            data = {
+                input_keys[key] if key in input_keys else to_snake_case(key): self._convert_input_value(value)
+                for key, value in data.items()
+            }
+
         return super().to_internal_value(data)
-    
+
+    def _convert_input_value(self, value):
+        if isinstance(value, dict):
+            return self._convert_dict_values(value)
+        if isinstance(value, list) and all(isinstance(item, dict) for item in value):
+            return [self._convert_dict_values(item) for item in value]
+        return value
+
     def _convert_dict_values(self, data):
         """转换嵌套字典中的字段名"""
         if isinstance(data, dict):
-            new_data = {}
-            for key, value in data.items():
-                snake_key = to_snake_case(key) if not ('_' in key or key.islower()) else key
-                if isinstance(value, dict):
-                    new_data[snake_key] = self._convert_dict_values(value)
-                elif isinstance(value, list) and all(isinstance(item, dict) for item in value):
-                    new_data[snake_key] = [self._convert_dict_values(item) for item in value]
-                else:
-                    new_data[snake_key] = value
-            return new_data
-        return data
\ No newline at end of file
+            return {_nested_snake_key(key): self._convert_input_value(value) for key, value in data.items()}
+        return data
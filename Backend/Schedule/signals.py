@@ -0,0 +1,278 @@
+"""
+数据变更信号：
+- 递增数据版本（排班结果缓存键的一部分）
+- 计算受影响的人员与日期范围，记录变更（增量排班接口使用）并增量刷新物化排班
+
+批量写入（bulk.py）期间逐行处理被暂停，由批量操作统一递增版本并刷新。
+"""
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .models import Person, ShiftDefinition, ShiftRotationGroup, GroupConfig, Absence, CalendarOverride
+from . import schedule_store, work_calendar
+from .schedule_changes import record_change
+from .versioning import bump_data_version
+
+
+VERSIONED_MODELS = (Person, ShiftDefinition, ShiftRotationGroup, GroupConfig, Absence, CalendarOverride)
+
+_state = threading.local()
+
+
+@contextmanager
+def suspended():
+    """暂停本线程内的逐行信号处理"""
+    previous = getattr(_state, 'suspended', False)
+    _state.suspended = True
+    try:
+        yield
+    finally:
+        _state.suspended = previous
+
+
+def _unless_suspended(func):
+    @wraps(func)
+    def wrapper(sender, **kwargs):
+        if getattr(_state, 'suspended', False):
+            return
+        return func(sender, **kwargs)
+    return wrapper
+
+
+@_unless_suspended
+def _bump_data_version(sender, **kwargs):
+    bump_data_version(sender.__name__)
+
+
+for _model in VERSIONED_MODELS:
+    post_save.connect(_bump_data_version, sender=_model, dispatch_uid=f'data_version_save_{_model.__name__}')
+    post_delete.connect(_bump_data_version, sender=_model, dispatch_uid=f'data_version_delete_{_model.__name__}')
+
+
+def _schedule_refresh(model, person_ids=None, start_date=None, end_date=None):
+    """记录 model 的变更（并推送失效事件），在事务提交后刷新物化排班，避免读取到未提交或回滚的数据"""
+    if person_ids is not None:
+        person_ids = set(person_ids)
+    record_change(person_ids, start_date, end_date, model=model.__name__)
+    if person_ids is not None:
+        if not person_ids:
+            return
+    transaction.on_commit(
+        lambda: schedule_store.refresh_persons(person_ids, start_date, end_date)
+    )
+
+
+def _override_person_ids(override):
+    """覆盖规则作用的人员ID集合，全员返回 None（与 override_index.resolve_scope 一致）"""
+    if override.scope == '全员':
+        return None
+    if override.scope == '指定组':
+        if override.target_group_id is not None:
+            persons = Person.objects.filter(group_id=override.target_group_id)
+        elif override.target == '未分组':
+            persons = Person.objects.filter(group__isnull=True)
+        else:
+            return set()
+    elif override.scope == '指定人员':
+        if override.pk is None:
+            return set()
+        persons = override.target_persons.all()
+    elif override.scope == '指定轮换组合' and override.target_rotation_group_id is not None:
+        persons = Person.objects.filter(rotation_group_id=override.target_rotation_group_id)
+    else:
+        return set()
+    return set(persons.values_list('id', flat=True))
+
+
+def _override_range(override):
+    range_start = override.date
+    range_end = override.end_date or override.date
+    if range_end < range_start:
+        range_start, range_end = range_end, range_start
+    return range_start, range_end
+
+
+def _shift_person_ids(shift_id):
+    return set(
+        Person.objects.filter(
+            Q(shift_type_id=shift_id) |
+            Q(rotation_group__odd_shift_id=shift_id) |
+            Q(rotation_group__even_shift_id=shift_id)
+        ).values_list('id', flat=True)
+    )
+
+
+def _previous(sender, instance):
+    if instance.pk is None:
+        return None
+    return sender.objects.filter(pk=instance.pk).first()
+
+
+# 请假：只影响本人在请假日期范围内的排班
+
+@receiver(pre_save, sender=Absence)
+@_unless_suspended
+def absence_pre_save(sender, instance, **kwargs):
+    instance._schedule_previous = _previous(sender, instance)
+
+
+@receiver(post_save, sender=Absence)
+@_unless_suspended
+def absence_post_save(sender, instance, **kwargs):
+    previous = getattr(instance, '_schedule_previous', None)
+    current = ([instance.person_id], instance.start_date, instance.end_date)
+    if previous is not None and ([previous.person_id], previous.start_date, previous.end_date) != current:
+        _schedule_refresh(sender, [previous.person_id], previous.start_date, previous.end_date)
+    _schedule_refresh(sender, *current)
+
+
+@receiver(post_delete, sender=Absence)
+@_unless_suspended
+def absence_post_delete(sender, instance, **kwargs):
+    _schedule_refresh(sender, [instance.person_id], instance.start_date, instance.end_date)
+
+
+# 日历覆盖：只影响作用范围内的人员在覆盖日期范围内的排班
+
+@receiver(pre_save, sender=CalendarOverride)
+@_unless_suspended
+def calendar_override_pre_save(sender, instance, **kwargs):
+    instance._schedule_previous = _previous(sender, instance)
+
+
+@receiver(post_save, sender=CalendarOverride)
+@_unless_suspended
+def calendar_override_post_save(sender, instance, **kwargs):
+    previous = getattr(instance, '_schedule_previous', None)
+    current = (_override_person_ids(instance), *_override_range(instance))
+    if previous is not None:
+        before = (_override_person_ids(previous), *_override_range(previous))
+        if before != current:
+            _schedule_refresh(sender, *before)
+    _schedule_refresh(sender, *current)
+
+
+@receiver(pre_delete, sender=CalendarOverride)
+@_unless_suspended
+def calendar_override_pre_delete(sender, instance, **kwargs):
+    # 删除后目标人员关联随之删除，在删除前记录
+    instance._schedule_person_ids = _override_person_ids(instance)
+
+
+@receiver(post_delete, sender=CalendarOverride)
+@_unless_suspended
+def calendar_override_post_delete(sender, instance, **kwargs):
+    _schedule_refresh(sender, getattr(instance, '_schedule_person_ids', set()), *_override_range(instance))
+
+
+# 目标人员在覆盖规则保存之后才写入（post_save 时仍是修改前的人员），增减的人员在这里刷新
+
+@receiver(m2m_changed, sender=CalendarOverride.target_persons.through)
+@_unless_suspended
+def calendar_override_targets_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        instance._schedule_cleared_ids = set(
+            sender.objects.filter(**{'person_id' if reverse else 'calendaroverride_id': instance.pk})
+            .values_list('calendaroverride_id' if reverse else 'person_id', flat=True)
+        )
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    changed_ids = getattr(instance, '_schedule_cleared_ids', set()) if action == 'post_clear' else pk_set
+    if not changed_ids:
+        return
+    bump_data_version(CalendarOverride.__name__)
+    if reverse:
+        # 从人员一侧修改：instance 为人员，changed_ids 为覆盖规则ID
+        for override in CalendarOverride.objects.filter(id__in=changed_ids):
+            _schedule_refresh(CalendarOverride, [instance.pk], *_override_range(override))
+    else:
+        _schedule_refresh(CalendarOverride, changed_ids, *_override_range(instance))
+
+
+# 人员：姓名、组、班次变化只影响本人；删除时物化行随人员级联删除
+
+@receiver(post_save, sender=Person)
+@_unless_suspended
+def person_post_save(sender, instance, **kwargs):
+    _schedule_refresh(sender, [instance.id])
+
+
+@receiver(post_delete, sender=Person)
+@_unless_suspended
+def person_post_delete(sender, instance, **kwargs):
+    record_change([instance.id], model=sender.__name__)
+
+
+# 班次、轮换组合、组：影响引用它们的人员。删除时人员外键被置空（不触发人员信号），
+# 因此在删除前记录受影响人员
+
+@receiver(post_save, sender=ShiftDefinition)
+@_unless_suspended
+def shift_definition_post_save(sender, instance, **kwargs):
+    _schedule_refresh(sender, _shift_person_ids(instance.id))
+
+
+@receiver(pre_delete, sender=ShiftDefinition)
+@_unless_suspended
+def shift_definition_pre_delete(sender, instance, **kwargs):
+    instance._schedule_person_ids = _shift_person_ids(instance.id)
+
+
+@receiver(post_delete, sender=ShiftDefinition)
+@_unless_suspended
+def shift_definition_post_delete(sender, instance, **kwargs):
+    _schedule_refresh(sender, getattr(instance, '_schedule_person_ids', set()))
+
+
+# 工作日位图以班次配置为缓存键，修改后不会命中旧位图；这里只负责释放内存，批量操作期间同样执行
+@receiver(post_save, sender=ShiftDefinition, dispatch_uid='work_calendar_shift_save')
+@receiver(post_delete, sender=ShiftDefinition, dispatch_uid='work_calendar_shift_delete')
+def shift_definition_work_calendar(sender, instance, **kwargs):
+    work_calendar.invalidate_shift(instance.id)
+
+
+@receiver(post_save, sender=ShiftRotationGroup)
+@_unless_suspended
+def rotation_group_post_save(sender, instance, **kwargs):
+    _schedule_refresh(sender, Person.objects.filter(rotation_group_id=instance.id).values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=ShiftRotationGroup)
+@_unless_suspended
+def rotation_group_pre_delete(sender, instance, **kwargs):
+    instance._schedule_person_ids = set(
+        Person.objects.filter(rotation_group_id=instance.id).values_list('id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=ShiftRotationGroup)
+@_unless_suspended
+def rotation_group_post_delete(sender, instance, **kwargs):
+    _schedule_refresh(sender, getattr(instance, '_schedule_person_ids', set()))
+
+
+@receiver(post_save, sender=GroupConfig)
+@_unless_suspended
+def group_config_post_save(sender, instance, **kwargs):
+    _schedule_refresh(sender, Person.objects.filter(group_id=instance.id).values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=GroupConfig)
+@_unless_suspended
+def group_config_pre_delete(sender, instance, **kwargs):
+    instance._schedule_person_ids = set(
+        Person.objects.filter(group_id=instance.id).values_list('id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=GroupConfig)
+@_unless_suspended
+def group_config_post_delete(sender, instance, **kwargs):
+    _schedule_refresh(sender, getattr(instance, '_schedule_person_ids', set()))
@@ -1,3 +1,1161 @@
-from django.test import TestCase
+"""
+排班模块测试
 
-# Create your tests here.
+数据库相关的测试数据由 seed_schedule_data 按固定随机种子生成（小规模），SQLite 与 MySQL 测试库均可运行：
+    SCHEDULE_SQLITE=db.sqlite3 python manage.py test Schedule
+"""
+import csv
+import importlib.util
+import io
+import json
+import os
+import random
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import date, time, timedelta
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from . import schedule_jobs, schedule_store
+from .absence_index import AbsenceIndex
+from .bulk import bulk_delete
+from .models import (
+    Absence, CalendarOverride, GroupConfig, MaterializedScheduleMonth, Person, ShiftDefinition, ShiftRotationGroup,
+)
+from .override_index import OverrideIndex, override_span, resolve_scope
+from .schedule_changes import CHANGE_LOG_VERSIONS, schedule_delta
+from .schedule_generator import MAX_RANGE_DAYS, effective_override, generate_range, generate_schedule, iter_range
+from .schedule_formats import iter_ndjson
+from .schedule_store import get_materialized_schedule
+from .serializers import (
+    AbsenceSerializer, CalendarOverrideSerializer, GroupConfigSerializer, PersonSerializer,
+    ShiftDefinitionSerializer, ShiftRotationGroupSerializer, SparseFieldsMixin,
+)
+from .serializers_base import CamelCaseModelSerializer
+from .versioning import bump_data_version, get_data_version
+
+YEAR_MONTH = '2025-03'
+MONTH_START = date(2025, 3, 1)
+MONTH_END = date(2025, 3, 31)
+
+
+class SeededTestCase(TestCase):
+    """以固定种子生成的人员、班次、组、轮换组合、请假与日历覆盖为测试数据"""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'seed_schedule_data', persons=40, shifts=3, groups=3, year=2025, seed=7,
+            interactive=False, stdout=io.StringIO()
+        )
+
+    def setUp(self):
+        # 排班结果缓存以数据版本为键，各测试回滚后数据版本会重复，需清空
+        caches[getattr(settings, 'SCHEDULE_CACHE_ALIAS', 'default')].clear()
+        self.client = APIClient()
+
+
+@skipUnless(importlib.util.find_spec('numpy'), '未安装 numpy')
+class EngineTests(SeededTestCase):
+    def test_numpy_engine_matches_python(self):
+        """两种计算引擎在相同数据上的结果逐行一致"""
+        for year_month in ('2025-01', YEAR_MONTH, '2025-12'):
+            for base_week_type in ('大周', '小周'):
+                for cross_month_continuous in (True, False):
+                    with self.subTest(year_month=year_month, base_week_type=base_week_type,
+                                      cross_month_continuous=cross_month_continuous):
+                        python_rows = generate_schedule(
+                            year_month, base_week_type, cross_month_continuous, engine='python'
+                        )['schedule']
+                        numpy_rows = generate_schedule(
+                            year_month, base_week_type, cross_month_continuous, engine='numpy'
+                        )['schedule']
+                        self.assertTrue(python_rows)
+                        self.assertEqual(numpy_rows, python_rows)
+
+    def test_numpy_range_matches_python(self):
+        start_date, end_date = date(2025, 2, 20), date(2025, 4, 10)
+        self.assertEqual(
+            list(iter_range(start_date, end_date, engine='numpy')),
+            list(iter_range(start_date, end_date, engine='python'))
+        )
+
+
+class IndexTests(SimpleTestCase):
+    """区间索引与逐条查找的结果一致（随机数据）"""
+
+    START = date(2025, 1, 1)
+
+    def _day(self, rng, spread=90):
+        return self.START + timedelta(days=rng.randrange(spread))
+
+    def test_absence_index_matches_linear_lookup(self):
+        rng = random.Random(1)
+        absences = []
+        for absence_id in rng.sample(range(1, 1000), 200):
+            start_date = self._day(rng)
+            absences.append(SimpleNamespace(
+                id=absence_id,
+                person_id=rng.randrange(10),
+                start_date=start_date,
+                # 少量结束日期早于开始日期的无效记录
+                end_date=start_date + timedelta(days=rng.randrange(-2, 15)),
+            ))
+        index = AbsenceIndex(absences)
+
+        def linear(person_id, day):
+            for absence in sorted(absences, key=lambda item: item.id):
+                if absence.person_id == person_id and absence.start_date <= day <= absence.end_date:
+                    return absence
+            return None
+
+        for person_id in range(11):
+            for offset in range(-3, 110):
+                day = self.START + timedelta(days=offset)
+                self.assertIs(index.lookup(person_id, day), linear(person_id, day), (person_id, day))
+
+    def test_override_index_matches_linear_lookup(self):
+        rng = random.Random(2)
+        groups = [SimpleNamespace(id=group_id) for group_id in (1, 2)]
+        rotation_groups = [SimpleNamespace(id=rotation_id) for rotation_id in (1, 2)]
+        persons = [
+            SimpleNamespace(
+                id=person_id,
+                group=rng.choice(groups + [None]),
+                rotation_group=rng.choice(rotation_groups + [None]),
+            )
+            for person_id in range(12)
+        ]
+        overrides = []
+        for override_id in range(1, 120):
+            day = self._day(rng)
+            scope = rng.choice(['全员', '指定组', '指定人员', '指定轮换组合'])
+            overrides.append(SimpleNamespace(
+                id=override_id,
+                date=day,
+                end_date=rng.choice([None, day + timedelta(days=rng.randrange(-5, 10))]),
+                priority=rng.randrange(3),
+                scope=scope,
+                target=rng.choice(['', '未分组']),
+                target_group_id=rng.choice([1, 2, None]) if scope == '指定组' else None,
+                target_rotation_group_id=rng.choice([1, 2, None]) if scope == '指定轮换组合' else None,
+                target_person_ids=frozenset(rng.sample(range(12), 3)) if scope == '指定人员' else frozenset(),
+            ))
+        index = OverrideIndex(overrides, persons)
+
+        def linear(person_id, day):
+            for override in sorted(overrides, key=lambda item: (item.priority, item.id), reverse=True):
+                span = override_span(override)
+                if span is None or not span[0] <= day <= span[1]:
+                    continue
+                person_ids = resolve_scope(override, persons)
+                if person_ids is None or person_id in person_ids:
+                    return override
+            return None
+
+        for person in persons:
+            for offset in range(-10, 110):
+                day = self.START + timedelta(days=offset)
+                self.assertIs(index.effective(person.id, day), linear(person.id, day), (person.id, day))
+
+
+class FastListTests(SeededTestCase):
+    """列表接口的快速序列化与 DRF 序列化器输出逐字节一致"""
+
+    CASES = [
+        ('/api/persons/', PersonSerializer, Person, ('id',), None),
+        ('/api/persons/?fields=id,name,groupName', PersonSerializer, Person, ('id',), ['id', 'name', 'groupName']),
+        ('/api/absences/', AbsenceSerializer, Absence, ('id',), None),
+        ('/api/absences/?ordering=start_date&fields=id,person', AbsenceSerializer, Absence,
+         ('start_date', 'id'), ['id', 'person']),
+        ('/api/shift-definitions/', ShiftDefinitionSerializer, ShiftDefinition, ('id',), None),
+        ('/api/group-configs/', GroupConfigSerializer, GroupConfig, ('id',), None),
+        ('/api/shift-rotation-groups/', ShiftRotationGroupSerializer, ShiftRotationGroup, ('id',), None),
+        ('/api/calendar-overrides/', CalendarOverrideSerializer, CalendarOverride, ('id',), None),
+    ]
+
+    def _assert_matches_serializer(self):
+        for url, serializer_class, model, ordering, fields in self.CASES:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                expected = JSONRenderer().render(
+                    serializer_class(model.objects.order_by(*ordering), many=True, fields=fields).data
+                )
+                self.assertEqual(response.content, expected)
+
+                # 游标分页逐页取回的结果与不分页一致
+                rows = []
+                page_url = url + ('&' if '?' in url else '?') + 'limit=7'
+                while page_url:
+                    page = self.client.get(page_url).json()
+                    rows.extend(page['results'])
+                    page_url = page['next']
+                self.assertEqual(rows, json.loads(expected))
+
+    def test_fast_path_matches_serializer(self):
+        self._assert_matches_serializer()
+
+    def test_null_relations_and_special_characters(self):
+        person = Person.objects.order_by('id').first()
+        person.group = None
+        person.rotation_group = None
+        person.shift_type = None
+        person.name = 'a b "\\<>&é\u2028'
+        person.save()
+        self._assert_matches_serializer()
+
+
+class ConditionalRequestTests(SeededTestCase):
+    def test_list_not_modified_until_write(self):
+        response = self.client.get('/api/persons/')
+        etag = response['ETag']
+        self.assertEqual(self.client.get('/api/persons/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        version = get_data_version()
+        person = Person.objects.order_by('id').first()
+        response = self.client.put(
+            f'/api/persons/{person.id}/', {'name': person.name + '2'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(get_data_version(), version + 1)
+
+        response = self.client.get('/api/persons/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_etag_follows_related_models(self):
+        """人员列表包含组名，组的修改同样使人员列表的 ETag 失效"""
+        etag = self.client.get('/api/persons/')['ETag']
+        GroupConfig.objects.order_by('id').first().save()
+        self.assertEqual(self.client.get('/api/persons/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_schedule_not_modified_until_write(self):
+        body = {'year_month': YEAR_MONTH}
+        response = self.client.post('/api/generate-schedule/', body, format='json')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        response = self.client.post('/api/generate-schedule/', body, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Absence.objects.create(
+            person=Person.objects.order_by('id').first(), start_date=date(2025, 3, 3), end_date=date(2025, 3, 4),
+            type=Absence.ABSENCE_TYPE_CHOICES[0][0]
+        )
+        response = self.client.post('/api/generate-schedule/', body, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'].rpartition('-')[2].strip('"'), str(get_data_version()))
+
+
+@override_settings(SCHEDULE_STORE_DEFERRED_REFRESH=False)
+class MaterializedStoreTests(SeededTestCase):
+    """物化排班在人员、请假、日历覆盖保存后增量刷新，结果与直接生成一致"""
+
+    def _assert_fresh(self):
+        self.assertEqual(get_materialized_schedule(YEAR_MONTH)['schedule'], generate_schedule(YEAR_MONTH)['schedule'])
+
+    def _write(self, func):
+        # 物化排班在事务提交后刷新
+        with self.captureOnCommitCallbacks(execute=True):
+            func()
+
+    def test_refresh_after_writes(self):
+        self._assert_fresh()
+        schedule_month_id = MaterializedScheduleMonth.objects.get(year_month=YEAR_MONTH).pk
+        person = Person.objects.filter(group__isnull=False).order_by('id').first()
+
+        def rename_person():
+            person.name += '2'
+            person.save()
+
+        def add_absence():
+            Absence.objects.create(
+                person=person, start_date=date(2025, 3, 10), end_date=date(2025, 3, 12),
+                type=Absence.ABSENCE_TYPE_CHOICES[0][0]
+            )
+
+        def add_override():
+            CalendarOverride.objects.create(
+                date=date(2025, 3, 15), end_date=date(2025, 3, 16), scope='指定组', target=person.group.name,
+                target_group=person.group, override_type='上班', priority=10
+            )
+
+        def delete_absences():
+            Absence.objects.filter(person=person).delete()
+
+        for write in (rename_person, add_absence, add_override, delete_absences):
+            with self.subTest(write=write.__name__):
+                self._write(write)
+                self._assert_fresh()
+                # 只重算受影响的人员，物化月份本身保留
+                self.assertTrue(MaterializedScheduleMonth.objects.filter(pk=schedule_month_id).exists())
+
+
+class ScheduleDeltaTests(SeededTestCase):
+    def _delta(self, since):
+        return schedule_delta(MONTH_START, MONTH_END, since)
+
+    def _grid(self):
+        return {(row['person_id'], row['date']): row for row in iter_range(MONTH_START, MONTH_END)}
+
+    def _apply(self, grid, delta):
+        self.assertFalse(delta['reset'])
+        for person_id in delta['removed_persons']:
+            for key in [key for key in grid if key[0] == person_id]:
+                del grid[key]
+        for row in delta['schedule']:
+            grid[(row['person_id'], row['date'])] = row
+
+    def test_unchanged(self):
+        version = get_data_version()
+        self.assertEqual(
+            self._delta(version),
+            {'version': version, 'since': version, 'reset': False, 'removed_persons': [], 'schedule': []}
+        )
+
+    def test_changes_applied_in_place(self):
+        grid = self._grid()
+        version = get_data_version()
+        person = Person.objects.order_by('id').first()
+        Absence.objects.create(
+            person=person, start_date=date(2025, 3, 5), end_date=date(2025, 3, 7),
+            type=Absence.ABSENCE_TYPE_CHOICES[0][0]
+        )
+        delta = self._delta(version)
+        self.assertEqual(delta['version'], get_data_version())
+        self.assertTrue(delta['schedule'])
+        self.assertLess(len(delta['schedule']), len(grid))
+        self._apply(grid, delta)
+        self.assertEqual(grid, self._grid())
+
+    def test_bulk_person_delete_reports_removed_persons(self):
+        grid = self._grid()
+        version = get_data_version()
+        person_ids = list(Person.objects.order_by('id').values_list('id', flat=True)[:2])
+        bulk_delete(Person, person_ids)
+        delta = self._delta(version)
+        self.assertEqual(delta['removed_persons'], person_ids)
+        self._apply(grid, delta)
+        self.assertEqual(grid, self._grid())
+
+    def test_reset(self):
+        version = get_data_version()
+        # 客户端的版本比当前新
+        self.assertTrue(self._delta(version + 1)['reset'])
+        # 版本过旧，变更记录已清理
+        self.assertTrue(self._delta(version - CHANGE_LOG_VERSIONS - 1)['reset'])
+        # 中间有没有变更记录的版本
+        bump_data_version('Person')
+        self.assertTrue(self._delta(version)['reset'])
+
+
+class _CamelShiftSerializer(SparseFieldsMixin, CamelCaseModelSerializer):
+    class Meta:
+        model = ShiftDefinition
+        fields = '__all__'
+
+
+class CamelCaseSerializerTests(TestCase):
+    def setUp(self):
+        self.shift = ShiftDefinition.objects.create(
+            name='早班', start_time=time(8), end_time=time(17), big_week=[0, 1, 2, 3, 4, 5], small_week=[0, 1, 2, 3, 4]
+        )
+
+    def test_round_trip(self):
+        """输出 camelCase，原样提交回来得到 snake_case 的字段"""
+        data = _CamelShiftSerializer(self.shift).data
+        self.assertEqual(
+            set(data), {'id', 'name', 'startTime', 'endTime', 'enabled', 'remark', 'bigWeek', 'smallWeek'}
+        )
+        serializer = _CamelShiftSerializer(data={**data, 'name': '中班'})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.validated_data['start_time'], time(8))
+        self.assertEqual(serializer.validated_data['big_week'], [0, 1, 2, 3, 4, 5])
+        created = serializer.save()
+        self.assertEqual(_CamelShiftSerializer(created).data, {**data, 'id': created.id, 'name': '中班'})
+
+    def test_sparse_fields(self):
+        """字段裁剪的映射按字段组合分别缓存，先请求部分字段不影响之后的完整字段"""
+        sparse = _CamelShiftSerializer(self.shift, fields=['id', 'start_time'])
+        self.assertEqual(sparse.data, {'id': self.shift.id, 'startTime': '08:00:00'})
+        self.assertEqual(
+            set(_CamelShiftSerializer(self.shift).data),
+            {'id', 'name', 'startTime', 'endTime', 'enabled', 'remark', 'bigWeek', 'smallWeek'}
+        )
+
+        serializer = _CamelShiftSerializer(
+            self.shift, data={'startTime': '09:00:00'}, partial=True, fields=['id', 'start_time']
+        )
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(dict(serializer.validated_data), {'start_time': time(9)})
+        self.assertIn(('id', 'start_time'), _CamelShiftSerializer._key_maps_cache)
+        self.assertEqual(len(_CamelShiftSerializer._key_maps_cache), 2)
+
+
+class ScheduleCacheTests(SeededTestCase):
+    def test_cache_hit_for_same_data_version(self):
+        body = {'year_month': YEAR_MONTH}
+        first = self.client.post('/api/generate-schedule/', body, format='json').json()
+        stats = self.client.get('/api/schedule-cache/stats/').json()
+        self.assertEqual(self.client.post('/api/generate-schedule/', body, format='json').json(), first)
+        self.assertEqual(self.client.get('/api/schedule-cache/stats/').json()['hits'], stats['hits'] + 1)
+
+    def test_invalid_engine_rejected_regardless_of_cache(self):
+        """引擎在读取缓存前校验，缓存命中与否结果相同"""
+        for body in ({'year_month': YEAR_MONTH}, {'year': '2025'}):
+            url = '/api/generate-schedule/' if 'year_month' in body else '/api/generate-year-schedule/'
+            with self.subTest(url=url):
+                self.assertEqual(self.client.post(url, body, format='json').status_code, 200)
+                response = self.client.post(url, {**body, 'engine': 'x'}, format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'error': '不支持的计算引擎: x'})
+
+
+class WeekConfigTests(SeededTestCase):
+    def test_invalid_week_config_falls_back_to_default(self):
+        """大小周配置有误时记录错误并按默认配置生成，不影响排班接口"""
+        ShiftDefinition.objects.update(big_week=[0, 1, 2, 3, 4], small_week=[0, 1, 2, 3, 4, 5])
+        expected = generate_schedule(YEAR_MONTH)['schedule']
+
+        ShiftDefinition.objects.filter(pk=ShiftDefinition.objects.order_by('id').first().pk).update(big_week=5)
+        with self.assertLogs('Schedule.schedule_generator', 'ERROR'):
+            self.assertEqual(generate_schedule(YEAR_MONTH)['schedule'], expected)
+        with self.assertLogs('Schedule.schedule_generator', 'ERROR'):
+            response = self.client.post('/api/generate-schedule/', {'year_month': YEAR_MONTH}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+
+class StoreRefreshExecutorTests(SimpleTestCase):
+    def test_refresh_not_blocked_by_generation_jobs(self):
+        """生成任务占满任务线程池时，物化排班重算仍在自己的线程中执行"""
+        release = threading.Event()
+        job_executor = schedule_jobs._get_executor()
+        blockers = [
+            job_executor.submit(release.wait, 10)
+            for _ in range(getattr(settings, 'SCHEDULE_JOB_THREADS', 2) + 1)
+        ]
+        try:
+            with mock.patch.object(schedule_store, '_refresh_months') as refresh_months:
+                schedule_store._refresh_in_background([1, 2]).result(timeout=5)
+            refresh_months.assert_called_once_with([1, 2])
+        finally:
+            release.set()
+            for blocker in blockers:
+                blocker.result()
+
+
+class BenchmarkCommandTests(SeededTestCase):
+    def test_benchmark_leaves_materialized_store_untouched(self):
+        """基准测试绕过物化排班，不删除也不写入物化结果"""
+        get_materialized_schedule(YEAR_MONTH)
+        months = list(MaterializedScheduleMonth.objects.values_list('pk', 'year_month'))
+        # 命令自行设置测试环境（接口请求使用 testserver）
+        teardown_test_environment()
+        self.addCleanup(setup_test_environment)
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'bench.json')
+            call_command('benchmark_schedule', year=2025, months=[1], repeat=1, output=output, stdout=io.StringIO())
+            with open(output, encoding='utf-8') as f:
+                results = json.load(f)
+            # 与自身对比：查询数相同，不视为回退
+            call_command(
+                'benchmark_schedule', year=2025, months=[1], repeat=1, output=output, baseline=output,
+                time_tolerance=100, memory_tolerance=100, stdout=io.StringIO()
+            )
+        self.assertIn('endpoint:generate-schedule', results['results'])
+        self.assertEqual(list(MaterializedScheduleMonth.objects.values_list('pk', 'year_month')), months)
+
+
+class RangeTests(SeededTestCase):
+    def _assert_windows_match_months(self, windows):
+        month_rows = {}
+        for start_date, end_date in windows:
+            with self.subTest(start_date=start_date, end_date=end_date):
+                expected = []
+                for year_month in sorted({day.strftime('%Y-%m') for day in (start_date, end_date)}):
+                    if year_month not in month_rows:
+                        month_rows[year_month] = generate_schedule(year_month)['schedule']
+                    expected.extend(
+                        row for row in month_rows[year_month]
+                        if start_date.isoformat() <= row['date'] <= end_date.isoformat()
+                    )
+                self.assertTrue(expected)
+                self.assertEqual(list(iter_range(start_date, end_date)), expected)
+
+    def test_range_matches_month_generation(self):
+        self._assert_windows_match_months([
+            (date(2025, 3, 1), date(2025, 3, 31)),
+            (date(2025, 3, 10), date(2025, 3, 16)),
+            (date(2025, 2, 24), date(2025, 3, 9)),
+        ])
+
+    def test_reversed_override_range_matches_month(self):
+        """结束日期早于开始日期的覆盖规则：同月时按交换后的范围生效，跨月时不生效，任意窗口与按月生成一致"""
+        override = CalendarOverride.objects.create(
+            date=date(2025, 3, 20), end_date=date(2025, 3, 10), scope='全员', target='', override_type='休息',
+            priority=100
+        )
+        CalendarOverride.objects.create(
+            date=date(2025, 4, 3), end_date=date(2025, 3, 28), scope='全员', target='', override_type='上班',
+            priority=100
+        )
+        person_id = Person.objects.order_by('id').values_list('id', flat=True).first()
+        self.assertEqual(effective_override(person_id, date(2025, 3, 12)).id, override.id)
+        self.assertIsNone(effective_override(person_id, date(2025, 3, 29)))
+        self._assert_windows_match_months([
+            (date(2025, 3, 12), date(2025, 3, 15)),
+            (date(2025, 3, 18), date(2025, 3, 25)),
+            (date(2025, 3, 5), date(2025, 3, 10)),
+            (date(2025, 3, 27), date(2025, 4, 5)),
+        ])
+
+    def test_generate_range_filters_persons(self):
+        person_ids = list(Person.objects.order_by('id').values_list('id', flat=True)[:3])
+        start_date, end_date = date(2025, 3, 10), date(2025, 3, 16)
+        rows = generate_range(start_date, end_date, person_ids=person_ids)['schedule']
+        self.assertEqual({row['person_id'] for row in rows}, set(person_ids))
+        self.assertEqual(rows, [row for row in iter_range(start_date, end_date) if row['person_id'] in person_ids])
+
+    def test_range_endpoint(self):
+        body = {'start_date': '2025-03-10', 'end_date': '2025-03-16'}
+        response = self.client.post('/api/generate-range/', body, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()['schedule'],
+            json.loads(json.dumps(list(iter_range(date(2025, 3, 10), date(2025, 3, 16)))))
+        )
+
+        too_long = {'start_date': '2025-01-01', 'end_date': (date(2025, 1, 1) + timedelta(days=MAX_RANGE_DAYS)).isoformat()}
+        response = self.client.post('/api/generate-range/', too_long, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': f'日期范围不能超过 {MAX_RANGE_DAYS} 天'})
+        for bad in ({'start_date': '2025-03-16', 'end_date': '2025-03-10'}, {'start_date': 'x', 'end_date': '2025-03-10'}):
+            self.assertEqual(self.client.post('/api/generate-range/', bad, format='json').status_code, 400)
+
+
+class StreamingTests(SeededTestCase):
+    """流式响应：WSGI 下为同步迭代器；ASGI 下改为异步迭代器分批发送，不先整体读入内存"""
+
+    REQUESTS = [
+        ('post', '/api/generate-range/', {'start_date': '2025-03-01', 'end_date': '2025-03-31', 'stream': True}),
+        ('post', '/api/generate-schedule/', {'year_month': YEAR_MONTH, 'stream': True}),
+        ('get', '/api/schedule-export/', {'year_month': YEAR_MONTH, 'type': 'csv'}),
+        ('get', '/api/schedule-export/', {'year_month': YEAR_MONTH, 'type': 'xlsx'}),
+    ]
+
+    @staticmethod
+    def _send(client, method, url, data):
+        if method == 'post':
+            return client.post(url, json.dumps(data), content_type='application/json')
+        return client.get(url, data)
+
+    @staticmethod
+    def _comparable(data, content):
+        # xlsx 含生成时间，比较单元格内容
+        if data.get('type') != 'xlsx':
+            return content
+        from openpyxl import load_workbook
+        workbook = load_workbook(io.BytesIO(content), read_only=True)
+        return [[list(row) for row in worksheet.iter_rows(values_only=True)] for worksheet in workbook.worksheets]
+
+    @skipUnless(importlib.util.find_spec('openpyxl'), '未安装 openpyxl')
+    async def test_asgi_streams_asynchronously(self):
+        expected = []
+        for method, url, data in self.REQUESTS:
+            response = await sync_to_async(self._send)(self.client, method, url, data)
+            self.assertFalse(response.is_async)
+            expected.append(self._comparable(data, await sync_to_async(b''.join)(response.streaming_content)))
+
+        client = AsyncClient()
+        for (method, url, data), content in zip(self.REQUESTS, expected):
+            with self.subTest(url=url, data=data):
+                response = await self._send(client, method, url, data)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.is_async)
+                self.assertEqual(
+                    self._comparable(data, b''.join([chunk async for chunk in response.streaming_content])), content
+                )
+
+    def test_event_stream_requires_asgi(self):
+        response = self.client.get('/api/schedule-events/')
+        self.assertEqual(response.status_code, 501)
+
+
+class ColumnarFormatTests(SeededTestCase):
+    @staticmethod
+    def _decode(columnar):
+        """把列式结果还原为按格子排列的行"""
+        violations = {(row, column): reason for row, column, reason in columnar['violations']}
+        rows = []
+        for row, person in enumerate(columnar['persons']):
+            for column, date_str in enumerate(columnar['dates']):
+                rows.append({
+                    'person_id': person['id'],
+                    'person_name': person['name'],
+                    'group': person['group'],
+                    'rotation_group': person['rotation_group'],
+                    'date': date_str,
+                    'shift': columnar['shifts'][columnar['shift_codes'][row][column]],
+                    'status': columnar['statuses'][columnar['status_codes'][row][column]],
+                    'is_violation': (row, column) in violations,
+                    'violation_reason': violations.get((row, column), ''),
+                })
+        return rows
+
+    def test_columnar_round_trip(self):
+        body = {'year_month': YEAR_MONTH}
+        rows = self.client.post('/api/generate-schedule/', body, format='json').json()['schedule']
+        response = self.client.post('/api/generate-schedule/', {**body, 'format': 'columnar'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        columnar = response.json()
+        self.assertEqual(columnar['format'], 'columnar')
+        self.assertEqual(len(columnar['persons']), Person.objects.count())
+        key = lambda row: (row['person_id'], row['date'])
+        self.assertEqual(sorted(self._decode(columnar), key=key), sorted(rows, key=key))
+        # 列式结果明显小于逐格输出
+        self.assertLess(len(response.content), len(json.dumps(rows, ensure_ascii=False).encode()) / 2)
+
+    def test_year_columnar_and_invalid_format(self):
+        response = self.client.post('/api/generate-year-schedule/', {'year': '2025', 'format': 'columnar'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        schedules = response.json()['schedules']
+        self.assertEqual(len(schedules), 12)
+        self.assertEqual(len(schedules[YEAR_MONTH]['dates']), 31)
+        response = self.client.post('/api/generate-schedule/', {'year_month': YEAR_MONTH, 'format': 'xml'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class NdjsonStreamTests(SeededTestCase):
+    def _stream_rows(self, url, body):
+        response = self.client.post(url, body, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertTrue(content.endswith('\n'))
+        return [json.loads(line) for line in content.splitlines()]
+
+    def test_month_stream_matches_rows(self):
+        rows = self.client.post('/api/generate-schedule/', {'year_month': YEAR_MONTH}, format='json').json()['schedule']
+        self.assertEqual(self._stream_rows('/api/generate-schedule/', {'year_month': YEAR_MONTH, 'stream': True}), rows)
+
+    def test_year_stream_in_month_order(self):
+        schedules = self.client.post('/api/generate-year-schedule/', {'year': '2025'}, format='json').json()['schedules']
+        expected = [row for year_month in sorted(schedules) for row in schedules[year_month]['schedule']]
+        self.assertEqual(self._stream_rows('/api/generate-year-schedule/', {'year': '2025', 'stream': True}), expected)
+
+    def test_chunks(self):
+        rows = [{'person_id': index, 'person_name': '张三'} for index in range(5)]
+        chunks = list(iter_ndjson(iter(rows), chunk_rows=2))
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual([json.loads(line) for line in b''.join(chunks).decode('utf-8').splitlines()], rows)
+        self.assertEqual(list(iter_ndjson(iter([]))), [])
+
+
+class EffectiveOverrideTests(SeededTestCase):
+    def test_highest_priority_applicable_override(self):
+        person, other = Person.objects.order_by('id')[:2]
+        everyone = CalendarOverride.objects.create(
+            date=date(2025, 3, 10), end_date=date(2025, 3, 12), scope='全员', target='', override_type='休息',
+            priority=50
+        )
+        targeted = CalendarOverride.objects.create(
+            date=date(2025, 3, 11), scope='指定人员', target=person.name, override_type='上班', priority=60
+        )
+        targeted.target_persons.set([person])
+
+        def effective(person_id, day):
+            response = self.client.get('/api/calendar-overrides/effective/', {'person_id': person_id, 'date': day})
+            self.assertEqual(response.status_code, 200)
+            return response.json()
+
+        data = effective(person.id, '2025-03-11')
+        self.assertEqual(data['override']['id'], targeted.id)
+        self.assertEqual(data['override']['target'], person.name)
+        self.assertEqual(effective(other.id, '2025-03-11')['override']['id'], everyone.id)
+        self.assertEqual(effective(person.id, '2025-03-12')['override']['id'], everyone.id)
+
+        # 与生成排班使用的规则一致
+        for day in ('2025-03-09', '2025-03-10', '2025-03-11', '2025-03-13'):
+            override = effective_override(person.id, date.fromisoformat(day))
+            data = effective(person.id, day)
+            self.assertEqual(data['override'] and data['override']['id'], override and override.id)
+
+    def test_invalid_parameters(self):
+        url = '/api/calendar-overrides/effective/'
+        self.assertEqual(self.client.get(url, {'person_id': 'x', 'date': '2025-03-11'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'person_id': 1}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'person_id': 999999, 'date': '2025-03-11'}).status_code, 404)
+
+
+class AvailabilityTests(SeededTestCase):
+    def test_available_and_unavailable_ranges(self):
+        person = Person.objects.order_by('id').first()
+        Absence.objects.filter(person=person).delete()
+        absence_type = Absence.ABSENCE_TYPE_CHOICES[0][0]
+        first = Absence.objects.create(
+            person=person, start_date=date(2025, 3, 5), end_date=date(2025, 3, 8), type=absence_type
+        )
+        # 与上一条重叠，重叠部分按 id 靠前的记录
+        second = Absence.objects.create(
+            person=person, start_date=date(2025, 3, 7), end_date=date(2025, 3, 10), type=absence_type
+        )
+        response = self.client.get(f'/api/persons/{person.id}/availability/', {'from': '2025-03-01', 'to': '2025-03-31'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['available'], [
+            {'start_date': '2025-03-01', 'end_date': '2025-03-04'},
+            {'start_date': '2025-03-11', 'end_date': '2025-03-31'},
+        ])
+        self.assertEqual(
+            [(item['start_date'], item['end_date'], item['absence_id']) for item in data['unavailable']],
+            [('2025-03-05', '2025-03-08', first.id), ('2025-03-09', '2025-03-10', second.id)]
+        )
+
+        # 查询范围裁剪请假区间
+        data = self.client.get(
+            f'/api/persons/{person.id}/availability/', {'from': '2025-03-08', 'to': '2025-03-09'}
+        ).json()
+        self.assertEqual(data['available'], [])
+        self.assertEqual([item['start_date'] for item in data['unavailable']], ['2025-03-08', '2025-03-09'])
+
+    def test_invalid_parameters(self):
+        person_id = Person.objects.order_by('id').values_list('id', flat=True).first()
+        url = f'/api/persons/{person_id}/availability/'
+        self.assertEqual(self.client.get(url, {'from': '2025-03-10', 'to': '2025-03-01'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'from': '2025-03-10'}).status_code, 400)
+        self.assertEqual(
+            self.client.get('/api/persons/999999/availability/', {'from': '2025-03-01', 'to': '2025-03-02'}).status_code,
+            404
+        )
+
+
+class BulkWriteTests(SeededTestCase):
+    def test_person_bulk_create_update_delete(self):
+        group = GroupConfig.objects.order_by('id').first()
+        shift = ShiftDefinition.objects.order_by('id').first()
+        version = get_data_version()
+        response = self.client.post('/api/persons/bulk/', [
+            {'name': '批量一', 'group': group.id, 'shift_type': shift.id},
+            {'name': '批量二', 'group': group.id, 'shift_type': shift.id},
+        ], format='json')
+        self.assertEqual(response.status_code, 201)
+        created_ids = [item['id'] for item in response.json()['created']]
+        self.assertEqual(
+            list(Person.objects.filter(id__in=created_ids).order_by('id').values_list('name', flat=True)),
+            ['批量一', '批量二']
+        )
+        self.assertGreater(get_data_version(), version)
+
+        response = self.client.put('/api/persons/bulk/', [{'id': created_ids[0], 'name': '改名'}], format='json')
+        self.assertEqual(response.status_code, 200)
+        person = Person.objects.get(pk=created_ids[0])
+        self.assertEqual((person.name, person.group_id), ('改名', group.id))
+
+        response = self.client.delete('/api/persons/bulk/', {'ids': created_ids + [999999]}, format='json')
+        self.assertEqual(response.json(), {'deleted': 2, 'not_found': [999999]})
+        self.assertFalse(Person.objects.filter(id__in=created_ids).exists())
+
+    def test_validation_errors_write_nothing(self):
+        person = Person.objects.order_by('id').first()
+        count = Absence.objects.count()
+        response = self.client.post('/api/absences/bulk/', [
+            {'person': person.id, 'start_date': '2025-03-01', 'end_date': '2025-03-02', 'type': '请假'},
+            {'person': person.id, 'start_date': '2025-03-01', 'type': '请假'},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([item['index'] for item in response.json()['errors']], [1])
+        self.assertIn('end_date', response.json()['errors'][0]['errors'])
+        self.assertEqual(Absence.objects.count(), count)
+
+        response = self.client.put('/api/absences/bulk/', [{'id': 999999, 'reason': 'x'}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'][0]['index'], 0)
+
+        response = self.client.delete('/api/absences/bulk/', {'ids': ['a']}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_override_bulk_writes_targets(self):
+        person_ids = list(Person.objects.order_by('id').values_list('id', flat=True)[:2])
+        response = self.client.post('/api/calendar-overrides/bulk/', [
+            {'date': '2025-03-03', 'end_date': '2025-03-05', 'override_type': '休息',
+             'scope': '指定人员', 'target_persons': person_ids},
+            {'date': '2025-03-08', 'override_type': '上班', 'scope': '全员'},
+        ], format='json')
+        self.assertEqual(response.status_code, 201)
+        first_id, second_id = [item['id'] for item in response.json()['created']]
+        first = CalendarOverride.objects.get(pk=first_id)
+        self.assertEqual(sorted(first.target_persons.values_list('id', flat=True)), person_ids)
+        self.assertEqual(first.effective_end_date, date(2025, 3, 5))
+        self.assertEqual(CalendarOverride.objects.get(pk=second_id).effective_end_date, date(2025, 3, 8))
+
+        response = self.client.put('/api/calendar-overrides/bulk/', [
+            {'id': first_id, 'end_date': '2025-03-06', 'target_persons': person_ids[:1]},
+        ], format='json')
+        self.assertEqual(response.status_code, 200)
+        first.refresh_from_db()
+        self.assertEqual(first.effective_end_date, date(2025, 3, 6))
+        self.assertEqual(list(first.target_persons.values_list('id', flat=True)), person_ids[:1])
+
+    def test_week_configs_update(self):
+        shifts = list(ShiftDefinition.objects.order_by('id')[:2])
+        version = get_data_version()
+        response = self.client.post('/api/week-schedules/', [
+            {'shift_type': shifts[0].id, 'big_week': [0, 1, 2, 3, 4, 5], 'small_week': [0, 1, 2, 3, 4]},
+            {'shiftType': shifts[1].id, 'bigWeek': [0, 1, 2], 'smallWeek': [3, 4]},
+        ], format='json')
+        self.assertEqual(response.status_code, 201)
+        configs = {item['id']: item for item in self.client.get('/api/week-schedules/').json()}
+        self.assertEqual(configs[shifts[0].id]['big_week'], [0, 1, 2, 3, 4, 5])
+        self.assertEqual(configs[shifts[1].id]['small_week'], [3, 4])
+        self.assertGreater(get_data_version(), version)
+
+        response = self.client.post('/api/week-schedules/', [
+            {'shift_type': shifts[0].id, 'big_week': [0], 'small_week': [0]},
+            {'shift_type': 99999, 'big_week': [0], 'small_week': [0]},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': '班次ID 99999 不存在'})
+        shifts[0].refresh_from_db()
+        self.assertEqual(shifts[0].big_week, [0, 1, 2, 3, 4, 5])
+
+
+class ExportTests(SeededTestCase):
+    def _expected_cells(self):
+        """按生成结果还原每人每天的单元格：上班时为班次名称，否则为状态"""
+        cells = {}
+        for item in generate_schedule(YEAR_MONTH)['schedule']:
+            cells[(item['person_name'], item['date'])] = item['shift'] if item['status'] == '上班' else item['status']
+        return cells
+
+    def _check_rows(self, rows, dates):
+        expected = self._expected_cells()
+        self.assertEqual(len(rows), Person.objects.count())
+        for row in rows:
+            name = row[3]
+            self.assertEqual(
+                [cell or '' for cell in row[4:]],
+                [expected[(name, day.isoformat())] for day in dates]
+            )
+
+    def test_csv(self):
+        response = self.client.get('/api/schedule-export/', {'year_month': YEAR_MONTH, 'type': 'csv'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('schedule_2025-03.csv', response['Content-Disposition'])
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertTrue(content.startswith('\ufeff'))
+        lines = list(csv.reader(io.StringIO(content.lstrip('\ufeff'))))
+        self.assertEqual(lines[0][:5], ['UID', '部门', '工号', '姓名', '2025/3/1 周六'])
+        self.assertEqual(len(lines[0]), 4 + 31)
+        dates = [MONTH_START + timedelta(days=offset) for offset in range(31)]
+        self._check_rows(lines[1:], dates)
+
+    @skipUnless(importlib.util.find_spec('openpyxl'), '未安装 openpyxl')
+    def test_xlsx_single_sheet(self):
+        from openpyxl import load_workbook
+
+        response = self.client.get('/api/schedule-export/', {'year_month': YEAR_MONTH})
+        self.assertEqual(response.status_code, 200)
+        workbook = load_workbook(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(workbook.sheetnames, ['schedule'])
+        worksheet = workbook['schedule']
+        rows = [list(row) for row in worksheet.iter_rows(values_only=True)]
+        self.assertEqual(rows[0][0], '排班表')
+        self.assertTrue(rows[2][0].startswith('班次信息: '))
+        self.assertEqual(rows[3][4], '2025/3/1\n周六')
+        # 标题、说明、班次信息三行合并到最后一列
+        self.assertEqual(
+            sorted(str(cell_range) for cell_range in worksheet.merged_cells.ranges),
+            ['A1:AI1', 'A2:AI2', 'A3:AI3']
+        )
+        dates = [MONTH_START + timedelta(days=offset) for offset in range(31)]
+        self._check_rows(rows[4:], dates)
+
+    @skipUnless(importlib.util.find_spec('openpyxl'), '未安装 openpyxl')
+    def test_xlsx_split_by_group(self):
+        from openpyxl import load_workbook
+
+        response = self.client.get('/api/schedule-export/', {'year_month': YEAR_MONTH, 'split': 'group'})
+        workbook = load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True)
+        groups = {}
+        for name, group_name in Person.objects.values_list('name', 'group__name'):
+            groups.setdefault(group_name or '未分组', set()).add(name)
+        self.assertEqual(workbook.sheetnames, sorted(groups))
+        for sheet_name in workbook.sheetnames:
+            rows = list(workbook[sheet_name].iter_rows(values_only=True))
+            self.assertEqual(rows[0][0], f'{sheet_name}排班表')
+            self.assertEqual({row[3] for row in rows[4:]}, groups[sheet_name])
+            self.assertEqual({row[1] for row in rows[4:]}, {sheet_name})
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get('/api/schedule-export/', {'year_month': YEAR_MONTH, 'type': 'pdf'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/schedule-export/', {'type': 'csv'}).status_code, 400)
+        response = self.client.get('/api/schedule-export/', {'year_month': YEAR_MONTH, 'engine': 'fortran'})
+        self.assertEqual(response.status_code, 400)
+
+
+class RequestTimingTests(SeededTestCase):
+    @staticmethod
+    def _phases(header):
+        return {entry.split(';')[0].strip() for entry in header.split(',')}
+
+    @override_settings(SCHEDULE_MATERIALIZED_STORE=False)
+    def test_server_timing_header(self):
+        response = self.client.post('/api/generate-schedule/', {'year_month': YEAR_MONTH}, format='json')
+        self.assertEqual(response.status_code, 200)
+        header = response['Server-Timing']
+        self.assertTrue({'db', 'load', 'loop', 'sort', 'render', 'total'} <= self._phases(header))
+        self.assertRegex(header, r'db;dur=[\d.]+;desc="\d+ queries"')
+
+        # 结果缓存命中时不再计算
+        response = self.client.post('/api/generate-schedule/', {'year_month': YEAR_MONTH}, format='json')
+        self.assertNotIn('loop', self._phases(response['Server-Timing']))
+
+        with override_settings(SCHEDULE_SERVER_TIMING=False):
+            response = self.client.get('/api/persons/')
+        self.assertNotIn('Server-Timing', response)
+
+    def test_metrics(self):
+        def count(text, name, labels):
+            for line in text.splitlines():
+                if line.startswith(f'{name}_count{{{labels}}} '):
+                    return int(line.split()[-1])
+            return 0
+
+        before = self.client.get('/api/metrics').content.decode('utf-8')
+        self.client.get('/api/persons/')
+        self.client.get('/api/persons/')
+        response = self.client.get('/api/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode('utf-8')
+        self.assertIn('# TYPE schedule_request_duration_seconds histogram', text)
+        self.assertIn('schedule_cache_hits_total ', text)
+        for name in ('schedule_request_duration_seconds', 'schedule_request_queries'):
+            self.assertEqual(
+                count(text, name, 'view="persons-list"') - count(before, name, 'view="persons-list"'), 2
+            )
+        self.assertIn('schedule_request_queries_bucket{view="persons-list",le="+Inf"}', text)
+
+
+class _DeferredExecutor:
+    """代替任务线程池：提交的任务在调用 run_all() 时才在当前线程（测试事务内）执行"""
+
+    def __init__(self):
+        self.pending = []
+
+    def submit(self, func, *args):
+        self.pending.append((func, args))
+
+    def run_all(self):
+        while self.pending:
+            func, args = self.pending.pop(0)
+            func(*args)
+
+
+class ScheduleJobTests(SeededTestCase):
+    def setUp(self):
+        super().setUp()
+        self.executor = _DeferredExecutor()
+        for patcher in (
+            mock.patch.object(schedule_jobs, '_get_executor', return_value=self.executor),
+            # 任务在测试事务内执行，不能关闭连接
+            mock.patch.object(schedule_jobs, 'close_old_connections'),
+            mock.patch.object(schedule_jobs, '_jobs', OrderedDict()),
+            mock.patch.object(schedule_jobs, '_active_keys', {}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _submit(self, data):
+        return self.client.post('/api/schedule-jobs/', data, format='json')
+
+    def test_month_job_lifecycle(self):
+        response = self._submit({'kind': 'month', 'year_month': YEAR_MONTH})
+        self.assertEqual(response.status_code, 202)
+        job = response.json()
+        self.assertEqual((job['status'], job['deduplicated']), ('queued', False))
+        self.assertEqual(job['progress'], {'completed': 0, 'total': 1})
+
+        # 相同参数的进行中任务被复用
+        response = self._submit({'kind': 'month', 'year_month': YEAR_MONTH, 'engine': 'python'})
+        self.assertEqual((response.json()['id'], response.json()['deduplicated']), (job['id'], True))
+        self.assertEqual(len(self.executor.pending), 1)
+        self.assertEqual(self.client.get(f"/api/schedule-jobs/{job['id']}/result/").status_code, 409)
+
+        self.executor.run_all()
+        detail = self.client.get(f"/api/schedule-jobs/{job['id']}/", {'wait': 1}).json()
+        self.assertEqual((detail['status'], detail['progress']), ('done', {'completed': 1, 'total': 1}))
+        result = self.client.get(f"/api/schedule-jobs/{job['id']}/result/").json()
+        self.assertEqual(result['schedules'][YEAR_MONTH]['schedule'], generate_schedule(YEAR_MONTH)['schedule'])
+
+        # 已完成的任务同样复用；数据版本变化后重新生成
+        self.assertTrue(self._submit({'kind': 'month', 'year_month': YEAR_MONTH}).json()['deduplicated'])
+        bump_data_version('Person')
+        self.assertFalse(self._submit({'kind': 'month', 'year_month': YEAR_MONTH}).json()['deduplicated'])
+
+    def test_range_job_result(self):
+        job = self._submit({'kind': 'range', 'start_date': '2025-03-20', 'end_date': '2025-04-10'}).json()
+        self.assertEqual(job['year_months'], ['2025-03', '2025-04'])
+        self.executor.run_all()
+        response = self.client.get(f"/api/schedule-jobs/{job['id']}/result/", {'type': 'columnar'})
+        schedules = response.json()['schedules']
+        self.assertEqual(schedules['2025-03']['dates'][0], '2025-03-20')
+        self.assertEqual(schedules['2025-04']['dates'][-1], '2025-04-10')
+        rows = generate_range(date(2025, 3, 20), date(2025, 4, 10))['schedule']
+        self.assertEqual(
+            sum(len(codes) for item in schedules.values() for codes in item['status_codes']), len(rows)
+        )
+
+    def test_failed_job(self):
+        job = self._submit({'kind': 'month', 'year_month': YEAR_MONTH}).json()
+        with mock.patch.object(schedule_jobs, 'generate_schedules', side_effect=RuntimeError('计算失败')):
+            self.executor.run_all()
+        self.assertEqual(self.client.get(f"/api/schedule-jobs/{job['id']}/").json()['status'], 'failed')
+        response = self.client.get(f"/api/schedule-jobs/{job['id']}/result/")
+        self.assertEqual((response.status_code, response.json()), (500, {'error': '计算失败'}))
+        # 失败的任务不复用
+        self.assertFalse(self._submit({'kind': 'month', 'year_month': YEAR_MONTH}).json()['deduplicated'])
+
+    def test_invalid_parameters(self):
+        cases = [
+            ({'kind': 'week'}, '不支持的任务类型: week'),
+            ({'kind': 'month', 'year_month': '2025-13'}, 'year_month 格式错误: 2025-13（应为 YYYY-MM）'),
+            ({'kind': 'year', 'year': 'abc'}, '缺少 year 参数或格式错误（应为 YYYY）'),
+            ({'kind': 'range', 'start_date': '2025-03-02', 'end_date': '2025-03-01'}, '开始日期不能晚于结束日期'),
+            ({'kind': 'range', 'start_date': '2025-01-01', 'end_date': '2026-01-02'},
+             f'日期范围不能超过 {MAX_RANGE_DAYS} 天'),
+            ({'kind': 'month', 'year_month': YEAR_MONTH, 'engine': 'fortran'}, '不支持的计算引擎: fortran'),
+        ]
+        for data, error in cases:
+            with self.subTest(data=data):
+                response = self._submit(data)
+                self.assertEqual((response.status_code, response.json()), (400, {'error': error}))
+        self.assertEqual(self.executor.pending, [])
+        self.assertEqual(self.client.get('/api/schedule-jobs/missing/').status_code, 404)
+        self.assertEqual(self.client.get('/api/schedule-jobs/missing/result/').status_code, 404)
+
+
+class PersonFilterTests(SeededTestCase):
+    def _post(self, url, data):
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['schedule']
+
+    def test_month_filters_match_full_schedule(self):
+        full = json.loads(json.dumps(generate_schedule(YEAR_MONTH)['schedule']))
+        persons = list(Person.objects.order_by('id'))
+        group_id = next(person.group_id for person in persons if person.group_id)
+        rotation_group_id = next(person.rotation_group_id for person in persons if person.rotation_group_id)
+        cases = [
+            ({'person_ids': [persons[0].id, persons[5].id]}, {persons[0].id, persons[5].id}),
+            ({'group_ids': [group_id]}, {person.id for person in persons if person.group_id == group_id}),
+            ({'rotation_group_ids': [rotation_group_id]},
+             {person.id for person in persons if person.rotation_group_id == rotation_group_id}),
+            # 多个条件取交集
+            ({'person_ids': [persons[0].id, persons[5].id], 'group_ids': [persons[0].group_id or 0]},
+             {person.id for person in persons[:6:5] if person.group_id == persons[0].group_id}),
+        ]
+        for filters, person_ids in cases:
+            with self.subTest(filters=filters):
+                rows = self._post('/api/generate-schedule/', {'year_month': YEAR_MONTH, **filters})
+                self.assertEqual({row['person_id'] for row in rows}, person_ids)
+                self.assertEqual(rows, [row for row in full if row['person_id'] in person_ids])
+
+    def test_range_filters(self):
+        group_id = Person.objects.exclude(group=None).values_list('group_id', flat=True).first()
+        rows = self._post(
+            '/api/generate-range/', {'start_date': '2025-03-10', 'end_date': '2025-03-16', 'group_ids': [group_id]}
+        )
+        person_ids = set(Person.objects.filter(group_id=group_id).values_list('id', flat=True))
+        self.assertEqual({row['person_id'] for row in rows}, person_ids)
+        self.assertEqual(
+            rows,
+            json.loads(json.dumps([
+                row for row in iter_range(date(2025, 3, 10), date(2025, 3, 16)) if row['person_id'] in person_ids
+            ]))
+        )
+
+    def test_empty_and_invalid_filters(self):
+        self.assertEqual(self._post('/api/generate-schedule/', {'year_month': YEAR_MONTH, 'person_ids': []}), [])
+        for filters in ({'person_ids': '1,2'}, {'group_ids': ['a']}):
+            with self.subTest(filters=filters):
+                response = self.client.post('/api/generate-schedule/', {'year_month': YEAR_MONTH, **filters}, format='json')
+                self.assertEqual(response.status_code, 400)
+
+
+class OverrideTargetMigrationTests(TransactionTestCase):
+    """0016 迁移按名称把原有的 target 关联到组、人员（同名全部关联）与轮换组合"""
+
+    migrate_from = ('Schedule', '0015_data_version')
+    migrate_to = ('Schedule', '0016_calendar_override_target_relations')
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate([self.migrate_from])
+        self.addCleanup(self._migrate_latest)
+        apps = executor.loader.project_state([self.migrate_from]).apps
+        GroupConfig = apps.get_model('Schedule', 'GroupConfig')
+        Person = apps.get_model('Schedule', 'Person')
+        ShiftRotationGroup = apps.get_model('Schedule', 'ShiftRotationGroup')
+        ShiftDefinition = apps.get_model('Schedule', 'ShiftDefinition')
+        CalendarOverride = apps.get_model('Schedule', 'CalendarOverride')
+
+        shift = ShiftDefinition.objects.create(name='A班', start_time=time(8), end_time=time(17))
+        group = GroupConfig.objects.create(name='一组')
+        rotation_group = ShiftRotationGroup.objects.create(name='轮换一', odd_shift=shift, even_shift=shift)
+        self.group_id, self.rotation_group_id = group.id, rotation_group.id
+        self.person_ids = [Person.objects.create(name='张三', group=group).id for _ in range(2)]
+        Person.objects.create(name='李四', group=group)
+
+        def override(scope, target):
+            return CalendarOverride.objects.create(
+                date=date(2025, 3, 1), effective_end_date=date(2025, 3, 1), override_type='休息',
+                scope=scope, target=target
+            ).id
+
+        self.overrides = {
+            'group': override('指定组', '一组'),
+            'rotation_group': override('指定轮换组合', '轮换一'),
+            'persons': override('指定人员', '张三'),
+            'missing': override('指定组', '不存在的组'),
+            'all': override('全员', ''),
+        }
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([self.migrate_to])
+
+    @staticmethod
+    def _migrate_latest():
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes('Schedule'))
+
+    def test_targets_linked(self):
+        apps = MigrationExecutor(connection).loader.project_state([self.migrate_to]).apps
+        CalendarOverride = apps.get_model('Schedule', 'CalendarOverride')
+        overrides = CalendarOverride.objects.in_bulk(list(self.overrides.values()))
+
+        self.assertEqual(overrides[self.overrides['group']].target_group_id, self.group_id)
+        self.assertEqual(overrides[self.overrides['rotation_group']].target_rotation_group_id, self.rotation_group_id)
+        self.assertEqual(
+            sorted(overrides[self.overrides['persons']].target_persons.values_list('id', flat=True)), self.person_ids
+        )
+        for name in ('missing', 'all'):
+            override = overrides[self.overrides[name]]
+            self.assertIsNone(override.target_group_id)
+            self.assertIsNone(override.target_rotation_group_id)
+            self.assertFalse(override.target_persons.exists())
+        # 名称保留用于显示
+        self.assertEqual(overrides[self.overrides['missing']].target, '不存在的组')
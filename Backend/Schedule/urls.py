@@ -12,16 +12,30 @@ urlpatterns = [
     path('shift-rotation-groups/<int:pk>/', views.shift_rotation_group_detail, name='shift-rotation-group-detail'),
 
     path('persons/', views.persons_list, name='persons-list'),
+    path('persons/bulk/', views.persons_bulk, name='persons-bulk'),
     path('persons/<int:pk>/', views.person_detail, name='person-detail'),
+    path('persons/<int:pk>/availability/', views.person_availability, name='person-availability'),
 
     path('absences/', views.absences_list, name='absences-list'),
+    path('absences/bulk/', views.absences_bulk, name='absences-bulk'),
     path('absences/<int:pk>/', views.absence_detail, name='absence-detail'),
 
     path('calendar-overrides/', views.calendar_overrides_list, name='calendar-overrides-list'),
+    path('calendar-overrides/bulk/', views.calendar_overrides_bulk, name='calendar-overrides-bulk'),
     path('calendar-overrides/<int:pk>/', views.calendar_override_detail, name='calendar-override-detail'),
+    path('calendar-overrides/effective/', views.calendar_override_effective, name='calendar-override-effective'),
 
     path('week-schedules/', views.week_schedule_config, name='week-schedule-config'),
 
     path('generate-schedule/', views.generate_schedule_view, name='generate-schedule'),
     path('generate-year-schedule/', views.generate_year_schedule_view, name='generate-year-schedule'),
+    path('generate-range/', views.generate_range_view, name='generate-range'),
+    path('schedule-delta/', views.schedule_delta_view, name='schedule-delta'),
+    path('schedule-events/', views.schedule_events_view, name='schedule-events'),
+    path('schedule-jobs/', views.schedule_jobs_view, name='schedule-jobs'),
+    path('schedule-jobs/<str:job_id>/', views.schedule_job_detail, name='schedule-job-detail'),
+    path('schedule-jobs/<str:job_id>/result/', views.schedule_job_result, name='schedule-job-result'),
+    path('schedule-export/', views.schedule_export_view, name='schedule-export'),
+    path('schedule-cache/stats/', views.schedule_cache_stats_view, name='schedule-cache-stats'),
+    path('metrics', views.metrics_view, name='metrics'),
 ]
@@ -0,0 +1,53 @@
+"""
+数据版本
+
+排班相关数据（人员、班次、轮换组合、组、请假、日历覆盖）每次保存或删除都会使
+整体数据版本与该模型自身的版本各加一，并记录更新时间。版本号存放在数据库中，
+多进程部署时各进程看到的是同一个值。
+
+- 整体数据版本：排班结果缓存键、排班结果的 ETag
+- 模型版本：列表/详情接口的 ETag 与 Last-Modified
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DataVersion
+
+DATA_VERSION = 'data'
+
+
+def get_data_version():
+    version = DataVersion.objects.filter(name=DATA_VERSION).values_list('version', flat=True).first()
+    return version or 0
+
+
+def get_versions(names):
+    """一次查询多个版本，返回 {名称: (版本号, 更新时间)}，从未变更过的为 (0, None)"""
+    rows = DataVersion.objects.filter(name__in=names).values_list('name', 'version', 'updated_at')
+    versions = {name: (0, None) for name in names}
+    for name, version, updated_at in rows:
+        versions[name] = (version, updated_at)
+    return versions
+
+
+def bump_data_version(*model_names):
+    """
+    整体数据版本（及指定模型的版本）加一，与数据变更处于同一事务中
+
+    一次写入涉及多个模型时（如删除人员时级联删除请假）一并传入，整体数据版本只加一。
+    """
+    names = [DATA_VERSION, *model_names]
+    now = timezone.now()
+    updated = DataVersion.objects.filter(name__in=names).update(version=F('version') + 1, updated_at=now)
+    if updated == len(names):
+        return
+    existing = set(DataVersion.objects.filter(name__in=names).values_list('name', flat=True))
+    for name in names:
+        if name in existing:
+            continue
+        try:
+            with transaction.atomic():
+                DataVersion.objects.create(name=name, version=1)
+        except IntegrityError:
+            DataVersion.objects.filter(name=name).update(version=F('version') + 1, updated_at=now)
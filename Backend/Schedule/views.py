@@ -1,8 +1,12 @@
 ﻿from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse, FileResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
 from django.utils.dateparse import parse_date
 from django.core.exceptions import ObjectDoesNotExist
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
+from django.db.models import Q
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
@@ -16,13 +20,31 @@ from .serializers import (
     CalendarOverrideSerializer,
     ShiftRotationGroupSerializer,
 )
-from .schedule_generator import generate_schedule
+from .schedule_generator import (
+    generate_schedule, generate_year_schedule, stream_schedules, iter_range, month_bounds, load_absence_index,
+    effective_override, ENGINES, MAX_RANGE_DAYS,
+)
+from .schedule_store import get_materialized_schedule
+from .schedule_formats import RESPONSE_FORMATS, format_schedule, iter_ndjson
+from .schedule_cache import cached_schedule, cached_schedules, cache_stats
+from .versioning import get_data_version
+from .conditional import versioned, schedule_validators, not_modified_response, set_validators
+from .list_query import QueryParamError, int_param, date_range_params, list_response
+from .schedule_export import EXPORT_FORMATS, build_pivot, iter_csv, write_xlsx
+from .metrics import render_metrics
+from .schedule_jobs import JOB_KINDS, DONE, FAILED, submit_job, get_job
+from .bulk import BulkValidationError, bulk_create, bulk_update, bulk_delete, update_week_configs
+from .schedule_changes import parse_version, schedule_delta
+from .schedule_events import event_stream
+from django.conf import settings
+import itertools
 import json
 from datetime import datetime
 
 
 @api_view(['GET', 'POST'])
 @permission_classes([AllowAny])
+@versioned('ShiftDefinition')
 def week_schedule_config(request):
     """
     获取或更新大小周配置（存储在 ShiftDefinition 中）
@@ -41,31 +63,29 @@ def week_schedule_config(request):
         return Response(configs)
 
     if request.method == 'POST':
-        data = request.data
-        for config_data in data:
-            shift_type_id = config_data.get('shift_type') or config_data.get('shiftType')
-            if shift_type_id:
-                try:
-                    shift_definition = ShiftDefinition.objects.get(id=shift_type_id)
-                    shift_definition.big_week = config_data.get('big_week', config_data.get('bigWeek', []))
-                    shift_definition.small_week = config_data.get('small_week', config_data.get('smallWeek', []))
-                    shift_definition.save()
-                except ShiftDefinition.DoesNotExist:
-                    return Response({'error': f'班次ID {shift_type_id} 不存在'}, status=400)
+        try:
+            update_week_configs(request.data)
+        except ShiftDefinition.DoesNotExist as e:
+            return Response({'error': str(e)}, status=400)
 
         return Response({'message': '大小周配置已更新'}, status=201)
 
 
 
 @api_view(['GET', 'POST'])
+@versioned('ShiftDefinition')
 def shift_definitions_list(request):
     """
     获取或创建班次定义
+
+    GET 查询参数: enabled (true/false)，以及通用的 ordering、cursor、limit、fields
     """
     if request.method == 'GET':
         shift_definitions = ShiftDefinition.objects.all()
-        serializer = ShiftDefinitionSerializer(shift_definitions, many=True)
-        return Response(serializer.data)
+        enabled = request.query_params.get('enabled')
+        if enabled is not None:
+            shift_definitions = shift_definitions.filter(enabled=enabled.lower() in ('1', 'true'))
+        return list_response(request, shift_definitions, ShiftDefinitionSerializer, {'id': ('id',)})
 
     if request.method == 'POST':
         serializer = ShiftDefinitionSerializer(data=request.data)
@@ -76,6 +96,7 @@ def shift_definitions_list(request):
 
 
 @api_view(['GET', 'PUT', 'DELETE'])
+@versioned('ShiftDefinition')
 def shift_definition_detail(request, pk):
     """
     获取、更新或删除特定班次定义
@@ -102,14 +123,16 @@ def shift_definition_detail(request, pk):
 
 
 @api_view(['GET', 'POST'])
+@versioned('GroupConfig')
 def group_configs_list(request):
     """
     获取或创建组配置
+
+    GET 查询参数: 通用的 ordering、cursor、limit、fields
     """
     if request.method == 'GET':
         group_configs = GroupConfig.objects.all()
-        serializer = GroupConfigSerializer(group_configs, many=True)
-        return Response(serializer.data)
+        return list_response(request, group_configs, GroupConfigSerializer, {'id': ('id',)})
 
     if request.method == 'POST':
         serializer = GroupConfigSerializer(data=request.data)
@@ -120,6 +143,7 @@ def group_configs_list(request):
 
 
 @api_view(['GET', 'PUT', 'DELETE'])
+@versioned('GroupConfig')
 def group_config_detail(request, pk):
     """
     获取、更新或删除特定组配置
@@ -146,14 +170,16 @@ def group_config_detail(request, pk):
 
 
 @api_view(['GET', 'POST'])
+@versioned('ShiftRotationGroup', 'ShiftDefinition')
 def shift_rotation_groups_list(request):
     """
     获取或创建班次轮换组合
+
+    GET 查询参数: 通用的 ordering、cursor、limit、fields
     """
     if request.method == 'GET':
         groups = ShiftRotationGroup.objects.select_related('odd_shift', 'even_shift').all()
-        serializer = ShiftRotationGroupSerializer(groups, many=True)
-        return Response(serializer.data)
+        return list_response(request, groups, ShiftRotationGroupSerializer, {'id': ('id',)})
 
     elif request.method == 'POST':
         serializer = ShiftRotationGroupSerializer(data=request.data)
@@ -164,6 +190,7 @@ def shift_rotation_groups_list(request):
 
 
 @api_view(['GET', 'PUT', 'DELETE'])
+@versioned('ShiftRotationGroup', 'ShiftDefinition')
 def shift_rotation_group_detail(request, pk):
     """
     获取、更新或删除特定班次轮换组合
@@ -190,14 +217,23 @@ def shift_rotation_group_detail(request, pk):
 
 
 @api_view(['GET', 'POST'])
+@versioned('Person', 'GroupConfig', 'ShiftDefinition', 'ShiftRotationGroup')
 def persons_list(request):
     """
     获取或创建人员信息
+
+    GET 查询参数: group_id, shift_type_id, rotation_group_id，以及通用的 ordering、cursor、limit、fields
     """
     if request.method == 'GET':
         persons = Person.objects.select_related('group', 'shift_type', 'rotation_group').all()
-        serializer = PersonSerializer(persons, many=True)
-        return Response(serializer.data)
+        try:
+            for name in ('group_id', 'shift_type_id', 'rotation_group_id'):
+                value = int_param(request, name)
+                if value is not None:
+                    persons = persons.filter(**{name: value})
+        except QueryParamError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return list_response(request, persons, PersonSerializer, {'id': ('id',)})
 
     if request.method == 'POST':
         serializer = PersonSerializer(data=request.data)
@@ -208,6 +244,7 @@ def persons_list(request):
 
 
 @api_view(['GET', 'PUT', 'DELETE'])
+@versioned('Person', 'GroupConfig', 'ShiftDefinition', 'ShiftRotationGroup')
 def person_detail(request, pk):
     """
     获取、更新或删除特定人员信息
@@ -233,15 +270,108 @@ def person_detail(request, pk):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+def _bulk_view(request, model, serializer_class):
+    """
+    批量新增 / 修改 / 删除
+
+    POST   [对象, ...]                  批量新增
+    PUT    [{"id": ..., 字段...}, ...]  批量修改（只修改提供的字段）
+    DELETE {"ids": [...]}               批量删除
+
+    任一条目校验失败时不写入，返回 400 与 {"errors": [{"index": 下标, "errors": 错误}]}
+    """
+    try:
+        if request.method == 'POST':
+            objects = bulk_create(model, serializer_class, request.data)
+            return Response({'created': serializer_class(objects, many=True).data}, status=status.HTTP_201_CREATED)
+        if request.method == 'PUT':
+            objects = bulk_update(model, serializer_class, request.data)
+            return Response({'updated': serializer_class(objects, many=True).data})
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        deleted, missing = bulk_delete(model, ids)
+        return Response({'deleted': deleted, 'not_found': missing})
+    except BulkValidationError as e:
+        return Response({'errors': e.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['POST', 'PUT', 'DELETE'])
+def persons_bulk(request):
+    """批量新增、修改或删除人员"""
+    return _bulk_view(request, Person, PersonSerializer)
+
+
+@api_view(['GET'])
+@versioned('Person', 'Absence')
+def person_availability(request, pk):
+    """
+    查询人员在日期范围内的可用/不可用区间（仅依据请假记录，不生成排班）
+
+    查询参数: from, to (YYYY-MM-DD)
+    """
+    start_date = parse_date(request.query_params.get('from') or '')
+    end_date = parse_date(request.query_params.get('to') or '')
+    if start_date is None or end_date is None or start_date > end_date:
+        return Response({'error': '需要 from 和 to (YYYY-MM-DD) 参数，且 from 不晚于 to'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if not Person.objects.filter(pk=pk).exists():
+        return Response(status=status.HTTP_404_NOT_FOUND)
+
+    index = load_absence_index(start_date, end_date, [pk])
+    available, unavailable = index.availability(pk, start_date, end_date)
+    return Response({
+        'person_id': pk,
+        'from': start_date.isoformat(),
+        'to': end_date.isoformat(),
+        'available': [
+            {'start_date': range_start.isoformat(), 'end_date': range_end.isoformat()}
+            for range_start, range_end in available
+        ],
+        'unavailable': [
+            {
+                'start_date': range_start.isoformat(),
+                'end_date': range_end.isoformat(),
+                'absence_id': absence.id,
+                'type': absence.type,
+                'count_as_rest': absence.count_as_rest,
+            }
+            for range_start, range_end, absence in unavailable
+        ],
+    })
+
+
 @api_view(['GET', 'POST'])
+@versioned('Absence')
 def absences_list(request):
     """
     获取或创建请假信息
+
+    GET 查询参数:
+        from, to (YYYY-MM-DD)  与该日期范围相交的请假
+        person_id, group_id, type
+        ordering (id | start_date), cursor, limit, fields
     """
     if request.method == 'GET':
         absences = Absence.objects.all()
-        serializer = AbsenceSerializer(absences, many=True)
-        return Response(serializer.data)
+        try:
+            start_date, end_date = date_range_params(request)
+            person_id = int_param(request, 'person_id')
+            group_id = int_param(request, 'group_id')
+        except QueryParamError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if start_date:
+            absences = absences.filter(end_date__gte=start_date)
+        if end_date:
+            absences = absences.filter(start_date__lte=end_date)
+        if person_id is not None:
+            absences = absences.filter(person_id=person_id)
+        if group_id is not None:
+            absences = absences.filter(person__group_id=group_id)
+        if request.query_params.get('type'):
+            absences = absences.filter(type=request.query_params['type'])
+        return list_response(
+            request, absences, AbsenceSerializer,
+            {'id': ('id',), 'start_date': ('start_date', 'id')}
+        )
 
     if request.method == 'POST':
         serializer = AbsenceSerializer(data=request.data)
@@ -251,7 +381,14 @@ def absences_list(request):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST', 'PUT', 'DELETE'])
+def absences_bulk(request):
+    """批量新增、修改或删除请假信息"""
+    return _bulk_view(request, Absence, AbsenceSerializer)
+
+
 @api_view(['GET', 'PUT', 'DELETE'])
+@versioned('Absence')
 def absence_detail(request, pk):
     """
     获取、更新或删除特定请假信息
@@ -278,14 +415,54 @@ def absence_detail(request, pk):
 
 
 @api_view(['GET', 'POST'])
+@versioned('CalendarOverride', 'Person', 'GroupConfig', 'ShiftRotationGroup')
 def calendar_overrides_list(request):
     """
     获取或创建日历覆盖规则
+
+    GET 查询参数:
+        from, to (YYYY-MM-DD)  与该日期范围相交的规则
+        scope, override_type
+        target                 目标名称（按关联的组、人员、轮换组合的当前名称匹配）
+        target_group, target_person, target_rotation_group  目标ID
+        ordering (id | date), cursor, limit, fields
     """
     if request.method == 'GET':
-        calendar_overrides = CalendarOverride.objects.all()
-        serializer = CalendarOverrideSerializer(calendar_overrides, many=True)
-        return Response(serializer.data)
+        calendar_overrides = CalendarOverride.objects.select_related(
+            'target_group', 'target_rotation_group'
+        ).prefetch_related('target_persons')
+        try:
+            start_date, end_date = date_range_params(request)
+        except QueryParamError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if start_date:
+            calendar_overrides = calendar_overrides.filter(effective_end_date__gte=start_date)
+        if end_date:
+            calendar_overrides = calendar_overrides.filter(date__lte=end_date)
+        for name in ('scope', 'override_type'):
+            if request.query_params.get(name):
+                calendar_overrides = calendar_overrides.filter(**{name: request.query_params[name]})
+        target = request.query_params.get('target')
+        if target:
+            targeted = CalendarOverride.target_persons.through.objects.filter(
+                person__name=target
+            ).values('calendaroverride_id')
+            calendar_overrides = calendar_overrides.filter(
+                Q(target_group__name=target) | Q(target_rotation_group__name=target) | Q(id__in=targeted)
+                | Q(scope='指定组', target_group__isnull=True, target=target)
+            )
+        try:
+            for name, lookup in (('target_group', 'target_group_id'), ('target_person', 'target_persons__id'),
+                                 ('target_rotation_group', 'target_rotation_group_id')):
+                value = int_param(request, name)
+                if value is not None:
+                    calendar_overrides = calendar_overrides.filter(**{lookup: value})
+        except QueryParamError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return list_response(
+            request, calendar_overrides, CalendarOverrideSerializer,
+            {'id': ('id',), 'date': ('date', 'id')}
+        )
 
     if request.method == 'POST':
         serializer = CalendarOverrideSerializer(data=request.data)
@@ -295,7 +472,14 @@ def calendar_overrides_list(request):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST', 'PUT', 'DELETE'])
+def calendar_overrides_bulk(request):
+    """批量新增、修改或删除日历覆盖规则"""
+    return _bulk_view(request, CalendarOverride, CalendarOverrideSerializer)
+
+
 @api_view(['GET', 'PUT', 'DELETE'])
+@versioned('CalendarOverride', 'Person', 'GroupConfig', 'ShiftRotationGroup')
 def calendar_override_detail(request, pk):
     """
     获取、更新或删除特定日历覆盖规则
@@ -321,9 +505,81 @@ def calendar_override_detail(request, pk):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+@api_view(['GET'])
+@versioned('CalendarOverride', 'Person', 'GroupConfig', 'ShiftRotationGroup')
+def calendar_override_effective(request):
+    """
+    查询某人某日生效的日历覆盖规则
+
+    查询参数: person_id, date (YYYY-MM-DD)
+    """
+    person_id = request.query_params.get('person_id')
+    day = parse_date(request.query_params.get('date') or '')
+    if not person_id or not person_id.isdigit() or day is None:
+        return Response({'error': '需要 person_id 和 date (YYYY-MM-DD) 参数'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        override = effective_override(int(person_id), day)
+    except Person.DoesNotExist:
+        return Response(status=status.HTTP_404_NOT_FOUND)
+    data = None
+    if override is not None:
+        data = CalendarOverrideSerializer(CalendarOverride.objects.get(pk=override.id)).data
+    return Response({'person_id': int(person_id), 'date': day.isoformat(), 'override': data})
+
+
+
+
+
 
+def _id_list(value, name):
+    """解析可选的整数ID列表参数，None 表示不筛选"""
+    if value is None:
+        return None
+    if not isinstance(value, list) or not all(isinstance(item, int) for item in value):
+        raise ValueError(f'{name} 需要整数数组')
+    return value
 
 
+def _person_filters(data):
+    """解析生成接口的人员筛选参数，返回 {"person_ids", "group_ids", "rotation_group_ids"}"""
+    return {name: _id_list(data.get(name), name) for name in ('person_ids', 'group_ids', 'rotation_group_ids')}
+
+
+# ASGI 下流式响应每次在线程中取出的块数
+STREAM_BATCH_SIZE = 64
+
+
+async def _iterate_in_thread(chunks):
+    """在同步线程中分批取出同步迭代器的内容（与视图的数据库查询同一线程），逐块产出"""
+    chunks = iter(chunks)
+    take = sync_to_async(lambda: list(itertools.islice(chunks, STREAM_BATCH_SIZE)))
+    while True:
+        batch = await take()
+        if not batch:
+            return
+        for chunk in batch:
+            yield chunk
+
+
+def _streaming(request, response):
+    """
+    以 ASGI 部署时把流式响应的同步迭代器换成异步迭代器
+
+    Django 在 ASGI 下会先把同步迭代器整体读入列表再发送，流式导出与 NDJSON 的内存占用不再恒定；
+    改为分批取出、逐块发送。WSGI 下原样返回。
+    """
+    if isinstance(getattr(request, '_request', request), ASGIRequest) and not response.is_async:
+        response.streaming_content = _iterate_in_thread(response.streaming_content)
+    return response
+
+
+def _ndjson_response(request, rows):
+    """以 NDJSON 流式返回逐行产出的排班"""
+    return _streaming(
+        request, StreamingHttpResponse(iter_ndjson(rows), content_type='application/x-ndjson; charset=utf-8')
+    )
+
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -333,8 +589,16 @@ def generate_schedule_view(request):
 
     请求参数:
     {
-        "year_month": "YYYY-MM"
+        "year_month": "YYYY-MM",
+        "engine": "python" | "numpy"   (可选，默认 python)
+        "format": "rows" | "columnar"  (可选，默认 rows；columnar 为列式紧凑格式)
+        "stream": true                 (可选，以 NDJSON 流式逐行返回，忽略 format)
+        "person_ids": [1, 2]           (可选，只计算这些人员)
+        "group_ids": [3]               (可选，只计算这些组的人员)
+        "rotation_group_ids": [4]      (可选，只计算这些轮换组合的人员)
     }
+
+    指定筛选条件时只加载与计算对应人员，不经过结果缓存与物化存储。
     """
     try:
         year_month = request.data.get('year_month')
@@ -342,18 +606,85 @@ def generate_schedule_view(request):
         cross_month_continuous = request.data.get('cross_month_continuous')
         if cross_month_continuous is None:
             cross_month_continuous = True
+        engine = request.data.get('engine') or 'python'
+        response_format = request.data.get('format') or 'rows'
         if not year_month:
             return Response(
                 {'error': '缺少 year_month 参数'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        if response_format not in RESPONSE_FORMATS:
+            return Response(
+                {'error': f'不支持的输出格式: {response_format}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # 结果缓存不区分引擎（两者结果一致），需在读取缓存前校验
+        if engine not in ENGINES:
+            return Response(
+                {'error': f'不支持的计算引擎: {engine}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        result = generate_schedule(
-            year_month,
-            base_week_type=base_week_type,
-            cross_month_continuous=cross_month_continuous
+        filters = _person_filters(request.data)
+        filtered = any(value is not None for value in filters.values())
+
+        # 数据版本与请求参数未变时返回 304
+        stream = bool(request.data.get('stream'))
+        etag, last_modified = schedule_validators(
+            request, [year_month, base_week_type, cross_month_continuous, response_format, stream, filters]
+        )
+        not_modified = not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        if filtered:
+            rows = iter_range(
+                *month_bounds(year_month),
+                base_week_type=base_week_type,
+                cross_month_continuous=cross_month_continuous,
+                engine=engine,
+                **filters
+            )
+            if stream:
+                return set_validators(_ndjson_response(request, rows), etag, last_modified)
+            return set_validators(
+                Response(format_schedule({'schedule': list(rows)}, response_format), status=status.HTTP_200_OK),
+                etag,
+                last_modified
+            )
+
+        if stream:
+            rows = stream_schedules(
+                [year_month],
+                base_week_type=base_week_type,
+                cross_month_continuous=cross_month_continuous,
+                engine=engine
+            )
+            return set_validators(_ndjson_response(request, rows), etag, last_modified)
+
+        def compute():
+            if getattr(settings, 'SCHEDULE_MATERIALIZED_STORE', False):
+                # 从物化存储读取，首次访问时生成并写入
+                return get_materialized_schedule(
+                    year_month,
+                    base_week_type=base_week_type,
+                    cross_month_continuous=cross_month_continuous,
+                    engine=engine
+                )
+            return generate_schedule(
+                year_month,
+                base_week_type=base_week_type,
+                cross_month_continuous=cross_month_continuous,
+                engine=engine,
+                workers=getattr(settings, 'SCHEDULE_WORKERS', 1)
+            )
+
+        result = cached_schedule(year_month, base_week_type, cross_month_continuous, compute)
+        return set_validators(
+            Response(format_schedule(result, response_format), status=status.HTTP_200_OK),
+            etag,
+            last_modified
         )
-        return Response(result, status=status.HTTP_200_OK)
     
     except Exception as e:
         return Response(
@@ -370,7 +701,10 @@ def generate_year_schedule_view(request):
 
     请求参数:
     {
-        "year": "YYYY"
+        "year": "YYYY",
+        "engine": "python" | "numpy"   (可选，默认 python)
+        "format": "rows" | "columnar"  (可选，默认 rows)
+        "stream": true                 (可选，按月份顺序以 NDJSON 流式逐行返回，忽略 format)
     }
 
     返回:
@@ -390,23 +724,336 @@ def generate_year_schedule_view(request):
             )
 
         year = int(year_str)
-        schedules = {}
         base_week_type = request.data.get('base_week_type') or '大周'
         cross_month_continuous = request.data.get('cross_month_continuous')
         if cross_month_continuous is None:
             cross_month_continuous = True
-        for month in range(1, 13):
-            year_month = f"{year}-{month:02d}"
-            schedules[year_month] = generate_schedule(
-                year_month,
+        engine = request.data.get('engine') or 'python'
+        response_format = request.data.get('format') or 'rows'
+        if response_format not in RESPONSE_FORMATS:
+            return Response(
+                {'error': f'不支持的输出格式: {response_format}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # 结果缓存不区分引擎（两者结果一致），需在读取缓存前校验
+        if engine not in ENGINES:
+            return Response(
+                {'error': f'不支持的计算引擎: {engine}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        stream = bool(request.data.get('stream'))
+        etag, last_modified = schedule_validators(
+            request, [year, base_week_type, cross_month_continuous, response_format, stream]
+        )
+        not_modified = not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        if stream:
+            rows = stream_schedules(
+                [f"{year}-{month:02d}" for month in range(1, 13)],
+                base_week_type=base_week_type,
+                cross_month_continuous=cross_month_continuous,
+                engine=engine
+            )
+            return set_validators(_ndjson_response(request, rows), etag, last_modified)
+
+        schedules = cached_schedules(
+            [f"{year}-{month:02d}" for month in range(1, 13)],
+            base_week_type,
+            cross_month_continuous,
+            lambda: generate_year_schedule(
+                year,
                 base_week_type=base_week_type,
-                cross_month_continuous=cross_month_continuous
+                cross_month_continuous=cross_month_continuous,
+                engine=engine,
+                workers=getattr(settings, 'SCHEDULE_WORKERS', 1)
             )
+        )
 
-        return Response({'schedules': schedules}, status=status.HTTP_200_OK)
+        schedules = {
+            year_month: format_schedule(result, response_format)
+            for year_month, result in schedules.items()
+        }
+        return set_validators(
+            Response({'schedules': schedules}, status=status.HTTP_200_OK),
+            etag,
+            last_modified
+        )
 
     except Exception as e:
         return Response(
             {'error': str(e)},
             status=status.HTTP_400_BAD_REQUEST
         )
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def schedule_export_view(request):
+    """
+    导出排班表（人员 × 日期）
+
+    查询参数:
+        year_month=YYYY-MM 或 year=YYYY
+        type: csv | xlsx（默认 xlsx；不用 format，避免与 DRF 的 ?format= 渲染器选择冲突）
+        base_week_type, cross_month_continuous (true/false), engine
+        split: group —— 全年 xlsx 按组拆分工作表（全年导出默认按组拆分，split=none 时不拆分）
+    """
+    year_month = request.query_params.get('year_month')
+    year = request.query_params.get('year')
+    export_format = request.query_params.get('type') or 'xlsx'
+    if export_format not in EXPORT_FORMATS:
+        return Response({'error': f'不支持的导出格式: {export_format}'}, status=status.HTTP_400_BAD_REQUEST)
+    if year_month:
+        year_months = [year_month]
+        file_stem = f'schedule_{year_month}'
+    elif year and year.isdigit():
+        year_months = [f"{year}-{month:02d}" for month in range(1, 13)]
+        file_stem = f'schedule_{year}'
+    else:
+        return Response({'error': '需要 year_month (YYYY-MM) 或 year (YYYY) 参数'}, status=status.HTTP_400_BAD_REQUEST)
+    split_by_group = (request.query_params.get('split') or ('group' if not year_month else 'none')) == 'group'
+    cross_month_continuous = (request.query_params.get('cross_month_continuous') or 'true').lower() not in ('0', 'false')
+
+    try:
+        dates, group_names, rows = build_pivot(
+            year_months,
+            base_week_type=request.query_params.get('base_week_type') or '大周',
+            cross_month_continuous=cross_month_continuous,
+            engine=request.query_params.get('engine') or 'python'
+        )
+        if export_format == 'csv':
+            response = StreamingHttpResponse(iter_csv(dates, rows), content_type='text/csv; charset=utf-8')
+            response['Content-Disposition'] = f'attachment; filename="{file_stem}.csv"'
+            return _streaming(request, response)
+        return _streaming(request, FileResponse(
+            write_xlsx(dates, group_names, rows, split_by_group=split_by_group),
+            as_attachment=True,
+            filename=f'{file_stem}.xlsx',
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        ))
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def generate_range_view(request):
+    """
+    按日期范围生成排班
+
+    请求参数:
+    {
+        "start_date": "YYYY-MM-DD",
+        "end_date": "YYYY-MM-DD",
+        "person_ids": [1, 2],          (可选，只计算这些人员)
+        "group_ids": [3],              (可选，只计算这些组的人员)
+        "rotation_group_ids": [4],     (可选，只计算这些轮换组合的人员)
+        "base_week_type", "cross_month_continuous", "engine" (可选)
+        "format": "rows" | "columnar"  (可选，默认 rows)
+        "stream": true                 (可选，以 NDJSON 流式逐行返回，忽略 format)
+    }
+    """
+    start_date = parse_date(str(request.data.get('start_date') or ''))
+    end_date = parse_date(str(request.data.get('end_date') or ''))
+    if start_date is None or end_date is None or start_date > end_date:
+        return Response({'error': '需要 start_date 和 end_date (YYYY-MM-DD)，且开始日期不晚于结束日期'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if (end_date - start_date).days + 1 > MAX_RANGE_DAYS:
+        return Response({'error': f'日期范围不能超过 {MAX_RANGE_DAYS} 天'}, status=status.HTTP_400_BAD_REQUEST)
+    response_format = request.data.get('format') or 'rows'
+    if response_format not in RESPONSE_FORMATS:
+        return Response({'error': f'不支持的输出格式: {response_format}'}, status=status.HTTP_400_BAD_REQUEST)
+    base_week_type = request.data.get('base_week_type') or '大周'
+    cross_month_continuous = request.data.get('cross_month_continuous')
+    if cross_month_continuous is None:
+        cross_month_continuous = True
+
+    try:
+        filters = _person_filters(request.data)
+        stream = bool(request.data.get('stream'))
+        etag, last_modified = schedule_validators(request, [
+            start_date, end_date, filters, base_week_type, cross_month_continuous, response_format, stream,
+        ])
+        not_modified = not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        rows = iter_range(
+            start_date,
+            end_date,
+            base_week_type=base_week_type,
+            cross_month_continuous=cross_month_continuous,
+            engine=request.data.get('engine') or 'python',
+            **filters
+        )
+        if stream:
+            return set_validators(_ndjson_response(request, rows), etag, last_modified)
+        result = {'schedule': list(rows)}
+        return set_validators(Response(format_schedule(result, response_format)), etag, last_modified)
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def schedule_delta_view(request):
+    """
+    增量排班：返回某个数据版本之后发生变化的格子，客户端据此原地更新已加载的排班
+
+    请求参数:
+    {
+        "year_month": "YYYY-MM",
+        "since": 123 | "<ETag>"        (客户端排班对应的数据版本，或当时排班接口返回的 ETag)
+        "base_week_type", "cross_month_continuous", "engine" (可选，与加载排班时相同)
+    }
+
+    返回 version（下次请求的 since）、removed_persons（已删除的人员ID）与 schedule（受影响格子的当前值）；
+    reset 为 true 时变更记录不完整，需重新加载整月排班。
+    """
+    year_month = request.data.get('year_month')
+    since = parse_version(request.data.get('since'))
+    if not year_month or since is None:
+        return Response({'error': '需要 year_month 和 since 参数'}, status=status.HTTP_400_BAD_REQUEST)
+    base_week_type = request.data.get('base_week_type') or '大周'
+    cross_month_continuous = request.data.get('cross_month_continuous')
+    if cross_month_continuous is None:
+        cross_month_continuous = True
+
+    try:
+        return Response(schedule_delta(
+            *month_bounds(year_month),
+            since,
+            base_week_type=base_week_type,
+            cross_month_continuous=cross_month_continuous,
+            engine=request.data.get('engine') or 'python'
+        ))
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+@require_GET
+async def schedule_events_view(request):
+    """
+    排班失效事件流（text/event-stream），需以 ASGI 部署
+
+    连接后先收到 version 事件（当前数据版本），之后每次排班相关数据变更收到一条 invalidate 事件:
+    {"model": "Absence", "version": 124, "person_ids": [5], "start_date": "2025-03-01", "end_date": "2025-03-05"}
+    person_ids / start_date / end_date 为 null 表示全部人员 / 全部日期。收到 reset 事件时需重新加载排班。
+
+    以 WSGI 部署时长连接会一直占用工作线程，直接返回 501。
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': '排班事件流需以 ASGI 部署（Backend/asgi.py）'}, status=501)
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # 关闭 nginx 等反向代理的响应缓冲
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def schedule_jobs_view(request):
+    """
+    提交排班生成任务，立即返回任务信息（202）
+
+    请求参数:
+    {
+        "kind": "month" | "year" | "range",
+        "year_month": "YYYY-MM"                         (kind=month)
+        "year": "YYYY"                                  (kind=year)
+        "start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD" (kind=range，也可用 start_month / end_month: "YYYY-MM")
+        "base_week_type", "cross_month_continuous", "engine" (可选)
+    }
+
+    参数与数据版本相同的进行中/已完成任务会被复用，返回的 deduplicated 为 true。
+    """
+    kind = request.data.get('kind') or 'month'
+    if kind not in JOB_KINDS:
+        return Response({'error': f'不支持的任务类型: {kind}'}, status=status.HTTP_400_BAD_REQUEST)
+    cross_month_continuous = request.data.get('cross_month_continuous')
+    if cross_month_continuous is None:
+        cross_month_continuous = True
+    try:
+        job, deduplicated = submit_job(
+            kind,
+            request.data,
+            base_week_type=request.data.get('base_week_type') or '大周',
+            cross_month_continuous=cross_month_continuous,
+            engine=request.data.get('engine') or 'python'
+        )
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({**job.to_dict(), 'deduplicated': deduplicated}, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def schedule_job_detail(request, job_id):
+    """
+    查询任务状态与进度
+
+    查询参数: wait —— 长轮询，最多等待的秒数（上限 30），任务在此期间完成时立即返回
+    """
+    try:
+        wait = float(request.query_params.get('wait') or 0)
+    except ValueError:
+        return Response({'error': 'wait 必须是数字'}, status=status.HTTP_400_BAD_REQUEST)
+    job = get_job(job_id, wait=wait)
+    if job is None:
+        return Response(status=status.HTTP_404_NOT_FOUND)
+    return Response(job.to_dict())
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def schedule_job_result(request, job_id):
+    """
+    获取已完成任务的结果 {"schedules": {"YYYY-MM": {...}}}
+
+    查询参数: type —— rows（默认）| columnar；任务未完成时返回 409，失败时返回 500 与错误信息
+    """
+    job = get_job(job_id)
+    if job is None:
+        return Response(status=status.HTTP_404_NOT_FOUND)
+    if job.status == FAILED:
+        return Response({'error': job.error}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    if job.status != DONE:
+        return Response(job.to_dict(), status=status.HTTP_409_CONFLICT)
+    response_format = request.query_params.get('type') or 'rows'
+    if response_format not in RESPONSE_FORMATS:
+        return Response({'error': f'不支持的输出格式: {response_format}'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({
+        'schedules': {
+            year_month: format_schedule(result, response_format)
+            for year_month, result in job.result.items()
+        }
+    })
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def schedule_cache_stats_view(request):
+    """
+    排班结果缓存统计（本进程的命中/未命中次数与当前数据版本）
+    """
+    return Response({**cache_stats(), 'data_version': get_data_version()})
+
+
+def metrics_view(request):
+    """
+    Prometheus 格式的进程内指标：请求耗时、数据库耗时与查询数、排班生成各阶段耗时、排班结果缓存命中
+    """
+    stats = cache_stats()
+    extra_lines = [
+        '# HELP schedule_cache_hits_total 排班结果缓存命中次数',
+        '# TYPE schedule_cache_hits_total counter',
+        f"schedule_cache_hits_total {stats['hits']}",
+        '# HELP schedule_cache_misses_total 排班结果缓存未命中次数',
+        '# TYPE schedule_cache_misses_total counter',
+        f"schedule_cache_misses_total {stats['misses']}",
+    ]
+    return HttpResponse(render_metrics(extra_lines), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,128 @@
+"""
+预编译的工作日历（进程内共享）
+
+某班次某天按大小周是否上班，只取决于班次的大小周工作日、基准周类型、是否跨月连续与日期本身，
+与人员和请求无关，因此按年预先计算并在进程内缓存，各请求、各计算引擎与导出共用：
+
+- 年度日期表：(年份, 基准周类型, 是否跨月连续) → 全年每天的日期信息（大小周、轮换月份等），
+  各月按原有规则计算（基准日期为当年 1 月 1 日或当月 1 日）
+- 工作日位图：年度日期表 × 班次 → 全年每天是否上班（每天一个字节），逐格判断只需一次下标访问
+
+班次的大小周工作日是位图缓存键的一部分，配置修改后旧位图不会再被命中；
+ShiftDefinition 保存或删除时（signals.py）清除该班次的位图释放内存。多进程部署时各进程各自缓存。
+"""
+import threading
+from datetime import date, timedelta
+
+# 进程内最多缓存的年度日期表数量，超出时全部清空重建
+MAX_YEAR_CALENDARS = 32
+
+_lock = threading.Lock()
+_calendars = {}
+
+
+def _month_dates(calendar, start_date, end_date, day_index):
+    """计算同一个月内 start_date ~ end_date 的日期信息"""
+    base_week_type = calendar.base_week_type
+    cross_month_continuous = calendar.cross_month_continuous
+    # 大小周以基准周计算，可选跨月连续
+    base_date = date(start_date.year, 1, 1) if cross_month_continuous else start_date.replace(day=1)
+    base_date = base_date - timedelta(days=base_date.weekday())
+
+    current_date = start_date
+    while current_date <= end_date:
+        days_since_current_monday = current_date.weekday()
+        current_monday = current_date - timedelta(days=days_since_current_monday)
+        weeks_diff = (current_monday - base_date).days // 7
+        is_big_week = (weeks_diff % 2 == 0 and base_week_type == '大周') or \
+                      (weeks_diff % 2 == 1 and base_week_type == '小周')
+        rotation_month = current_date.month
+        if cross_month_continuous and current_monday.month != current_date.month:
+            rotation_month = current_monday.month
+        yield {
+            'date': current_date,
+            'date_str': current_date.strftime('%Y-%m-%d'),
+            'weekday': current_date.weekday(),
+            'is_big_week': is_big_week,
+            'week_start_month': current_monday.month,
+            'rotation_month': rotation_month,
+            'calendar': calendar,
+            'day_index': day_index,
+        }
+        day_index += 1
+        current_date += timedelta(days=1)
+
+
+class YearCalendar:
+    """一年的日期表与各班次的工作日位图"""
+
+    def __init__(self, year, base_week_type, cross_month_continuous):
+        self.year = year
+        self.base_week_type = base_week_type
+        self.cross_month_continuous = cross_month_continuous
+        dates = []
+        for month in range(1, 13):
+            month_start = date(year, month, 1)
+            month_end = (date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)) - timedelta(days=1)
+            dates.extend(_month_dates(self, month_start, month_end, len(dates)))
+        # 日期信息在各请求间共享，调用方不能修改
+        self.dates = tuple(dates)
+        self._work_maps = {}
+
+    def work_map(self, shift_id, big_week_days, small_week_days):
+        """
+        班次的全年工作日位图：第 i 个字节为 1 表示全年第 i 天（day_index）按大小周配置上班
+
+        shift_id 为班次ID（无班次时为 None），big_week_days / small_week_days 为大周、小周工作日集合。
+        """
+        key = (shift_id, frozenset(big_week_days), frozenset(small_week_days))
+        work_map = self._work_maps.get(key)
+        if work_map is None:
+            work_map = bytes(
+                info['weekday'] in (big_week_days if info['is_big_week'] else small_week_days)
+                for info in self.dates
+            )
+            with _lock:
+                self._work_maps[key] = work_map
+        return work_map
+
+    def discard_shift(self, shift_id):
+        with _lock:
+            for key in [key for key in self._work_maps if key[0] == shift_id]:
+                del self._work_maps[key]
+
+
+def year_calendar(year, base_week_type, cross_month_continuous):
+    """取得（必要时编译）某年份的工作日历"""
+    key = (year, base_week_type, bool(cross_month_continuous))
+    calendar = _calendars.get(key)
+    if calendar is None:
+        calendar = YearCalendar(*key)
+        with _lock:
+            if len(_calendars) >= MAX_YEAR_CALENDARS:
+                _calendars.clear()
+            calendar = _calendars.setdefault(key, calendar)
+    return calendar
+
+
+def date_info_range(start_date, end_date, base_week_type, cross_month_continuous):
+    """start_date ~ end_date（含，可跨月、跨年）的日期信息列表，取自年度日期表"""
+    date_info_list = []
+    for year in range(start_date.year, end_date.year + 1):
+        calendar = year_calendar(year, base_week_type, cross_month_continuous)
+        year_start = date(year, 1, 1)
+        first = (max(start_date, year_start) - year_start).days
+        last = (min(end_date, date(year, 12, 31)) - year_start).days
+        date_info_list.extend(calendar.dates[first:last + 1])
+    return date_info_list
+
+
+def invalidate_shift(shift_id):
+    """班次修改或删除后清除其工作日位图"""
+    for calendar in list(_calendars.values()):
+        calendar.discard_shift(shift_id)
+
+
+def clear():
+    with _lock:
+        _calendars.clear()